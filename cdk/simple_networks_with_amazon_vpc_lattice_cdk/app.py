@@ -1,19 +1,14 @@
 #!/usr/bin/env python3
-import os
-
+# cdk synth -c offline=true (or CDK_SYNTH_OFFLINE=1) synthesizes without calling AWS, see synth_environment.py
 from aws_cdk import App, Environment
-from boto3 import client, session
-from simple_networks_with_amazon_vpc_lattice_cdk.simple_networks_with_amazon_vpc_lattice_stack import (
-    SimpleNetworksWithAmazonVpcLatticeStack,
-    get_stack_name,
-)
+from simple_networks_with_amazon_vpc_lattice_cdk import simple_networks_with_amazon_vpc_lattice_stack as lattice_stack
+from simple_networks_with_amazon_vpc_lattice_cdk.synth_environment import get_stack_name, is_offline, resolve_environment
 
-account = client('sts').get_caller_identity()['Account']
-region = session.Session().region_name
 app = App()
-simple_networks_with_amazon_vpc_lattice_stack = SimpleNetworksWithAmazonVpcLatticeStack(
+account, region = resolve_environment(offline=is_offline(app.node.try_get_context('offline')))
+simple_networks_with_amazon_vpc_lattice_stack = lattice_stack.SimpleNetworksWithAmazonVpcLatticeStack(
     app,
     get_stack_name(),
-    env=Environment(account=os.environ.get('AWS_DEFAULT_ACCOUNT', account), region=os.environ.get('AWS_DEFAULT_REGION', region)),
+    env=Environment(account=account, region=region),
 )
 app.synth()
@@ -2,3 +2,45 @@ from typing import Final
 
 SERVICE_NAME: Final[str] = 'SimpleNetworksWithAmazonVPCLattice'
 EC2_KEY_NAME: Final[str] = "ec2-key"
+
+# VPC Lattice sends traffic to IP targets from this link-local range
+VPC_LATTICE_IPV4_CIDR: Final[str] = '169.254.171.0/24'
+
+# Workload VPCs get non-overlapping ranges of this pool, so they can be peered or attached to a Transit Gateway later.
+# Ranges used outside the stack, or CIDRs to pin for a VPC by its construct id (e.g. 'EcsVpc'), go to NETWORK_RESERVED_CIDRS
+NETWORK_CIDR_POOL: Final[str] = '10.0.0.0/12'
+NETWORK_VPC_PREFIX_LENGTH: Final[int] = 16
+NETWORK_RESERVED_CIDRS: Final[dict[str, str]] = {}
+# Set to True to drop the NAT gateways of the ECS and Lambda VPCs: their private subnets reach AWS APIs through VPC endpoints
+# and the other workloads through Lattice. ECS_CONTAINER_IMAGE has to be an ECR image then
+NETWORK_NAT_FREE: Final[bool] = False
+
+# Set to True to route ECS traffic through the internal ALB (Lattice -> ALB -> task) instead of registering tasks directly
+ECS_USE_ALB: Final[bool] = False
+
+# One of the keys of ECS_SIZING_PROFILES in ecs/ecs_sizing_profile.py
+ECS_SIZING_PROFILE: Final[str] = 'small'
+ECS_CONTAINER_IMAGE: Final[str] = 'amazon/amazon-ecs-sample'
+
+# Set to False to run the web server on a single instance instead of an Auto Scaling group
+EC2_USE_AUTO_SCALING_GROUP: Final[bool] = True
+EC2_INSTANCE_TYPE: Final[str] = 't3.micro'
+EC2_MIN_CAPACITY: Final[int] = 1
+EC2_MAX_CAPACITY: Final[int] = 4
+
+LAMBDA_MEMORY_SIZE_MIB: Final[int] = 512
+LAMBDA_SNAP_START: Final[bool] = False
+# Provisioned concurrency of the Lambda alias behind Lattice, 0 disables it
+LAMBDA_PROVISIONED_CONCURRENCY_MIN: Final[int] = 0
+LAMBDA_PROVISIONED_CONCURRENCY_MAX: Final[int] = 0
+
+# Access logs of the service network go to S3 and/or CloudWatch Logs, analyse them with tools/lattice_access_logs.py
+LATTICE_ACCESS_LOGS_TO_S3: Final[bool] = True
+LATTICE_ACCESS_LOGS_TO_CLOUDWATCH_LOGS: Final[bool] = False
+# Subscribes every service as well, which logs requests through the service network twice
+LATTICE_SERVICE_ACCESS_LOGS: Final[bool] = False
+
+# Every Lattice service gets a dashboard row and alarms on these SLOs, alarms are sent to this address when set
+LATTICE_SLO_P99_LATENCY_MS: Final[float] = 1000
+LATTICE_SLO_ERROR_RATE_PERCENT: Final[float] = 1.0
+LATTICE_ALARM_EMAIL: Final[str | None] = None
@@ -1,17 +1,32 @@
 from pathlib import Path
 
-from aws_cdk import Stack, aws_ec2
+from aws_cdk import Duration, Stack, aws_autoscaling, aws_cloudwatch, aws_ec2, aws_vpclattice
 from constructs import Construct
 from simple_networks_with_amazon_vpc_lattice_cdk.constants import EC2_KEY_NAME
+from simple_networks_with_amazon_vpc_lattice_cdk.ec2.nginx_config import NginxTuning, render_user_data_script
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import (
+    LatticeServiceSpec,
+    LatticeTarget,
+    LatticeTargetGroupSpec,
+)
+from simple_networks_with_amazon_vpc_lattice_cdk.network.network_planner import NetworkPlanner
 
 
 # pylint: disable=too-many-instance-attributes
 class EC2Construct(Construct):
 
-    def __init__(self, scope: Construct, id_: str) -> None:
+    # pylint: disable=too-many-arguments
+    def __init__(self, scope: Construct, id_: str, *, use_auto_scaling_group: bool = True, instance_type: str = 't3.nano',
+                 min_capacity: int = 1, max_capacity: int = 1, network_planner: NetworkPlanner | None = None) -> None:
         super().__init__(scope, id_)
         self.id_ = id_
         self.scope = scope
+        self.use_auto_scaling_group = use_auto_scaling_group
+        self.instance_type = aws_ec2.InstanceType(instance_type)
+        self.nginx_tuning = NginxTuning.for_instance_type(instance_type)
+        self.min_capacity = min_capacity
+        self.max_capacity = max_capacity
+        self.network_planner = network_planner or NetworkPlanner()
 
         self.stack = Stack.of(self)
         self.region = self.stack.region
@@ -19,12 +34,15 @@ class EC2Construct(Construct):
 
         self.ec2_vpc = self._build_ec2_vpc()
         self.ec2_security_group = self._build_ec2_security_group()
-        self.ec2_instance = self._build_ec2_instance()
+        if self.use_auto_scaling_group:
+            self.launch_template = self._build_launch_template()
+            self.auto_scaling_group = self._build_auto_scaling_group()
+            self._scale_on_cpu_utilization()
+        else:
+            self.ec2_instance = self._build_ec2_instance()
 
     def _build_ec2_vpc(self) -> aws_ec2.Vpc:
-        return aws_ec2.Vpc(
-            self, 'Ec2Vpc', ip_addresses=aws_ec2.IpAddresses.cidr('10.0.0.0/16'), max_azs=1, nat_gateways=0,
-            subnet_configuration=[aws_ec2.SubnetConfiguration(name='Ec2PublicSubnet', subnet_type=aws_ec2.SubnetType.PUBLIC, cidr_mask=24)])
+        return self.network_planner.build_vpc(self, 'Ec2Vpc', max_azs=1, public_subnets=True)
 
     def _build_ec2_security_group(self) -> aws_ec2.SecurityGroup:
         security_group = aws_ec2.SecurityGroup(
@@ -40,14 +58,61 @@ class EC2Construct(Construct):
     def _get_user_data_script(self) -> str:
         path = Path.cwd() / "cdk/simple_networks_with_amazon_vpc_lattice_cdk/ec2/user_data.sh"
 
-        return path.read_text(encoding="utf-8")
+        return render_user_data_script(path.read_text(encoding="utf-8"), self.nginx_tuning)
 
     def _build_ec2_instance(self) -> aws_ec2.Instance:
-        ec2_instance = aws_ec2.Instance(self, 'WebSrvEc2', instance_name='WebSrvEc2',
-                                        instance_type=aws_ec2.InstanceType.of(aws_ec2.InstanceClass.T3, aws_ec2.InstanceSize.NANO),
+        ec2_instance = aws_ec2.Instance(self, 'WebSrvEc2', instance_name='WebSrvEc2', instance_type=self.instance_type,
                                         machine_image=aws_ec2.MachineImage.latest_amazon_linux2(), vpc=self.ec2_vpc,
                                         vpc_subnets=aws_ec2.SubnetSelection(subnet_type=aws_ec2.SubnetType.PUBLIC),
                                         security_group=self.ec2_security_group, key_name=EC2_KEY_NAME)
         ec2_instance.add_user_data(self._get_user_data_script())
 
         return ec2_instance
+
+    def _build_launch_template(self) -> aws_ec2.LaunchTemplate:
+        user_data = aws_ec2.UserData.for_linux()
+        user_data.add_commands(self._get_user_data_script())
+
+        return aws_ec2.LaunchTemplate(self, 'WebSrvLaunchTemplate', instance_type=self.instance_type,
+                                      machine_image=aws_ec2.MachineImage.latest_amazon_linux2(), security_group=self.ec2_security_group,
+                                      key_name=EC2_KEY_NAME, user_data=user_data)
+
+    def _build_auto_scaling_group(self) -> aws_autoscaling.AutoScalingGroup:
+        return aws_autoscaling.AutoScalingGroup(self, 'WebSrvAsg', vpc=self.ec2_vpc, launch_template=self.launch_template,
+                                                min_capacity=self.min_capacity, max_capacity=self.max_capacity,
+                                                vpc_subnets=aws_ec2.SubnetSelection(subnet_type=aws_ec2.SubnetType.PUBLIC))
+
+    def _scale_on_cpu_utilization(self) -> None:
+        self.auto_scaling_group.scale_on_cpu_utilization('WebSrvCpuScaling', target_utilization_percent=60,
+                                                         estimated_instance_warmup=Duration.minutes(3))
+
+    def saturation_widgets(self) -> list[aws_cloudwatch.IWidget]:
+        if self.use_auto_scaling_group:
+            dimensions = {'AutoScalingGroupName': self.auto_scaling_group.auto_scaling_group_name}
+        else:
+            dimensions = {'InstanceId': self.ec2_instance.instance_id}
+        cpu = aws_cloudwatch.Metric(namespace='AWS/EC2', metric_name='CPUUtilization', dimensions_map=dimensions, statistic='Maximum')
+        # Burstable instances drop to their baseline CPU once the credits run out, long before CPUUtilization shows 100%
+        cpu_credits = aws_cloudwatch.Metric(namespace='AWS/EC2', metric_name='CPUCreditBalance', dimensions_map=dimensions,
+                                            statistic='Minimum')
+        return [
+            aws_cloudwatch.GraphWidget(title='ec2 CPU', width=12, left=[cpu],
+                                       right=[cpu_credits] if self.instance_type.to_string().startswith('t') else []),
+        ]
+
+    def lattice_service_spec(self) -> LatticeServiceSpec:
+        if self.use_auto_scaling_group:
+            return LatticeServiceSpec(name='ec2', vpc=self.ec2_vpc,
+                                      target_group=LatticeTargetGroupSpec(target_type='INSTANCE', name='ec2asgtargetgroup'))
+        targets = (LatticeTarget(id=self.ec2_instance.instance_id, port=80),)
+        return LatticeServiceSpec(name='ec2', vpc=self.ec2_vpc,
+                                  target_group=LatticeTargetGroupSpec(target_type='INSTANCE', targets=targets))
+
+    def attach_lattice_target_group(self, target_group: aws_vpclattice.CfnTargetGroup) -> None:
+        # The Auto Scaling group registers instances on launch and waits for Lattice to drain them before terminating on scale-in
+        cfn_auto_scaling_group: aws_autoscaling.CfnAutoScalingGroup = self.auto_scaling_group.node.default_child
+        cfn_auto_scaling_group.traffic_sources = [
+            aws_autoscaling.CfnAutoScalingGroup.TrafficSourceIdentifierProperty(identifier=target_group.attr_arn, type='vpc-lattice')
+        ]
+        cfn_auto_scaling_group.health_check_type = 'VPC_LATTICE'
+        cfn_auto_scaling_group.health_check_grace_period = Duration.minutes(3).to_seconds()
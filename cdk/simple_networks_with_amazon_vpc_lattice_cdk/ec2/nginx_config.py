@@ -0,0 +1,69 @@
+import argparse
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from string import Template
+from typing import Final
+
+NGINX_CONF_TEMPLATE_PATH: Final[Path] = Path(__file__).parent / 'nginx.conf'
+
+# VPC Lattice closes idle client connections after this many seconds
+LATTICE_IDLE_TIMEOUT_SECONDS: Final[int] = 60
+
+# vCPUs of the instance types we run the web server on, unknown types fall back to nginx's own detection
+INSTANCE_TYPE_VCPUS: Final[dict[str, int]] = {
+    't3.nano': 2,
+    't3.micro': 2,
+    't3.small': 2,
+    't3.medium': 2,
+    't3.large': 2,
+    't3.xlarge': 4,
+    't3.2xlarge': 8,
+    't4g.nano': 2,
+    't4g.micro': 2,
+    't4g.small': 2,
+    't4g.medium': 2,
+    'c6g.large': 2,
+    'c6g.xlarge': 4,
+    'c6i.large': 2,
+    'c6i.xlarge': 4,
+    'c7g.large': 2,
+    'c7g.xlarge': 4,
+}
+
+
+class _ConfigTemplate(Template):
+    # nginx and bash both use $ for their own variables
+    delimiter = '@'
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass(frozen=True)
+class NginxTuning:
+    worker_processes: str = 'auto'
+    worker_connections: int = 4096
+    worker_rlimit_nofile: int = 16384
+    keepalive_timeout_seconds: int = LATTICE_IDLE_TIMEOUT_SECONDS + 15
+    keepalive_requests: int = 10000
+    gzip_comp_level: int = 5
+    gzip_min_length: int = 1024
+    open_file_cache_max: int = 10000
+    listen_backlog: int = 4096
+
+    @classmethod
+    def for_instance_type(cls, instance_type: str) -> 'NginxTuning':
+        vcpus = INSTANCE_TYPE_VCPUS.get(instance_type)
+        return cls(worker_processes=str(vcpus) if vcpus else 'auto')
+
+
+def render_nginx_config(tuning: NginxTuning) -> str:
+    return _ConfigTemplate(NGINX_CONF_TEMPLATE_PATH.read_text(encoding='utf-8')).substitute(asdict(tuning))
+
+
+def render_user_data_script(user_data_template: str, tuning: NginxTuning) -> str:
+    return _ConfigTemplate(user_data_template).substitute(nginx_conf=render_nginx_config(tuning).rstrip('\n'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Renders the nginx configuration used by the EC2 web server')
+    parser.add_argument('--instance-type', default='t3.micro')
+    print(render_nginx_config(NginxTuning.for_instance_type(parser.parse_args().instance_type)), end='')
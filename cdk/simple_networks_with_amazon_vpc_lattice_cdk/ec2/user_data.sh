@@ -3,6 +3,12 @@ yum update -y
 sudo su
 
 amazon-linux-extras install -y nginx1
+
+cat > /etc/nginx/nginx.conf <<'NGINX_CONF'
+@nginx_conf
+NGINX_CONF
+nginx -t
+
 systemctl start nginx
 systemctl enable nginx
 
@@ -1,14 +1,48 @@
-from aws_cdk import Stack, aws_ec2, aws_ecs, aws_elasticloadbalancingv2, aws_iam
+from typing import Final
+
+from aws_cdk import (
+    Duration,
+    Stack,
+    aws_applicationautoscaling,
+    aws_cloudwatch,
+    aws_ec2,
+    aws_ecs,
+    aws_elasticloadbalancingv2,
+    aws_iam,
+    aws_vpclattice,
+)
 from constructs import Construct
+from simple_networks_with_amazon_vpc_lattice_cdk.constants import VPC_LATTICE_IPV4_CIDR
+from simple_networks_with_amazon_vpc_lattice_cdk.ecs.ecs_sizing_profile import ECS_SIZING_PROFILES, EcsSizingProfile
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import (
+    LatticeServiceSpec,
+    LatticeTarget,
+    LatticeTargetGroupSpec,
+)
+from simple_networks_with_amazon_vpc_lattice_cdk.network.network_planner import NetworkPlanner
+
+CONTAINER_PORT: Final[int] = 80
+CONTAINER_PORT_NAME: Final[str] = 'ecs-http'
+DEFAULT_CONTAINER_IMAGE: Final[str] = 'amazon/amazon-ecs-sample'
 
 
 # pylint: disable=too-many-instance-attributes
 class EcsConstruct(Construct):
 
-    def __init__(self, scope: Construct, id_: str) -> None:
+    # pylint: disable=too-many-arguments
+    def __init__(self, scope: Construct, id_: str, *, use_alb: bool = False,
+                 sizing_profile: EcsSizingProfile = ECS_SIZING_PROFILES['small'], network_planner: NetworkPlanner | None = None,
+                 container_image: str = DEFAULT_CONTAINER_IMAGE) -> None:
         super().__init__(scope, id_)
         self.id_ = id_
         self.scope = scope
+        self.use_alb = use_alb
+        self.sizing_profile = sizing_profile
+        self.network_planner = network_planner or NetworkPlanner()
+        self.container_image = container_image
+        # Without a NAT gateway tasks can only pull through the ECR endpoints, e.g. from a pull-through cache of Docker Hub
+        if self.network_planner.nat_free and '.dkr.ecr.' not in container_image:
+            raise ValueError(f'{container_image} can\'t be pulled without a NAT gateway, use an ECR image')
 
         self.stack = Stack.of(self)
         self.region = self.stack.region
@@ -23,18 +57,29 @@ class EcsConstruct(Construct):
         self.fargate_task = self._build_fargate_task()
         self.container = self._add_container_to_the_task()
         self._add_port_mapping()
+        self.ecs_security_group = self._build_ecs_security_group()
         self.fargate_service = self._build_fargate_service()
+        self.scalable_target = self._build_scalable_target()
+        self._scale_on_cpu_utilization()
 
-        self.alb_security_group = self._build_alb_security_group()
-        self.alb = self._build_alb_for_fargate_service()
-        self._add_listener_to_alb()
+        if self.use_alb:
+            self.alb_security_group = self._build_alb_security_group()
+            self.alb = self._build_alb_for_fargate_service()
+            self._add_listener_to_alb()
+        else:
+            self.ecs_infrastructure_role = self._create_ecs_infrastructure_role()
+            self._allow_lattice_traffic_to_tasks()
 
     def _build_ecs_vpc(self) -> aws_ec2.Vpc:
-        return aws_ec2.Vpc(
-            self, 'EcsVpc', ip_addresses=aws_ec2.IpAddresses.cidr('10.0.0.0/16'), max_azs=2, nat_gateways=1, subnet_configuration=[
-                aws_ec2.SubnetConfiguration(name='EcsPublicSubnet', subnet_type=aws_ec2.SubnetType.PUBLIC, cidr_mask=24),
-                aws_ec2.SubnetConfiguration(name='EcsPrivateSubnet', subnet_type=aws_ec2.SubnetType.PRIVATE_WITH_EGRESS, cidr_mask=24)
-            ])
+        # Image layers are served from S3, pulling needs both ECR endpoints and the S3 gateway
+        interface_endpoints = {
+            'EcrApi': aws_ec2.InterfaceVpcEndpointAwsService.ECR,
+            'EcrDocker': aws_ec2.InterfaceVpcEndpointAwsService.ECR_DOCKER,
+            'Logs': aws_ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS,
+            'Sts': aws_ec2.InterfaceVpcEndpointAwsService.STS,
+        }
+        return self.network_planner.build_vpc(self, 'EcsVpc', max_azs=2, public_subnets=self.use_alb, private_subnets=True,
+                                              interface_endpoints=interface_endpoints, s3_gateway_endpoint=True)
 
     def _build_ecs_security_group(self) -> aws_ec2.SecurityGroup:
         security_group = aws_ec2.SecurityGroup(
@@ -72,18 +117,36 @@ class EcsConstruct(Construct):
 
         return role
 
+    def _create_ecs_infrastructure_role(self) -> aws_iam.Role:
+        # Lets ECS register and deregister task IPs in the Lattice target group as tasks start and stop
+        return aws_iam.Role(
+            self, 'EcsInfrastructureRole', assumed_by=aws_iam.ServicePrincipal('ecs.amazonaws.com'), managed_policies=[
+                aws_iam.ManagedPolicy.from_aws_managed_policy_name(managed_policy_name='AmazonECSInfrastructureRolePolicyForVpcLattice')
+            ])
+
     def _build_ecs_cluster(self) -> aws_ecs.Cluster:
-        return aws_ecs.Cluster(self, 'EcsCluster', vpc=self.ecs_vpc)
+        # Container Insights publishes RunningTaskCount, which the request count scaling policy divides by
+        return aws_ecs.Cluster(self, 'EcsCluster', vpc=self.ecs_vpc, container_insights_v2=aws_ecs.ContainerInsights.ENABLED)
 
     def _build_fargate_task(self) -> aws_ecs.FargateTaskDefinition:
-        return aws_ecs.FargateTaskDefinition(self, 'EcsFargateTask', cpu=256, memory_limit_mib=512, execution_role=self.ecs_execution_role,
-                                             task_role=self.ecs_task_role)
+        return aws_ecs.FargateTaskDefinition(
+            self, 'EcsFargateTask', cpu=self.sizing_profile.task.cpu, memory_limit_mib=self.sizing_profile.task.memory_limit_mib,
+            runtime_platform=aws_ecs.RuntimePlatform(cpu_architecture=self.sizing_profile.task.cpu_architecture,
+                                                     operating_system_family=aws_ecs.OperatingSystemFamily.LINUX),
+            execution_role=self.ecs_execution_role, task_role=self.ecs_task_role)
 
     def _add_container_to_the_task(self) -> aws_ecs.ContainerDefinition:
-        return self.fargate_task.add_container('EcsContainer', image=aws_ecs.ContainerImage.from_registry("amazon/amazon-ecs-sample"))
+        return self.fargate_task.add_container('EcsContainer', image=aws_ecs.ContainerImage.from_registry(self.container_image))
 
     def _add_port_mapping(self) -> None:
-        self.container.add_port_mappings(aws_ecs.PortMapping(container_port=80, host_port=80, protocol=aws_ecs.Protocol.TCP))
+        self.container.add_port_mappings(
+            aws_ecs.PortMapping(name=CONTAINER_PORT_NAME, container_port=CONTAINER_PORT, host_port=CONTAINER_PORT,
+                                protocol=aws_ecs.Protocol.TCP))
+
+    def _allow_lattice_traffic_to_tasks(self) -> None:
+        self.ecs_security_group.add_ingress_rule(
+            peer=aws_ec2.Peer.ipv4(VPC_LATTICE_IPV4_CIDR), description='inbound HTTP from VPC Lattice',
+            connection=aws_ec2.Port.tcp(CONTAINER_PORT))
 
     def _build_alb_security_group(self) -> aws_ec2.SecurityGroup:
         security_group = aws_ec2.SecurityGroup(
@@ -106,10 +169,100 @@ class EcsConstruct(Construct):
 
     def _build_fargate_service(self) -> aws_ecs.FargateService:
         return aws_ecs.FargateService(self, "EcsFargateService", task_definition=self.fargate_task, cluster=self.ecs_cluster,
-                                      desired_count=1, service_name="ecs-service")
+                                      desired_count=self.sizing_profile.scaling.min_task_count, service_name="ecs-service",
+                                      security_groups=[self.ecs_security_group], vpc_subnets=self.network_planner.private_subnets)
+
+    def _build_scalable_target(self) -> aws_applicationautoscaling.ScalableTarget:
+        return aws_applicationautoscaling.ScalableTarget(
+            self, 'EcsScalableTarget', service_namespace=aws_applicationautoscaling.ServiceNamespace.ECS,
+            resource_id=f'service/{self.ecs_cluster.cluster_name}/{self.fargate_service.service_name}',
+            scalable_dimension='ecs:service:DesiredCount', min_capacity=self.sizing_profile.scaling.min_task_count,
+            max_capacity=self.sizing_profile.scaling.max_task_count)
+
+    def _scale_on_cpu_utilization(self) -> None:
+        self.scalable_target.scale_to_track_metric(
+            'EcsCpuScaling', target_value=self.sizing_profile.scaling.target_cpu_utilization_percent,
+            predefined_metric=aws_applicationautoscaling.PredefinedMetric.ECS_SERVICE_AVERAGE_CPU_UTILIZATION,
+            scale_in_cooldown=Duration.seconds(self.sizing_profile.scaling.scale_in_cooldown_seconds),
+            scale_out_cooldown=Duration.seconds(self.sizing_profile.scaling.scale_out_cooldown_seconds))
 
     def _add_listener_to_alb(self) -> None:
         alb_listener = self.alb.add_listener('EcsAlbListener', port=80, open=False,
                                              protocol=aws_elasticloadbalancingv2.ApplicationProtocol.HTTP)
 
-        alb_listener.add_targets('ECS', port=80, targets=[self.fargate_service])
+        alb_target_group = alb_listener.add_targets('ECS', port=80, targets=[self.fargate_service])
+        self._scale_on_alb_request_count(alb_target_group)
+
+    def _scale_on_alb_request_count(self, alb_target_group: aws_elasticloadbalancingv2.ApplicationTargetGroup) -> None:
+        # Per-minute request count per target, the ALB publishes it ready to use
+        self.scalable_target.scale_to_track_metric(
+            'EcsRequestCountScaling', target_value=self.sizing_profile.scaling.target_requests_per_task_per_minute,
+            predefined_metric=aws_applicationautoscaling.PredefinedMetric.ALB_REQUEST_COUNT_PER_TARGET,
+            resource_label=f'{self.alb.load_balancer_full_name}/{alb_target_group.target_group_full_name}',
+            scale_in_cooldown=Duration.seconds(self.sizing_profile.scaling.scale_in_cooldown_seconds),
+            scale_out_cooldown=Duration.seconds(self.sizing_profile.scaling.scale_out_cooldown_seconds))
+
+    def _scale_on_lattice_request_count(self, target_group: aws_vpclattice.CfnTargetGroup) -> None:
+        # Lattice only publishes the total request count of the target group, so divide it by the running tasks ourselves
+        scaling_policy = aws_applicationautoscaling.CfnScalingPolicy
+        scaling_policy(
+            self, 'EcsRequestCountScaling', policy_name=f'{self.id_}EcsRequestCountScaling', policy_type='TargetTrackingScaling',
+            scaling_target_id=self.scalable_target.scalable_target_id,
+            target_tracking_scaling_policy_configuration=scaling_policy.TargetTrackingScalingPolicyConfigurationProperty(
+                target_value=self.sizing_profile.scaling.target_requests_per_task_per_minute,
+                scale_in_cooldown=self.sizing_profile.scaling.scale_in_cooldown_seconds,
+                scale_out_cooldown=self.sizing_profile.scaling.scale_out_cooldown_seconds,
+                customized_metric_specification=scaling_policy.CustomizedMetricSpecificationProperty(metrics=[
+                    scaling_policy.TargetTrackingMetricDataQueryProperty(
+                        id='requests', return_data=False, metric_stat=self._build_metric_stat('AWS/VpcLattice', 'RequestCount', 'Sum',
+                                                                                              {'TargetGroup': target_group.attr_id})),
+                    scaling_policy.TargetTrackingMetricDataQueryProperty(
+                        id='tasks', return_data=False, metric_stat=self._build_metric_stat(
+                            'ECS/ContainerInsights', 'RunningTaskCount', 'Average', {
+                                'ClusterName': self.ecs_cluster.cluster_name,
+                                'ServiceName': self.fargate_service.service_name
+                            })),
+                    scaling_policy.TargetTrackingMetricDataQueryProperty(id='requestspertask', expression='requests / tasks',
+                                                                         return_data=True),
+                ])))
+
+    @staticmethod
+    def _build_metric_stat(namespace: str, metric_name: str, stat: str,
+                           dimensions: dict[str, str]) -> aws_applicationautoscaling.CfnScalingPolicy.TargetTrackingMetricStatProperty:
+        scaling_policy = aws_applicationautoscaling.CfnScalingPolicy
+        return scaling_policy.TargetTrackingMetricStatProperty(
+            stat=stat, metric=scaling_policy.TargetTrackingMetricProperty(
+                namespace=namespace, metric_name=metric_name, dimensions=[
+                    scaling_policy.TargetTrackingMetricDimensionProperty(name=name, value=value) for name, value in dimensions.items()
+                ]))
+
+    def saturation_widgets(self) -> list[aws_cloudwatch.IWidget]:
+        running_tasks = aws_cloudwatch.Metric(
+            namespace='ECS/ContainerInsights', metric_name='RunningTaskCount', statistic='Average', dimensions_map={
+                'ClusterName': self.ecs_cluster.cluster_name,
+                'ServiceName': self.fargate_service.service_name
+            })
+        return [
+            aws_cloudwatch.GraphWidget(
+                title='ecs tasks', width=12, left=[
+                    self.fargate_service.metric_cpu_utilization(statistic='Maximum'),
+                    self.fargate_service.metric_memory_utilization(statistic='Maximum')
+                ], right=[running_tasks]),
+        ]
+
+    def lattice_service_spec(self) -> LatticeServiceSpec:
+        if self.use_alb:
+            return LatticeServiceSpec(
+                name='ecs', vpc=self.ecs_vpc,
+                target_group=LatticeTargetGroupSpec(target_type='ALB', targets=(LatticeTarget(id=self.alb.load_balancer_arn, port=80),)))
+        return LatticeServiceSpec(name='ecs', vpc=self.ecs_vpc,
+                                  target_group=LatticeTargetGroupSpec(target_type='IP', port=CONTAINER_PORT, name='ecsiptargetgroup'))
+
+    def attach_lattice_target_group(self, target_group: aws_vpclattice.CfnTargetGroup) -> None:
+        # ECS keeps the IP target group in sync with the running tasks, so no targets are listed on the target group itself
+        cfn_service: aws_ecs.CfnService = self.fargate_service.node.default_child
+        cfn_service.vpc_lattice_configurations = [
+            aws_ecs.CfnService.VpcLatticeConfigurationProperty(role_arn=self.ecs_infrastructure_role.role_arn,
+                                                               target_group_arn=target_group.attr_arn, port_name=CONTAINER_PORT_NAME)
+        ]
+        self._scale_on_lattice_request_count(target_group)
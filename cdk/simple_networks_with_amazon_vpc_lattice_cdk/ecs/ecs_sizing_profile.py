@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Final
+
+from aws_cdk import aws_ecs
+
+
+@dataclass(frozen=True)
+class EcsTaskSize:
+    cpu: int
+    memory_limit_mib: int
+    cpu_architecture: aws_ecs.CpuArchitecture
+
+
+@dataclass(frozen=True)
+class EcsScaling:
+    min_task_count: int
+    max_task_count: int
+    target_cpu_utilization_percent: int = 60
+    target_requests_per_task_per_minute: int = 3000
+    scale_in_cooldown_seconds: int = 300
+    scale_out_cooldown_seconds: int = 60
+
+
+@dataclass(frozen=True)
+class EcsSizingProfile:
+    task: EcsTaskSize
+    scaling: EcsScaling
+
+
+X86_64: Final[aws_ecs.CpuArchitecture] = aws_ecs.CpuArchitecture.X86_64
+ARM64: Final[aws_ecs.CpuArchitecture] = aws_ecs.CpuArchitecture.ARM64
+
+# ARM64 profiles need an image published for linux/arm64, the default amazon/amazon-ecs-sample image is x86_64 only
+ECS_SIZING_PROFILES: Final[dict[str, EcsSizingProfile]] = {
+    'small':
+        EcsSizingProfile(
+            EcsTaskSize(cpu=256, memory_limit_mib=512, cpu_architecture=X86_64),
+            EcsScaling(min_task_count=1, max_task_count=4, target_requests_per_task_per_minute=1500)),
+    'medium':
+        EcsSizingProfile(
+            EcsTaskSize(cpu=512, memory_limit_mib=1024, cpu_architecture=X86_64), EcsScaling(min_task_count=2, max_task_count=10)),
+    'medium-arm64':
+        EcsSizingProfile(
+            EcsTaskSize(cpu=512, memory_limit_mib=1024, cpu_architecture=ARM64), EcsScaling(min_task_count=2, max_task_count=10)),
+    'large':
+        EcsSizingProfile(
+            EcsTaskSize(cpu=1024, memory_limit_mib=2048, cpu_architecture=X86_64),
+            EcsScaling(min_task_count=2, max_task_count=20, target_requests_per_task_per_minute=6000)),
+    'large-arm64':
+        EcsSizingProfile(
+            EcsTaskSize(cpu=1024, memory_limit_mib=2048, cpu_architecture=ARM64),
+            EcsScaling(min_task_count=2, max_task_count=20, target_requests_per_task_per_minute=6000)),
+}
@@ -1,16 +1,33 @@
-from aws_cdk import RemovalPolicy, Stack, aws_ec2, aws_iam, aws_lambda
+from pathlib import Path
+from typing import Final
+
+from aws_cdk import Duration, RemovalPolicy, Stack, aws_applicationautoscaling, aws_cloudwatch, aws_ec2, aws_iam, aws_lambda
 from aws_cdk.aws_iam import Policy
-from aws_cdk.aws_lambda_python_alpha import PythonLayerVersion
 from constructs import Construct
+from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function.lambda_tuning import LambdaTuning
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import (
+    LatticeAuthSpec,
+    LatticeServiceSpec,
+    LatticeTarget,
+    LatticeTargetGroupSpec,
+)
+from simple_networks_with_amazon_vpc_lattice_cdk.network.network_planner import NetworkPlanner
+
+# Built by tools/build_lambda.py
+LAMBDA_CODE_DIR: Final[str] = '.build/lambdas/'
+COMMON_LAYER_DIR: Final[str] = '.build/common_layer'
 
 
 # pylint: disable=too-many-instance-attributes
 class LambdaConstruct(Construct):
 
-    def __init__(self, scope: Construct, id_: str) -> None:
+    def __init__(self, scope: Construct, id_: str, tuning: LambdaTuning = LambdaTuning(),
+                 network_planner: NetworkPlanner | None = None) -> None:
         super().__init__(scope, id_)
         self.id_ = id_
         self.scope = scope
+        self.tuning = tuning
+        self.network_planner = network_planner or NetworkPlanner()
 
         self.stack = Stack.of(self)
         self.region = self.stack.region
@@ -20,13 +37,18 @@ class LambdaConstruct(Construct):
         self.lambda_layer = self._build_common_layer()
         self.lambda_role = self._build_lambda_role()
         self.lambda_function = self._build_lambda()
+        self.lambda_alias = self._build_lambda_alias()
+        if self.tuning.provisioned_concurrency_min:
+            self._scale_provisioned_concurrency()
 
     def _build_lambda_vpc(self) -> aws_ec2.Vpc:
-        return aws_ec2.Vpc(
-            self, 'LambdaVpc', ip_addresses=aws_ec2.IpAddresses.cidr('10.0.0.0/16'), max_azs=2, nat_gateways=1, subnet_configuration=[
-                aws_ec2.SubnetConfiguration(name='LambdaPublicSubnet', subnet_type=aws_ec2.SubnetType.PUBLIC, cidr_mask=24),
-                aws_ec2.SubnetConfiguration(name='LambdaPrivateSubnet', subnet_type=aws_ec2.SubnetType.PRIVATE_WITH_EGRESS, cidr_mask=24)
-            ])
+        # Lattice is reached through the service network association, the endpoints cover the AWS APIs the handlers call
+        # (LatticeClient resolves services through the VPC Lattice API)
+        return self.network_planner.build_vpc(
+            self, 'LambdaVpc', max_azs=2, private_subnets=True, interface_endpoints={
+                'VpcLattice': aws_ec2.InterfaceVpcEndpointAwsService('vpc-lattice'),
+                'Sts': aws_ec2.InterfaceVpcEndpointAwsService.STS,
+            })
 
     def _build_lambda_role(self) -> aws_iam.Role:
         role = aws_iam.Role(
@@ -60,11 +82,15 @@ class LambdaConstruct(Construct):
 
         return role
 
-    def _build_common_layer(self) -> PythonLayerVersion:
-        return PythonLayerVersion(
+    def _build_common_layer(self) -> aws_lambda.LayerVersion | None:
+        # The layer is already pruned, stripped and precompiled, so it's uploaded as is instead of being bundled again.
+        # Nothing is left in it when the handlers only use runtime-provided packages
+        if not any(path.is_file() for path in Path(COMMON_LAYER_DIR, 'python').rglob('*')):
+            return None
+        return aws_lambda.LayerVersion(
             self,
             'LambdaCommonLayer',
-            entry='.build/common_layer',
+            code=aws_lambda.Code.from_asset(COMMON_LAYER_DIR),
             compatible_runtimes=[aws_lambda.Runtime.PYTHON_3_12],
             compatible_architectures=[aws_lambda.Architecture.ARM_64],
             removal_policy=RemovalPolicy.DESTROY,
@@ -76,11 +102,51 @@ class LambdaConstruct(Construct):
             'LambdaFunction',
             runtime=aws_lambda.Runtime.PYTHON_3_12,
             architecture=aws_lambda.Architecture.ARM_64,
-            code=aws_lambda.Code.from_asset('.build/lambdas/'),
+            code=aws_lambda.Code.from_asset(LAMBDA_CODE_DIR),
             handler='lambda_handlers.lambda_function.handle',
+            memory_size=self.tuning.memory_size_mib,
+            timeout=Duration.seconds(self.tuning.timeout_seconds),
+            snap_start=aws_lambda.SnapStartConf.ON_PUBLISHED_VERSIONS if self.tuning.snap_start else None,
             retry_attempts=0,
-            layers=[self.lambda_layer],
+            layers=[self.lambda_layer] if self.lambda_layer else [],
             vpc=self.lambda_vpc,
-            vpc_subnets=aws_ec2.SubnetSelection(subnet_type=aws_ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            vpc_subnets=self.network_planner.private_subnets,
             role=self.lambda_role,
         )
+
+    def _build_lambda_alias(self) -> aws_lambda.Alias:
+        # current_version publishes a new version whenever the code or configuration changes, SnapStart and
+        # provisioned concurrency only apply to published versions
+        return aws_lambda.Alias(self, 'LambdaAlias', alias_name='live', version=self.lambda_function.current_version,
+                                provisioned_concurrent_executions=self.tuning.provisioned_concurrency_min or None)
+
+    def _scale_provisioned_concurrency(self) -> None:
+        scalable_concurrency = self.lambda_alias.add_auto_scaling(min_capacity=self.tuning.provisioned_concurrency_min,
+                                                                  max_capacity=self.tuning.provisioned_concurrency_max)
+        scalable_concurrency.scale_on_utilization(utilization_target=self.tuning.provisioned_concurrency_utilization_target)
+        for schedule in self.tuning.provisioned_concurrency_schedules:
+            scalable_concurrency.scale_on_schedule(schedule.name,
+                                                   schedule=aws_applicationautoscaling.Schedule.expression(schedule.expression),
+                                                   min_capacity=schedule.min_capacity, max_capacity=schedule.max_capacity)
+
+    def saturation_widgets(self) -> list[aws_cloudwatch.IWidget]:
+        return [
+            aws_cloudwatch.GraphWidget(
+                title='lambda duration and concurrency', width=12, left=[self.lambda_alias.metric_duration(statistic='p99')], right=[
+                    self.lambda_alias.metric('ConcurrentExecutions', statistic='Maximum'),
+                    self.lambda_alias.metric('ProvisionedConcurrencySpilloverInvocations', statistic='Sum'),
+                    self.lambda_alias.metric_throttles(statistic='Sum'),
+                ]),
+            # Init duration is only reported in the REPORT lines of the function's logs
+            aws_cloudwatch.LogQueryWidget(
+                title='lambda cold starts', width=12, log_group_names=[f'/aws/lambda/{self.lambda_function.function_name}'], query_lines=[
+                    'filter @type = "REPORT" and ispresent(@initDuration)',
+                    'stats count() as coldStarts, pct(@initDuration, 99) as p99InitMs by bin(5m)',
+                ], view=aws_cloudwatch.LogQueryVisualizationType.LINE),
+        ]
+
+    def lattice_service_spec(self, allowed_source_vpcs: tuple[aws_ec2.IVpc, ...] = ()) -> LatticeServiceSpec:
+        return LatticeServiceSpec(
+            name='lambda', vpc=self.lambda_vpc,
+            target_group=LatticeTargetGroupSpec(target_type='LAMBDA', targets=(LatticeTarget(id=self.lambda_alias.function_arn),)),
+            auth=LatticeAuthSpec(auth_type='AWS_IAM', allowed_source_vpcs=allowed_source_vpcs))
@@ -0,0 +1,34 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ProvisionedConcurrencySchedule:
+    name: str
+    # Application Auto Scaling schedule expression, e.g. 'cron(0 7 ? * MON-FRI *)'
+    expression: str
+    min_capacity: int
+    max_capacity: int
+
+
+@dataclass(frozen=True)
+class LambdaTuning:
+    # CPU is allocated proportionally to memory, use tools/lambda_power_tuning.py to pick it
+    memory_size_mib: int = 512
+    timeout_seconds: int = 10
+    # Restores published versions from a snapshot taken after init, can't be combined with provisioned concurrency
+    snap_start: bool = False
+    # Provisioned concurrency of the live alias, 0 disables it
+    provisioned_concurrency_min: int = 0
+    provisioned_concurrency_max: int = 0
+    provisioned_concurrency_utilization_target: float = 0.7
+    provisioned_concurrency_schedules: tuple[ProvisionedConcurrencySchedule, ...] = ()
+
+    def __post_init__(self) -> None:
+        if not 128 <= self.memory_size_mib <= 10240:
+            raise ValueError(f'Lambda memory size {self.memory_size_mib} MiB is outside of 128-10240')
+        if self.snap_start and self.provisioned_concurrency_min:
+            raise ValueError('SnapStart and provisioned concurrency can not be used together')
+        if self.provisioned_concurrency_min > self.provisioned_concurrency_max:
+            raise ValueError('Minimum provisioned concurrency is higher than the maximum')
+        if self.provisioned_concurrency_schedules and not self.provisioned_concurrency_min:
+            raise ValueError('Provisioned concurrency schedules need provisioned concurrency')
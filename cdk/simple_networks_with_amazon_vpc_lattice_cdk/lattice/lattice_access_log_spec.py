@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+from aws_cdk import aws_logs
+
+
+# The service network subscription logs every request made through the network. Subscribing the services as well logs
+# their requests a second time, but also the ones coming from other service networks the services may be shared with
+@dataclass(frozen=True)
+class LatticeAccessLogSpec:
+    to_s3: bool = True
+    to_cloudwatch_logs: bool = False
+    service_network: bool = True
+    services: bool = False
+    s3_expiration_days: int = 90
+    log_group_retention: aws_logs.RetentionDays = aws_logs.RetentionDays.ONE_MONTH
+
+    def __post_init__(self) -> None:
+        if (self.service_network or self.services) and not (self.to_s3 or self.to_cloudwatch_logs):
+            raise ValueError('Access logs need S3 or CloudWatch Logs as destination')
+        if self.s3_expiration_days < 1:
+            raise ValueError('Access logs have to be kept in S3 for at least a day')
+
+    @property
+    def enabled(self) -> bool:
+        return self.service_network or self.services
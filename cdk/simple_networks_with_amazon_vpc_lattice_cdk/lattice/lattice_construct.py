@@ -1,42 +1,67 @@
-from aws_cdk import Stack, aws_vpclattice
+from collections.abc import Sequence
+
+from aws_cdk import Duration, RemovalPolicy, Stack, aws_ec2, aws_iam, aws_logs, aws_s3, aws_vpclattice
 from constructs import Construct
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_access_log_spec import LatticeAccessLogSpec
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import (
+    LatticeHeaderMatch,
+    LatticeRouteSpec,
+    LatticeServiceSpec,
+    LatticeTargetGroupSpec,
+    LatticeWeightedTarget,
+)
 
 
+# Logical IDs and names follow the ones of the former hand-written resources, so existing stacks are updated in place
 # pylint: disable=too-many-instance-attributes
 class LatticeConstruct(Construct):
 
-    def __init__(self, scope: Construct, id_: str) -> None:
+    def __init__(self, scope: Construct, id_: str, services: Sequence[LatticeServiceSpec],
+                 access_logs: LatticeAccessLogSpec = LatticeAccessLogSpec()) -> None:
         super().__init__(scope, id_)
         self.id_ = id_
         self.scope = scope
+        self.service_specs = self._index_service_specs(services)
+        self.access_logs = access_logs
 
         self.stack = Stack.of(self)
         self.region = self.stack.region
         self.account_id = self.stack.account
 
         self.service_network = self._build_service_network()
-
-        self._associate_lattice_network_with_ec2_vpc()
-        self._associate_lattice_network_with_ecs_vpc()
-        self._associate_lattice_network_with_lambda_vpc()
-
-        self.service_for_ec2 = self._build_service_for_ec2()
-        self.service_for_lambda_function = self._build_service_for_lambda_function()
-        self.service_for_ecs_cluster = self._build_service_ecs_cluster()
-
-        self._associate_ec2_service_with_lattice_network()
-        self._associate_ecs_service_with_lattice_network()
-        self._associate_lambda_service_with_lattice_network()
-
-        self.target_group_for_ec2 = self._build_target_group_for_ec2()
-        self.target_group_for_ecs = self._build_target_group_for_ecs()
-        self.target_group_for_lambda = self._build_target_group_for_lambda()
-
-        self.listener_for_ec2 = self._build_listener_for_ec2()
-        self.listener_for_ecs = self._build_listener_for_ecs()
-        self.listener_for_lambda = self._build_listener_for_lambda()
-
-        self._add_auth_policy_for_lambda()
+        # Resolved once, every resource below references them
+        self.service_network_arn = self.service_network.attr_arn
+        self.vpc_ids = self._associate_lattice_network_with_vpcs()
+
+        self.access_log_bucket: aws_s3.Bucket | None = None
+        self.access_log_group: aws_logs.LogGroup | None = None
+        if access_logs.enabled:
+            self._build_access_log_destinations()
+        if access_logs.service_network:
+            self._subscribe_to_access_logs('latticenetwork', self.service_network_arn)
+
+        # Routes may forward to any target group, so all of them exist before the first listener
+        self.target_groups = {name: self._build_target_group(spec) for name, spec in self.service_specs.items()}
+        self.target_group_arns = {name: target_group.attr_arn for name, target_group in self.target_groups.items()}
+
+        self.services: dict[str, aws_vpclattice.CfnService] = {}
+        self.listeners: dict[str, aws_vpclattice.CfnListener] = {}
+        for spec in self.service_specs.values():
+            if not spec.target_group_only:
+                self._build_lattice_service(spec)
+
+    @staticmethod
+    def _index_service_specs(services: Sequence[LatticeServiceSpec]) -> dict[str, LatticeServiceSpec]:
+        service_specs: dict[str, LatticeServiceSpec] = {}
+        for spec in services:
+            if spec.name in service_specs:
+                raise ValueError(f'Lattice service {spec.name} is defined more than once')
+            service_specs[spec.name] = spec
+        for spec in service_specs.values():
+            unknown_services = spec.routing.forwarded_services() - service_specs.keys()
+            if unknown_services:
+                raise ValueError(f'Lattice service {spec.name} forwards to unknown services {sorted(unknown_services)}')
+        return service_specs
 
     def _build_service_network(self) -> aws_vpclattice.CfnServiceNetwork:
         return aws_vpclattice.CfnServiceNetwork(
@@ -45,110 +70,174 @@ class LatticeConstruct(Construct):
             name="latticenetwork",
         )
 
-    def _associate_lattice_network_with_ec2_vpc(self) -> None:
-        aws_vpclattice.CfnServiceNetworkVpcAssociation(self, "ec2vpcassociation", service_network_identifier=self.service_network.attr_arn,
-                                                       vpc_identifier=self.scope.ec2_instance.ec2_vpc.vpc_id)
-
-    def _associate_lattice_network_with_ecs_vpc(self) -> None:
-        aws_vpclattice.CfnServiceNetworkVpcAssociation(self, "ecsvpcassociation", service_network_identifier=self.service_network.attr_arn,
-                                                       vpc_identifier=self.scope.ecs_cluster.ecs_vpc.vpc_id)
-
-    def _associate_lattice_network_with_lambda_vpc(self) -> None:
-        aws_vpclattice.CfnServiceNetworkVpcAssociation(self, "lambdavpcassociation",
-                                                       service_network_identifier=self.service_network.attr_arn,
-                                                       vpc_identifier=self.scope.lambda_function.lambda_vpc.vpc_id)
-
-    def _build_service_for_ec2(self) -> aws_vpclattice.CfnService:
-        return aws_vpclattice.CfnService(self, "ec2service")
-
-    def _build_service_for_lambda_function(self) -> aws_vpclattice.CfnService:
-        return aws_vpclattice.CfnService(self, "lambdaservice", auth_type='AWS_IAM')
-
-    def _build_service_ecs_cluster(self) -> aws_vpclattice.CfnService:
-        return aws_vpclattice.CfnService(self, "ecsservice")
-
-    def _associate_ec2_service_with_lattice_network(self) -> None:
-        aws_vpclattice.CfnServiceNetworkServiceAssociation(self, "ec2serviceenetworkassociation",
-                                                           service_identifier=self.service_for_ec2.attr_arn,
-                                                           service_network_identifier=self.service_network.attr_arn)
-
-    def _associate_lambda_service_with_lattice_network(self) -> None:
-        aws_vpclattice.CfnServiceNetworkServiceAssociation(self, "lambdaserviceenetworkassociation",
-                                                           service_identifier=self.service_for_lambda_function.attr_arn,
-                                                           service_network_identifier=self.service_network.attr_arn)
-
-    def _associate_ecs_service_with_lattice_network(self) -> None:
-        aws_vpclattice.CfnServiceNetworkServiceAssociation(self, "ecsserviceenetworkassociation",
-                                                           service_identifier=self.service_for_ecs_cluster.attr_arn,
-                                                           service_network_identifier=self.service_network.attr_arn)
-
-    def _build_target_group_for_ec2(self) -> aws_vpclattice.CfnTargetGroup:
-        return aws_vpclattice.CfnTargetGroup(
-            self, "ec2targetgroup", type="INSTANCE", name="ec2targetgroup", config=aws_vpclattice.CfnTargetGroup.TargetGroupConfigProperty(
-                port=80,
-                protocol="HTTP",
-                vpc_identifier=self.scope.ec2_instance.ec2_vpc.vpc_id,
-            ), targets=[aws_vpclattice.CfnTargetGroup.TargetProperty(id=self.scope.ec2_instance.ec2_instance.instance_id, port=80)])
-
-    def _build_target_group_for_ecs(self) -> aws_vpclattice.CfnTargetGroup:
+    def _associate_lattice_network_with_vpcs(self) -> dict[str, str]:
+        # Many services usually share a VPC, each VPC is associated only once and named after the first service living in it
+        vpcs = [(spec.vpc, spec.name) for spec in self.service_specs.values()]
+        vpcs += [(vpc, vpc.node.id.lower()) for spec in self.service_specs.values() for vpc in spec.auth.allowed_source_vpcs]
+        vpc_ids: dict[str, str] = {}
+        for vpc, association_name in vpcs:
+            vpc_path = vpc.node.path
+            if vpc_path in vpc_ids:
+                continue
+            vpc_ids[vpc_path] = vpc.vpc_id
+            aws_vpclattice.CfnServiceNetworkVpcAssociation(self, f'{association_name}vpcassociation',
+                                                           service_network_identifier=self.service_network_arn,
+                                                           vpc_identifier=vpc_ids[vpc_path])
+        return vpc_ids
+
+    def _build_lattice_service(self, spec: LatticeServiceSpec) -> None:
+        service = aws_vpclattice.CfnService(self, f'{spec.name}service', auth_type=spec.auth.auth_type,
+                                            custom_domain_name=spec.listener.custom_domain_name,
+                                            certificate_arn=spec.listener.certificate_arn)
+        service_arn = service.attr_arn
+        aws_vpclattice.CfnServiceNetworkServiceAssociation(self, f'{spec.name}serviceenetworkassociation', service_identifier=service_arn,
+                                                           service_network_identifier=self.service_network_arn)
+        self.services[spec.name] = service
+        listener = self._build_listener(spec, service_arn)
+        self.listeners[spec.name] = listener
+        listener_arn = listener.attr_arn
+        for route in spec.routing.routes:
+            self._build_rule(spec, route, service_arn, listener_arn)
+        if spec.auth.allowed_source_vpcs:
+            self._add_source_vpc_auth_policy(spec, service_arn)
+        if self.access_logs.services:
+            self._subscribe_to_access_logs(spec.name, service_arn)
+
+    def _build_access_log_destinations(self) -> None:
+        # Lattice hands access logs to the log delivery service, which needs these grants to write them
+        log_delivery = aws_iam.ServicePrincipal('delivery.logs.amazonaws.com')
+        same_account = {'aws:SourceAccount': self.account_id}
+        if self.access_logs.to_s3:
+            self.access_log_bucket = aws_s3.Bucket(
+                self, 'latticeaccesslogsbucket', encryption=aws_s3.BucketEncryption.S3_MANAGED,
+                block_public_access=aws_s3.BlockPublicAccess.BLOCK_ALL, enforce_ssl=True,
+                lifecycle_rules=[aws_s3.LifecycleRule(expiration=Duration.days(self.access_logs.s3_expiration_days))],
+                removal_policy=RemovalPolicy.DESTROY, auto_delete_objects=True)
+            self.access_log_bucket.add_to_resource_policy(
+                aws_iam.PolicyStatement(principals=[log_delivery], actions=['s3:PutObject'],
+                                        resources=[self.access_log_bucket.arn_for_objects(f'AWSLogs/{self.account_id}/*')],
+                                        conditions={'StringEquals': {
+                                            's3:x-amz-acl': 'bucket-owner-full-control',
+                                            **same_account
+                                        }}))
+            self.access_log_bucket.add_to_resource_policy(
+                aws_iam.PolicyStatement(principals=[log_delivery], actions=['s3:GetBucketAcl'],
+                                        resources=[self.access_log_bucket.bucket_arn], conditions={'StringEquals': same_account}))
+        if self.access_logs.to_cloudwatch_logs:
+            # Vended log groups don't count against the size limit of the account's log resource policies
+            self.access_log_group = aws_logs.LogGroup(self, 'latticeaccessloggroup',
+                                                      log_group_name=f'/aws/vendedlogs/vpclattice/{self.stack.stack_name}',
+                                                      retention=self.access_logs.log_group_retention, removal_policy=RemovalPolicy.DESTROY)
+            self.access_log_group.add_to_resource_policy(
+                aws_iam.PolicyStatement(principals=[log_delivery], actions=['logs:CreateLogStream', 'logs:PutLogEvents'],
+                                        resources=[self.access_log_group.log_group_arn], conditions={'StringEquals': same_account}))
+
+    def _subscribe_to_access_logs(self, name: str, resource_arn: str) -> None:
+        # A resource takes one subscription per kind of destination
+        destinations = {'s3': self.access_log_bucket, 'logs': self.access_log_group}
+        for kind, destination in destinations.items():
+            if destination is None:
+                continue
+            destination_arn = destination.bucket_arn if kind == 's3' else destination.log_group_arn
+            subscription = aws_vpclattice.CfnAccessLogSubscription(self, f'{name}accesslogs{kind}', destination_arn=destination_arn,
+                                                                   resource_identifier=resource_arn)
+            # The destination's resource policy has to be in place before Lattice starts delivering
+            subscription.node.add_dependency(destination)
+
+    def _get_vpc_id(self, vpc: aws_ec2.IVpc) -> str:
+        return self.vpc_ids[vpc.node.path]
+
+    def _build_target_group(self, spec: LatticeServiceSpec) -> aws_vpclattice.CfnTargetGroup:
+        name = spec.get_target_group_name()
+        target_group = spec.target_group
+        targets = [aws_vpclattice.CfnTargetGroup.TargetProperty(id=target.id, port=target.port) for target in target_group.targets] or None
+        if target_group.target_type == 'LAMBDA':
+            return aws_vpclattice.CfnTargetGroup(self, name, type=target_group.target_type, name=name, targets=targets)
         return aws_vpclattice.CfnTargetGroup(
-            self, "ecstargetgroup", type="ALB", name="ecstargetgroup", config=aws_vpclattice.CfnTargetGroup.TargetGroupConfigProperty(
-                port=80,
-                protocol="HTTP",
-                vpc_identifier=self.scope.ecs_cluster.ecs_vpc.vpc_id,
-            ), targets=[aws_vpclattice.CfnTargetGroup.TargetProperty(id=self.scope.ecs_cluster.alb.load_balancer_arn, port=80)])
-
-    def _build_target_group_for_lambda(self) -> aws_vpclattice.CfnTargetGroup:
-        return aws_vpclattice.CfnTargetGroup(
-            self, "lambdatargetgroup", type="LAMBDA", name="lambdatargetgroup",
-            targets=[aws_vpclattice.CfnTargetGroup.TargetProperty(id=self.scope.lambda_function.lambda_function.function_arn)])
-
-    def _build_listener_for_ec2(self) -> aws_vpclattice.CfnListener:
-        return aws_vpclattice.CfnListener(
             self,
-            "ec2listener",
-            default_action=aws_vpclattice.CfnListener.DefaultActionProperty(
-                forward=aws_vpclattice.CfnListener.ForwardProperty(target_groups=[
-                    aws_vpclattice.CfnListener.WeightedTargetGroupProperty(target_group_identifier=self.target_group_for_ec2.attr_arn,
-                                                                           weight=100)
-                ])),
-            protocol="HTTP",
-            port=80,
-            service_identifier=self.service_for_ec2.attr_arn,
+            name,
+            type=target_group.target_type,
+            name=name,
+            config=aws_vpclattice.CfnTargetGroup.TargetGroupConfigProperty(
+                port=target_group.port,
+                protocol=target_group.protocol,
+                protocol_version=target_group.protocol_version,
+                ip_address_type='IPV4' if target_group.target_type == 'IP' else None,
+                vpc_identifier=self._get_vpc_id(spec.vpc),
+                # ALB targets are health checked by the ALB itself
+                health_check=self._build_health_check(target_group) if target_group.target_type != 'ALB' else None,
+            ),
+            targets=targets)
+
+    @staticmethod
+    def _build_health_check(target_group: LatticeTargetGroupSpec) -> aws_vpclattice.CfnTargetGroup.HealthCheckConfigProperty:
+        health_check = target_group.health_check
+        if not health_check.enabled:
+            return aws_vpclattice.CfnTargetGroup.HealthCheckConfigProperty(enabled=False)
+        return aws_vpclattice.CfnTargetGroup.HealthCheckConfigProperty(
+            enabled=True,
+            path=health_check.path,
+            health_check_interval_seconds=health_check.thresholds.interval_seconds,
+            health_check_timeout_seconds=health_check.thresholds.timeout_seconds,
+            healthy_threshold_count=health_check.thresholds.healthy_threshold,
+            unhealthy_threshold_count=health_check.thresholds.unhealthy_threshold,
+            matcher=aws_vpclattice.CfnTargetGroup.MatcherProperty(http_code=health_check.matcher),
+            port=health_check.port or target_group.port,
+            protocol=health_check.protocol or target_group.protocol,
+            protocol_version=health_check.protocol_version or
+            ('HTTP2' if target_group.protocol_version == 'GRPC' else target_group.protocol_version),
         )
 
-    def _build_listener_for_ecs(self) -> aws_vpclattice.CfnListener:
+    def _build_listener(self, spec: LatticeServiceSpec, service_arn: str) -> aws_vpclattice.CfnListener:
+        default_forward = spec.routing.default_forward or (LatticeWeightedTarget(service=spec.name),)
+        target_groups = [
+            aws_vpclattice.CfnListener.WeightedTargetGroupProperty(target_group_identifier=self.target_group_arns[target.service],
+                                                                   weight=target.weight) for target in default_forward
+        ]
         return aws_vpclattice.CfnListener(
             self,
-            "ecslistener",
+            f'{spec.name}listener',
             default_action=aws_vpclattice.CfnListener.DefaultActionProperty(
-                forward=aws_vpclattice.CfnListener.ForwardProperty(target_groups=[
-                    aws_vpclattice.CfnListener.WeightedTargetGroupProperty(target_group_identifier=self.target_group_for_ecs.attr_arn,
-                                                                           weight=100)
-                ])),
-            protocol="HTTP",
-            port=80,
-            service_identifier=self.service_for_ecs_cluster.attr_arn,
+                forward=aws_vpclattice.CfnListener.ForwardProperty(target_groups=target_groups)),
+            protocol=spec.listener.protocol,
+            port=spec.listener.get_port(),
+            service_identifier=service_arn,
         )
 
-    def _build_listener_for_lambda(self) -> aws_vpclattice.CfnListener:
-        return aws_vpclattice.CfnListener(
+    def _build_rule(self, spec: LatticeServiceSpec, route: LatticeRouteSpec, service_arn: str, listener_arn: str) -> aws_vpclattice.CfnRule:
+        name = f'{spec.name}rule{route.priority}'
+        return aws_vpclattice.CfnRule(
             self,
-            "lambdalistener",
-            default_action=aws_vpclattice.CfnListener.DefaultActionProperty(
-                forward=aws_vpclattice.CfnListener.ForwardProperty(target_groups=[
-                    aws_vpclattice.CfnListener.WeightedTargetGroupProperty(target_group_identifier=self.target_group_for_lambda.attr_arn,
-                                                                           weight=100)
+            name,
+            name=name,
+            priority=route.priority,
+            match=aws_vpclattice.CfnRule.MatchProperty(
+                http_match=aws_vpclattice.CfnRule.HttpMatchProperty(
+                    method=route.method,
+                    path_match=aws_vpclattice.CfnRule.PathMatchProperty(
+                        match=aws_vpclattice.CfnRule.PathMatchTypeProperty(
+                            prefix=route.path_prefix)) if route.path_prefix is not None else None,
+                    header_matches=[self._build_header_match(header) for header in route.headers] or None,
+                )),
+            action=aws_vpclattice.CfnRule.ActionProperty(
+                forward=aws_vpclattice.CfnRule.ForwardProperty(target_groups=[
+                    aws_vpclattice.CfnRule.WeightedTargetGroupProperty(target_group_identifier=self.target_group_arns[target.service],
+                                                                       weight=target.weight) for target in route.forward
                 ])),
-            protocol="HTTP",
-            port=80,
-            service_identifier=self.service_for_lambda_function.attr_arn,
+            listener_identifier=listener_arn,
+            service_identifier=service_arn,
         )
 
-    def _add_auth_policy_for_lambda(self) -> None:
-        # Allow calls to this Lambda only from the EC2
+    @staticmethod
+    def _build_header_match(header: LatticeHeaderMatch) -> aws_vpclattice.CfnRule.HeaderMatchProperty:
+        return aws_vpclattice.CfnRule.HeaderMatchProperty(
+            name=header.name, case_sensitive=header.case_sensitive,
+            match=aws_vpclattice.CfnRule.HeaderMatchTypeProperty(**{header.match_type: header.value}))
+
+    def _add_source_vpc_auth_policy(self, spec: LatticeServiceSpec, service_arn: str) -> None:
+        source_vpc_ids = [self._get_vpc_id(vpc) for vpc in spec.auth.allowed_source_vpcs]
         aws_vpclattice.CfnAuthPolicy(
-            self, "lambdaserviceauthpolicy", policy={
+            self, f'{spec.name}serviceauthpolicy', policy={
                 "Version":
                     "2012-10-17",
                 "Statement": [{
@@ -158,8 +247,8 @@ class LatticeConstruct(Construct):
                     "Resource": "*",
                     "Condition": {
                         "StringEquals": {
-                            "vpc-lattice-svcs:SourceVpc": f'{self.scope.ec2_instance.ec2_vpc.vpc_id}'
+                            "vpc-lattice-svcs:SourceVpc": source_vpc_ids[0] if len(source_vpc_ids) == 1 else source_vpc_ids
                         }
                     }
                 }]
-            }, resource_identifier=self.service_for_lambda_function.attr_arn)
+            }, resource_identifier=service_arn)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from typing import Literal
+
+from aws_cdk import aws_ec2
+
+LatticeTargetType = Literal['INSTANCE', 'IP', 'ALB', 'LAMBDA']
+LatticeAuthType = Literal['NONE', 'AWS_IAM']
+LatticeProtocol = Literal['HTTP', 'HTTPS']
+LatticeProtocolVersion = Literal['HTTP1', 'HTTP2', 'GRPC']
+
+
+@dataclass(frozen=True)
+class LatticeTarget:
+    id: str
+    port: int | None = None
+
+
+# Lattice defaults to a 30s interval and 5 failed checks, which keeps a failing target in rotation for minutes
+@dataclass(frozen=True)
+class LatticeHealthCheckThresholds:
+    interval_seconds: int = 10
+    timeout_seconds: int = 5
+    healthy_threshold: int = 2
+    unhealthy_threshold: int = 2
+
+    def __post_init__(self) -> None:
+        if self.timeout_seconds >= self.interval_seconds:
+            raise ValueError('Health check timeout has to be shorter than its interval')
+
+
+@dataclass(frozen=True)
+class LatticeHealthCheckSpec:
+    enabled: bool = True
+    path: str = '/'
+    thresholds: LatticeHealthCheckThresholds = LatticeHealthCheckThresholds()
+    # Single code or range, e.g. '200' or '200-299'
+    matcher: str = '200-399'
+    # The target group's port and protocol when not set
+    port: int | None = None
+    protocol: LatticeProtocol | None = None
+    # gRPC targets can't be health checked over GRPC, HTTP2 is used for them when not set
+    protocol_version: Literal['HTTP1', 'HTTP2'] | None = None
+
+
+@dataclass(frozen=True)
+class LatticeWeightedTarget:
+    # Name of the service spec whose target group receives the traffic
+    service: str
+    weight: int = 100
+
+
+@dataclass(frozen=True)
+class LatticeHeaderMatch:
+    name: str
+    value: str
+    match_type: Literal['exact', 'prefix', 'contains'] = 'exact'
+    case_sensitive: bool = False
+
+
+@dataclass(frozen=True)
+class LatticeRouteSpec:
+    # 1 (evaluated first) to 100, unique within a listener
+    priority: int
+    forward: tuple[LatticeWeightedTarget, ...]
+    path_prefix: str | None = None
+    method: str | None = None
+    headers: tuple[LatticeHeaderMatch, ...] = ()
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.priority <= 100:
+            raise ValueError(f'Route priority {self.priority} is outside of 1-100')
+        if not self.forward:
+            raise ValueError(f'Route with priority {self.priority} has no target to forward to')
+        if self.path_prefix is None and self.method is None and not self.headers:
+            raise ValueError(f'Route with priority {self.priority} matches nothing, use default_forward instead')
+
+
+@dataclass(frozen=True)
+class LatticeTargetGroupSpec:
+    target_type: LatticeTargetType
+    # Empty when the targets register themselves (ECS tasks, Auto Scaling group instances)
+    targets: tuple[LatticeTarget, ...] = ()
+    # Port, protocol and protocol version Lattice uses to talk to the targets
+    port: int = 80
+    protocol: LatticeProtocol = 'HTTP'
+    protocol_version: LatticeProtocolVersion = 'HTTP1'
+    health_check: LatticeHealthCheckSpec = LatticeHealthCheckSpec()
+    # Defaults to <service name>targetgroup
+    name: str | None = None
+
+
+# Port and protocol clients connect to, the port defaults to 80 for HTTP and 443 for HTTPS.
+# HTTPS listeners negotiate HTTP/2 with clients, use the Lattice generated domain unless a custom domain and certificate are given
+@dataclass(frozen=True)
+class LatticeListenerSpec:
+    protocol: LatticeProtocol = 'HTTP'
+    port: int | None = None
+    custom_domain_name: str | None = None
+    certificate_arn: str | None = None
+
+    def __post_init__(self) -> None:
+        if self.certificate_arn and not self.custom_domain_name:
+            raise ValueError('Listener has a certificate but no custom domain name')
+
+    def get_port(self) -> int:
+        if self.port is not None:
+            return self.port
+        return 443 if self.protocol == 'HTTPS' else 80
+
+
+@dataclass(frozen=True)
+class LatticeAuthSpec:
+    auth_type: LatticeAuthType = 'NONE'
+    # Only callers from these VPCs may invoke the service, requires AWS_IAM auth
+    allowed_source_vpcs: tuple[aws_ec2.IVpc, ...] = ()
+
+    def __post_init__(self) -> None:
+        if self.allowed_source_vpcs and self.auth_type != 'AWS_IAM':
+            raise ValueError('Restricting source VPCs needs auth_type AWS_IAM')
+
+
+@dataclass(frozen=True)
+class LatticeRoutingSpec:
+    # Split of the traffic no route matched, defaults to 100% to the service's own target group
+    default_forward: tuple[LatticeWeightedTarget, ...] = ()
+    routes: tuple[LatticeRouteSpec, ...] = ()
+
+    def __post_init__(self) -> None:
+        priorities = [route.priority for route in self.routes]
+        if len(priorities) != len(set(priorities)):
+            raise ValueError('Several routes have the same priority')
+
+    def forwarded_services(self) -> set[str]:
+        return {target.service for target in self.default_forward} | {target.service for route in self.routes for target in route.forward}
+
+
+@dataclass(frozen=True)
+class LatticeServiceSpec:
+    name: str
+    # VPC of the backend, it gets associated with the service network. Lambda targets only use it for the association
+    vpc: aws_ec2.IVpc
+    target_group: LatticeTargetGroupSpec
+    listener: LatticeListenerSpec = LatticeListenerSpec()
+    auth: LatticeAuthSpec = LatticeAuthSpec()
+    routing: LatticeRoutingSpec = LatticeRoutingSpec()
+    # Only build the target group, e.g. for a canary revision that gets traffic through the routes of another service
+    target_group_only: bool = False
+
+    def __post_init__(self) -> None:
+        if self.target_group.protocol_version == 'GRPC' and self.listener.protocol != 'HTTPS':
+            raise ValueError(f'Service {self.name} uses GRPC targets, which needs an HTTPS listener')
+
+    def get_target_group_name(self) -> str:
+        return self.target_group.name or f'{self.name}targetgroup'
@@ -0,0 +1,124 @@
+from collections.abc import Sequence
+
+from aws_cdk import Duration, aws_cloudwatch, aws_cloudwatch_actions, aws_sns, aws_sns_subscriptions
+from constructs import Construct
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_construct import LatticeConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.monitoring.lattice_slo import LatticeSlo
+
+LATTICE_NAMESPACE = 'AWS/VpcLattice'
+LATENCY_PERCENTILES = ('p50', 'p90', 'p99')
+
+
+# One dashboard row and a latency and an error rate alarm for every service LatticeConstruct built, so services added to
+# the stack's specs are monitored without touching this construct
+class LatticeMonitoringConstruct(Construct):
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        lattice: LatticeConstruct,
+        default_slo: LatticeSlo = LatticeSlo(),
+        slos: dict[str, LatticeSlo] | None = None,
+        saturation_widgets: dict[str, Sequence[aws_cloudwatch.IWidget]] | None = None,
+        alarm_email: str | None = None,
+    ) -> None:
+        super().__init__(scope, id_)
+        self.id_ = id_
+        self.scope = scope
+        self.lattice = lattice
+        self.slos = {name: (slos or {}).get(name, default_slo) for name in lattice.services}
+
+        self.alarm_topic = self._build_alarm_topic(alarm_email)
+        self.alarms: list[aws_cloudwatch.Alarm] = []
+        # Widgets of the backends (CPU, task count, cold starts...) are shown next to the Lattice metrics of their service
+        rows = [self._build_service_row(name, (saturation_widgets or {}).get(name, ())) for name in lattice.services]
+        self.dashboard = aws_cloudwatch.Dashboard(self, 'LatticeDashboard', default_interval=Duration.hours(3))
+        self.dashboard.add_widgets(aws_cloudwatch.AlarmStatusWidget(title='Lattice SLOs', alarms=self.alarms, width=24, height=3))
+        for row in rows:
+            self.dashboard.add_widgets(*row)
+
+    def _build_alarm_topic(self, alarm_email: str | None) -> aws_sns.Topic:
+        topic = aws_sns.Topic(self, 'LatticeAlarmTopic')
+        if alarm_email:
+            topic.add_subscription(aws_sns_subscriptions.EmailSubscription(alarm_email))
+        return topic
+
+    def _build_service_row(self, name: str, saturation_widgets: Sequence[aws_cloudwatch.IWidget]) -> list[aws_cloudwatch.IWidget]:
+        slo = self.slos[name]
+        period = Duration.seconds(slo.period_seconds)
+        service_dimensions = {'Service': self.lattice.services[name].attr_id}
+        spec = self.lattice.service_specs[name]
+        # The service's own target group, unless default_forward replaces it, and every one its routes forward to
+        target_groups = {
+            target_group: {
+                'TargetGroup': self.lattice.target_groups[target_group].attr_id
+            } for target_group in sorted(spec.routing.forwarded_services() | (set() if spec.routing.default_forward else {name}))
+        }
+
+        requests = self._metric('TotalRequestCount', service_dimensions, 'Sum', period, label='requests')
+        request_time = {
+            percentile: self._metric('RequestTime', service_dimensions, percentile, period, label=f'RequestTime {percentile}')
+            for percentile in LATENCY_PERCENTILES
+        }
+        error_rates = {
+            status:
+                aws_cloudwatch.MathExpression(
+                    # Both rates are drawn on one graph, where an id can only stand for one metric
+                    expression=f'IF(requests > 0, 100 * errors{status.lower()} / requests, 0)',
+                    label=f'{status} %',
+                    period=period,
+                    using_metrics={
+                        'requests': requests,
+                        f'errors{status.lower()}': self._metric(f'HTTPCode_{status}_Count', service_dimensions, 'Sum', period)
+                    }) for status in ('4XX', '5XX')
+        }
+        self._add_alarms(name, slo, request_time['p99'], error_rates['5XX'])
+
+        return [
+            aws_cloudwatch.TextWidget(markdown=f'## {name}', width=24, height=1),
+            aws_cloudwatch.GraphWidget(
+                title=f'{name} requests', width=6, left=[requests] + [
+                    self._metric('RequestCount', dimensions, 'Sum', period, label=target_group)
+                    for target_group, dimensions in target_groups.items()
+                ]),
+            aws_cloudwatch.GraphWidget(title=f'{name} RequestTime (ms)', width=6, left=list(request_time.values()),
+                                       left_annotations=[aws_cloudwatch.HorizontalAnnotation(value=slo.p99_latency_ms, label='p99 SLO')]),
+            aws_cloudwatch.GraphWidget(
+                title=f'{name} TargetResponseTime (ms)', width=6, left=[
+                    self._metric('TargetResponseTime', dimensions, percentile, period, label=f'{target_group} {percentile}')
+                    for target_group, dimensions in target_groups.items()
+                    for percentile in ('p50', 'p99')
+                ]),
+            aws_cloudwatch.GraphWidget(
+                title=f'{name} error rate (%)', width=6, left=list(error_rates.values()),
+                left_annotations=[aws_cloudwatch.HorizontalAnnotation(value=slo.error_rate_percent, label='5XX SLO')]),
+            *saturation_widgets,
+        ]
+
+    def _add_alarms(self, name: str, slo: LatticeSlo, p99_request_time: aws_cloudwatch.IMetric,
+                    server_error_rate: aws_cloudwatch.IMetric) -> None:
+        alarms = [
+            p99_request_time.create_alarm(self, f'{name}p99latencyalarm', threshold=slo.p99_latency_ms,
+                                          alarm_description=f'p99 latency of the {name} Lattice service is above {slo.p99_latency_ms} ms',
+                                          evaluation_periods=slo.evaluation_periods, datapoints_to_alarm=slo.datapoints_to_alarm,
+                                          comparison_operator=aws_cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                                          treat_missing_data=aws_cloudwatch.TreatMissingData.NOT_BREACHING),
+            server_error_rate.create_alarm(self, f'{name}errorratealarm', threshold=slo.error_rate_percent,
+                                           alarm_description=f'5XX rate of the {name} Lattice service is above {slo.error_rate_percent}%',
+                                           evaluation_periods=slo.evaluation_periods, datapoints_to_alarm=slo.datapoints_to_alarm,
+                                           comparison_operator=aws_cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                                           treat_missing_data=aws_cloudwatch.TreatMissingData.NOT_BREACHING),
+        ]
+        for alarm in alarms:
+            alarm.add_alarm_action(aws_cloudwatch_actions.SnsAction(self.alarm_topic))
+            alarm.add_ok_action(aws_cloudwatch_actions.SnsAction(self.alarm_topic))
+        self.alarms += alarms
+
+    @staticmethod
+    def _metric(metric_name: str, dimensions: dict[str, str], statistic: str, period: Duration,
+                label: str | None = None) -> aws_cloudwatch.Metric:
+        return aws_cloudwatch.Metric(namespace=LATTICE_NAMESPACE, metric_name=metric_name, dimensions_map=dimensions, statistic=statistic,
+                                     period=period, label=label)
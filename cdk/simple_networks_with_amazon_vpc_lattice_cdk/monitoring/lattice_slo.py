@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LatticeSlo:
+    # p99 of RequestTime, the time Lattice takes to answer including the target
+    p99_latency_ms: float = 1000
+    # 5XX responses of the service as a share of its requests
+    error_rate_percent: float = 1.0
+    period_seconds: int = 60
+    # An alarm fires once datapoints_to_alarm of the last evaluation_periods periods breach, so a single slow minute doesn't page
+    evaluation_periods: int = 5
+    datapoints_to_alarm: int = 3
+
+    def __post_init__(self) -> None:
+        if self.datapoints_to_alarm > self.evaluation_periods:
+            raise ValueError('An alarm can\'t need more breaching datapoints than periods it evaluates')
+        if self.period_seconds % 60:
+            raise ValueError('Lattice publishes metrics every minute, the period has to be a multiple of 60 seconds')
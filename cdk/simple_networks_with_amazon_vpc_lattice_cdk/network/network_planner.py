@@ -0,0 +1,71 @@
+from ipaddress import IPv4Network, ip_network
+
+from aws_cdk import aws_ec2
+from constructs import Construct
+from simple_networks_with_amazon_vpc_lattice_cdk.constants import NETWORK_CIDR_POOL, NETWORK_VPC_PREFIX_LENGTH
+
+
+# Shared by every construct that builds a VPC, so the workload VPCs get non-overlapping ranges of one pool and can be
+# peered or attached to a Transit Gateway later. NAT-free, private subnets are isolated and reach AWS APIs through VPC
+# endpoints, the other workloads are reached through Lattice either way
+class NetworkPlanner:
+
+    def __init__(self, *, pool: str = NETWORK_CIDR_POOL, prefix_length: int = NETWORK_VPC_PREFIX_LENGTH, nat_free: bool = False,
+                 reserved: dict[str, str] | None = None) -> None:
+        self.pool = ip_network(pool)
+        if not self.pool.prefixlen <= prefix_length <= 24:
+            raise ValueError(f'VPCs of /{prefix_length} don\'t fit /24 subnets in {pool}')
+        self.prefix_length = prefix_length
+        self.nat_free = nat_free
+        # Ranges of networks outside the stack (on-premises, peered VPCs) or pinned CIDRs of existing VPCs by construct id
+        self.reserved = {name: ip_network(cidr) for name, cidr in (reserved or {}).items()}
+        self.allocations: dict[str, IPv4Network] = {}
+
+    @property
+    def private_subnet_type(self) -> aws_ec2.SubnetType:
+        return aws_ec2.SubnetType.PRIVATE_ISOLATED if self.nat_free else aws_ec2.SubnetType.PRIVATE_WITH_EGRESS
+
+    @property
+    def private_subnets(self) -> aws_ec2.SubnetSelection:
+        return aws_ec2.SubnetSelection(subnet_type=self.private_subnet_type)
+
+    def allocate(self, name: str) -> str:
+        # Ranges are handed out in the order VPCs are built, pin them in reserved before reordering constructs
+        if name not in self.allocations:
+            taken = [cidr for other, cidr in {**self.reserved, **self.allocations}.items() if other != name]
+            free = (cidr for cidr in self.pool.subnets(new_prefix=self.prefix_length) if not any(cidr.overlaps(other) for other in taken))
+            cidr = self.reserved.get(name) or next(free, None)
+            if cidr is None:
+                raise ValueError(f'No /{self.prefix_length} left in {self.pool} for {name}')
+            if any(cidr.overlaps(other) for other in taken):
+                raise ValueError(f'{name} pinned to {cidr}, which overlaps another network')
+            self.allocations[name] = cidr
+        return str(self.allocations[name])
+
+    # pylint: disable=too-many-arguments
+    def build_vpc(self, scope: Construct, id_: str, *, max_azs: int, public_subnets: bool = False, private_subnets: bool = False,
+                  interface_endpoints: dict[str, aws_ec2.IInterfaceVpcEndpointService] | None = None,
+                  s3_gateway_endpoint: bool = False) -> aws_ec2.Vpc:
+        # Private subnets with egress need a public subnet for their NAT gateway
+        needs_nat = private_subnets and not self.nat_free
+        subnet_name = id_.removesuffix('Vpc')
+        subnet_configuration = []
+        if public_subnets or needs_nat:
+            subnet_configuration.append(
+                aws_ec2.SubnetConfiguration(name=f'{subnet_name}PublicSubnet', subnet_type=aws_ec2.SubnetType.PUBLIC, cidr_mask=24))
+        if private_subnets:
+            subnet_configuration.append(
+                aws_ec2.SubnetConfiguration(name=f'{subnet_name}PrivateSubnet', subnet_type=self.private_subnet_type, cidr_mask=24))
+        vpc = aws_ec2.Vpc(scope, id_, ip_addresses=aws_ec2.IpAddresses.cidr(self.allocate(id_)), max_azs=max_azs,
+                          nat_gateways=1 if needs_nat else 0, subnet_configuration=subnet_configuration)
+        if private_subnets and self.nat_free:
+            self._add_endpoints(vpc, interface_endpoints or {}, s3_gateway_endpoint)
+        return vpc
+
+    def _add_endpoints(self, vpc: aws_ec2.Vpc, interface_endpoints: dict[str, aws_ec2.IInterfaceVpcEndpointService],
+                       s3_gateway_endpoint: bool) -> None:
+        # Gateway endpoints are free, interface endpoints are billed per AZ and hour, so each VPC only gets the ones it calls
+        if s3_gateway_endpoint:
+            vpc.add_gateway_endpoint('S3Endpoint', service=aws_ec2.GatewayVpcEndpointAwsService.S3, subnets=[self.private_subnets])
+        for name, service in interface_endpoints.items():
+            vpc.add_interface_endpoint(f'{name}Endpoint', service=service, subnets=self.private_subnets, private_dns_enabled=True)
@@ -1,50 +1,89 @@
-# pylint: disable=broad-exception-caught
-
-import os
-from pathlib import Path
-from typing import Final
-
 from aws_cdk import Stack
 from constructs import Construct, DependencyGroup
-from git import Repo
-from simple_networks_with_amazon_vpc_lattice_cdk.constants import SERVICE_NAME
+from simple_networks_with_amazon_vpc_lattice_cdk.constants import (
+    EC2_INSTANCE_TYPE,
+    EC2_MAX_CAPACITY,
+    EC2_MIN_CAPACITY,
+    EC2_USE_AUTO_SCALING_GROUP,
+    ECS_CONTAINER_IMAGE,
+    ECS_SIZING_PROFILE,
+    ECS_USE_ALB,
+    LAMBDA_MEMORY_SIZE_MIB,
+    LAMBDA_PROVISIONED_CONCURRENCY_MAX,
+    LAMBDA_PROVISIONED_CONCURRENCY_MIN,
+    LAMBDA_SNAP_START,
+    LATTICE_ACCESS_LOGS_TO_CLOUDWATCH_LOGS,
+    LATTICE_ACCESS_LOGS_TO_S3,
+    LATTICE_ALARM_EMAIL,
+    LATTICE_SERVICE_ACCESS_LOGS,
+    LATTICE_SLO_ERROR_RATE_PERCENT,
+    LATTICE_SLO_P99_LATENCY_MS,
+    NETWORK_CIDR_POOL,
+    NETWORK_NAT_FREE,
+    NETWORK_RESERVED_CIDRS,
+    NETWORK_VPC_PREFIX_LENGTH,
+    SERVICE_NAME,
+)
 from simple_networks_with_amazon_vpc_lattice_cdk.ec2.ec2_construct import EC2Construct
 from simple_networks_with_amazon_vpc_lattice_cdk.ecs.ecs_construct import EcsConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.ecs.ecs_sizing_profile import ECS_SIZING_PROFILES
 from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function.lambda_construct import LambdaConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function.lambda_tuning import LambdaTuning
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_access_log_spec import LatticeAccessLogSpec
 from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_construct import LatticeConstruct
-
-
-def get_username() -> str:
-    DEFAULT_USERNAME: Final[str] = 'github'
-    try:
-        login = os.getlogin().replace('.', '')
-        if login == 'root':
-            login = os.getenv("USER")
-        if login is None:
-            return DEFAULT_USERNAME
-        return login
-    except Exception:
-        return DEFAULT_USERNAME
-
-
-def get_stack_name() -> str:
-    repo = Repo(Path.cwd())
-    username = get_username()
-    try:
-        return f'{username}{repo.active_branch}{SERVICE_NAME}'
-    except TypeError:
-        return f'{username}{SERVICE_NAME}'
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import LatticeServiceSpec
+from simple_networks_with_amazon_vpc_lattice_cdk.monitoring.lattice_monitoring_construct import LatticeMonitoringConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.monitoring.lattice_slo import LatticeSlo
+from simple_networks_with_amazon_vpc_lattice_cdk.network.network_planner import NetworkPlanner
 
 
 class SimpleNetworksWithAmazonVpcLatticeStack(Stack):
 
     def __init__(self, scope: Construct, id_: str, **kwargs) -> None:
         super().__init__(scope, id_, **kwargs)
-        self.ecs_cluster = EcsConstruct(self, f'{SERVICE_NAME}ECSCluster')
-        self.ec2_instance = EC2Construct(self, f'{SERVICE_NAME}EC2Instance')
-        self.lambda_function = LambdaConstruct(self, f'{SERVICE_NAME}Lambda')
+        self.network_planner = NetworkPlanner(pool=NETWORK_CIDR_POOL, prefix_length=NETWORK_VPC_PREFIX_LENGTH, nat_free=NETWORK_NAT_FREE,
+                                              reserved=NETWORK_RESERVED_CIDRS)
+        self.ecs_cluster = EcsConstruct(self, f'{SERVICE_NAME}ECSCluster', use_alb=ECS_USE_ALB,
+                                        sizing_profile=ECS_SIZING_PROFILES[ECS_SIZING_PROFILE], network_planner=self.network_planner,
+                                        container_image=ECS_CONTAINER_IMAGE)
+        self.ec2_instance = EC2Construct(self, f'{SERVICE_NAME}EC2Instance', use_auto_scaling_group=EC2_USE_AUTO_SCALING_GROUP,
+                                         instance_type=EC2_INSTANCE_TYPE, min_capacity=EC2_MIN_CAPACITY, max_capacity=EC2_MAX_CAPACITY,
+                                         network_planner=self.network_planner)
+        lambda_tuning = LambdaTuning(memory_size_mib=LAMBDA_MEMORY_SIZE_MIB, snap_start=LAMBDA_SNAP_START,
+                                     provisioned_concurrency_min=LAMBDA_PROVISIONED_CONCURRENCY_MIN,
+                                     provisioned_concurrency_max=LAMBDA_PROVISIONED_CONCURRENCY_MAX)
+        self.lambda_function = LambdaConstruct(self, f'{SERVICE_NAME}Lambda', tuning=lambda_tuning, network_planner=self.network_planner)
         self.service = DependencyGroup()
-        self.service.add(self.ecs_cluster)
-        self.service.add(self.ec2_instance)
+        # The Fargate service (IP targets) and the Auto Scaling group reference their Lattice target group, so they can't wait for Lattice
+        if self.ecs_cluster.use_alb:
+            self.service.add(self.ecs_cluster)
+        if not self.ec2_instance.use_auto_scaling_group:
+            self.service.add(self.ec2_instance)
         self.service.add(self.lambda_function)
-        LatticeConstruct(self, f'{SERVICE_NAME}Lattice').node.add_dependency(self.service)
+        self.lattice = LatticeConstruct(
+            self, f'{SERVICE_NAME}Lattice', services=self._build_lattice_service_specs(),
+            access_logs=LatticeAccessLogSpec(to_s3=LATTICE_ACCESS_LOGS_TO_S3, to_cloudwatch_logs=LATTICE_ACCESS_LOGS_TO_CLOUDWATCH_LOGS,
+                                             service_network=LATTICE_ACCESS_LOGS_TO_S3 or LATTICE_ACCESS_LOGS_TO_CLOUDWATCH_LOGS,
+                                             services=LATTICE_SERVICE_ACCESS_LOGS))
+        self.lattice.node.add_dependency(self.service)
+        if not self.ecs_cluster.use_alb:
+            self.ecs_cluster.attach_lattice_target_group(self.lattice.target_groups['ecs'])
+        if self.ec2_instance.use_auto_scaling_group:
+            self.ec2_instance.attach_lattice_target_group(self.lattice.target_groups['ec2'])
+        saturation_widgets = {
+            'ec2': self.ec2_instance.saturation_widgets(),
+            'ecs': self.ecs_cluster.saturation_widgets(),
+            'lambda': self.lambda_function.saturation_widgets(),
+        }
+        self.monitoring = LatticeMonitoringConstruct(
+            self, f'{SERVICE_NAME}Monitoring', lattice=self.lattice,
+            default_slo=LatticeSlo(p99_latency_ms=LATTICE_SLO_P99_LATENCY_MS, error_rate_percent=LATTICE_SLO_ERROR_RATE_PERCENT),
+            saturation_widgets=saturation_widgets, alarm_email=LATTICE_ALARM_EMAIL)
+
+    def _build_lattice_service_specs(self) -> list[LatticeServiceSpec]:
+        return [
+            self.ec2_instance.lattice_service_spec(),
+            self.ecs_cluster.lattice_service_spec(),
+            # Allow calls to this Lambda only from the EC2
+            self.lambda_function.lattice_service_spec(allowed_source_vpcs=(self.ec2_instance.ec2_vpc,)),
+        ]
@@ -0,0 +1,97 @@
+# Everything app.py needs before the stack is built: its name and the account and region it is synthesized for.
+# Kept free of aws_cdk, boto3 and GitPython imports, so it costs nothing when the answer is already known locally.
+# Account and region are taken from, in order:
+#  1. AWS_DEFAULT_ACCOUNT and AWS_DEFAULT_REGION or AWS_REGION
+#  2. CDK_DEFAULT_ACCOUNT and CDK_DEFAULT_REGION, which the cdk CLI sets from its own credentials lookup
+#  3. the cache file the last online synth wrote for the current AWS profile
+#  4. STS and the boto3 session, skipped when synthesizing offline
+import json
+import os
+from pathlib import Path
+from typing import Final
+
+from simple_networks_with_amazon_vpc_lattice_cdk.constants import SERVICE_NAME
+
+ENVIRONMENT_CACHE_FILE: Final[Path] = Path('.build/cdk_environment.json')
+OFFLINE_ENV_VARIABLE: Final[str] = 'CDK_SYNTH_OFFLINE'
+
+
+def get_username() -> str:
+    DEFAULT_USERNAME: Final[str] = 'github'
+    try:
+        login = os.getlogin().replace('.', '')
+        if login == 'root':
+            login = os.getenv("USER")
+        if login is None:
+            return DEFAULT_USERNAME
+        return login
+    except Exception:  # pylint: disable=broad-exception-caught
+        return DEFAULT_USERNAME
+
+
+def get_git_branch(path: Path | None = None) -> str | None:
+    # Reads .git/HEAD directly, None for a detached HEAD or outside of a repository
+    path = (path or Path.cwd()).resolve()
+    for directory in (path, *path.parents):
+        git_dir = directory / '.git'
+        if git_dir.is_file():
+            # Worktrees and submodules point to their git directory
+            git_dir = (directory / git_dir.read_text(encoding='utf-8').partition(':')[2].strip()).resolve()
+        if git_dir.is_dir():
+            head = (git_dir / 'HEAD').read_text(encoding='utf-8').strip()
+            return head.removeprefix('ref: refs/heads/') if head.startswith('ref: refs/heads/') else None
+    return None
+
+
+def get_stack_name() -> str:
+    username = get_username()
+    branch = get_git_branch()
+    if branch is None:
+        return f'{username}{SERVICE_NAME}'
+    return f'{username}{branch}{SERVICE_NAME}'
+
+
+def is_offline(context_value: object | None = None) -> bool:
+    # cdk synth -c offline=true or CDK_SYNTH_OFFLINE=1
+    return str(context_value).lower() == 'true' or os.environ.get(OFFLINE_ENV_VARIABLE, '').lower() in {'1', 'true'}
+
+
+def _read_cache() -> dict[str, dict[str, str]]:
+    try:
+        return json.loads(ENVIRONMENT_CACHE_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_cache(profile: str, account: str, region: str) -> None:
+    cache = _read_cache()
+    cache[profile] = {'account': account, 'region': region}
+    ENVIRONMENT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    ENVIRONMENT_CACHE_FILE.write_text(json.dumps(cache, indent=2), encoding='utf-8')
+
+
+def _lookup_with_boto3() -> tuple[str, str | None]:
+    # pylint: disable=import-outside-toplevel
+    from boto3 import client, session
+    return client('sts').get_caller_identity()['Account'], session.Session().region_name
+
+
+def resolve_environment(offline: bool = False) -> tuple[str, str]:
+    account = os.environ.get('AWS_DEFAULT_ACCOUNT') or os.environ.get('CDK_DEFAULT_ACCOUNT')
+    region = os.environ.get('AWS_DEFAULT_REGION') or os.environ.get('AWS_REGION') or os.environ.get('CDK_DEFAULT_REGION')
+    if account and region:
+        return account, region
+    profile = os.environ.get('AWS_PROFILE', 'default')
+    cached = _read_cache().get(profile, {})
+    account, region = account or cached.get('account'), region or cached.get('region')
+    if account and region:
+        return account, region
+    if offline:
+        raise RuntimeError(f'Account and region of profile {profile} are unknown offline, set AWS_DEFAULT_ACCOUNT and AWS_DEFAULT_REGION '
+                           f'or synthesize online once to cache them in {ENVIRONMENT_CACHE_FILE}')
+    looked_up_account, looked_up_region = _lookup_with_boto3()
+    account, region = account or looked_up_account, region or looked_up_region
+    if region is None:
+        raise RuntimeError('No region configured, set AWS_DEFAULT_REGION or a region in the AWS profile')
+    _write_cache(profile, account, region)
+    return account, region
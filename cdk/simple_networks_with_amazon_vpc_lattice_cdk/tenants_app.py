@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Synthesizes one copy of the stack per tenant into its own cloud assembly, cdk.out/tenants/<name> by default, deploy one
+# with cdk deploy --app cdk.out/tenants/<name>. Stacks are synthesized in a process pool and skipped when neither the tenant
+# nor the sources and Lambda assets changed since their assembly was written.
+# Usage (from the repository root): python cdk/simple_networks_with_amazon_vpc_lattice_cdk/tenants_app.py tenants.json [--jobs 4] [--force]
+# tenants.json: [{"name": "acme", "account": "123456789012", "region": "eu-west-1", "stack_name": null, "context": {}}]
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Final
+
+from simple_networks_with_amazon_vpc_lattice_cdk.constants import SERVICE_NAME
+
+PACKAGE_DIR: Final[Path] = Path(__file__).parent
+SOURCE_SUFFIXES: Final[tuple[str, ...]] = ('.py', '.sh', '.conf')
+# Code.from_asset hashes these into the template, so they're inputs of the stack as much as the sources
+ASSET_DIRS: Final[tuple[Path, ...]] = (Path('.build/lambdas'), Path('.build/common_layer'))
+INPUT_HASH_FILE: Final[str] = '.synth_input_hash'
+
+
+@dataclass(frozen=True)
+class Tenant:
+    name: str
+    account: str
+    region: str
+    stack_name: str | None = None
+    context: dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.name.isalnum():
+            raise ValueError(f'Tenant name {self.name!r} has to be alphanumeric, it names the stack and its assembly directory')
+
+    def get_stack_name(self) -> str:
+        return self.stack_name or f'{self.name}{SERVICE_NAME}'
+
+
+def load_tenants(path: Path) -> list[Tenant]:
+    tenants = [Tenant(**entry) for entry in json.loads(path.read_text(encoding='utf-8'))]
+    names = [tenant.name for tenant in tenants]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Tenant names in {path} have to be unique')
+    return tenants
+
+
+def _read_tree(directory: Path, suffixes: tuple[str, ...] | None = None) -> Iterator[bytes]:
+    for path in sorted(directory.rglob('*')):
+        if path.is_file() and '__pycache__' not in path.parts and (suffixes is None or path.suffix in suffixes):
+            yield str(path.relative_to(directory)).encode()
+            yield path.read_bytes()
+
+
+def hash_shared_inputs() -> str:
+    # Everything every tenant's template depends on, hashed once per run
+    digest = hashlib.sha256()
+    for chunk in _read_tree(PACKAGE_DIR, SOURCE_SUFFIXES):
+        digest.update(chunk)
+    for directory in ASSET_DIRS:
+        for chunk in _read_tree(directory):
+            digest.update(chunk)
+    for package in ('aws-cdk-lib', 'constructs'):
+        try:
+            digest.update(f'{package}=={metadata.version(package)}'.encode())
+        except metadata.PackageNotFoundError:
+            pass
+    return digest.hexdigest()
+
+
+def hash_tenant_inputs(tenant: Tenant, shared_hash: str) -> str:
+    return hashlib.sha256(f'{shared_hash}{json.dumps(asdict(tenant), sort_keys=True)}'.encode()).hexdigest()
+
+
+def is_up_to_date(out_dir: Path, input_hash: str) -> bool:
+    hash_file = out_dir / INPUT_HASH_FILE
+    return (out_dir / 'manifest.json').exists() and hash_file.exists() and hash_file.read_text(encoding='utf-8') == input_hash
+
+
+def synth_tenant(tenant: Tenant, out_dir: str) -> dict[str, Any]:
+    # Runs in a pool worker. aws_cdk starts its jsii runtime on import, so it's imported here: once per worker, which
+    # every tenant after the first one in that worker doesn't pay for again
+    # pylint: disable=import-outside-toplevel
+    from aws_cdk import App, Environment
+    from simple_networks_with_amazon_vpc_lattice_cdk import simple_networks_with_amazon_vpc_lattice_stack as lattice_stack
+
+    started = time.perf_counter()
+    app = App(outdir=out_dir, context=tenant.context)
+    stack = lattice_stack.SimpleNetworksWithAmazonVpcLatticeStack(app, tenant.get_stack_name(),
+                                                                  env=Environment(account=tenant.account, region=tenant.region))
+    assembly = app.synth()
+    template = assembly.get_stack_artifact(stack.artifact_id).template
+    return {'seconds': time.perf_counter() - started, 'resources': len(template.get('Resources', {}))}
+
+
+def print_report(results: dict[str, dict[str, Any]], wall_seconds: float) -> None:
+    print(f'{"tenant":<20} {"status":<12} {"seconds":>8} {"resources":>10}')
+    for name, result in sorted(results.items()):
+        seconds = f'{result["seconds"]:.2f}' if 'seconds' in result else '-'
+        print(f'{name:<20} {result["status"]:<12} {seconds:>8} {result.get("resources", "-"):>10}')
+    synth_seconds = sum(result.get('seconds', 0) for result in results.values())
+    print(f'{len(results)} tenants, {sum(result["status"] == "synthesized" for result in results.values())} synthesized '
+          f'in {wall_seconds:.2f}s wall time ({synth_seconds:.2f}s of synth)')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Synthesizes the stack of every tenant in parallel')
+    parser.add_argument('tenants', type=Path, help='JSON list of tenants with name, account and region')
+    parser.add_argument('--out-dir', type=Path, default=Path('cdk.out/tenants'))
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help='Synthesizes tenants whose inputs didn\'t change too')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    tenants = load_tenants(args.tenants)
+    shared_hash = hash_shared_inputs()
+    results: dict[str, dict[str, Any]] = {}
+    pending: list[tuple[Tenant, Path, str]] = []
+    for tenant in tenants:
+        out_dir = args.out_dir / tenant.name
+        input_hash = hash_tenant_inputs(tenant, shared_hash)
+        if not args.force and is_up_to_date(out_dir, input_hash):
+            results[tenant.name] = {'status': 'skipped'}
+        else:
+            pending.append((tenant, out_dir, input_hash))
+
+    if pending:
+        # Forked workers would share the parent's jsii runtime if anything imported aws_cdk before, spawned ones start clean
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(pending)), mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures: dict[Future, tuple[Tenant, Path, str]] = {}
+            for tenant, out_dir, input_hash in pending:
+                # The hash is written again once the synth succeeds, a failed or interrupted one mustn't leave the
+                # previous hash next to a half-written assembly and have it skipped on the next run
+                (out_dir / INPUT_HASH_FILE).unlink(missing_ok=True)
+                futures[executor.submit(synth_tenant, tenant, str(out_dir))] = (tenant, out_dir, input_hash)
+            for future in as_completed(futures):
+                tenant, out_dir, input_hash = futures[future]
+                try:
+                    results[tenant.name] = {'status': 'synthesized', **future.result()}
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    print(f'{tenant.name}: {error}', file=sys.stderr)
+                    results[tenant.name] = {'status': 'failed'}
+                    continue
+                (out_dir / INPUT_HASH_FILE).write_text(input_hash, encoding='utf-8')
+
+    print_report(results, time.perf_counter() - started)
+    if any(result['status'] == 'failed' for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 #!/bin/bash
 
-mkdir -p .build/lambdas ; cp -r lambda_handlers .build/lambdas
-mkdir -p .build/common_layer ; poetry export --without=dev --without-hashes --format=requirements.txt > .build/common_layer/requirements.txt
+mkdir -p .build ; poetry export --without=dev --without-hashes --format=requirements.txt > .build/requirements.txt
+python tools/build_lambda.py --requirements .build/requirements.txt || exit 1
 cdk deploy --app="python ${PWD}/app.py" --require-approval=never
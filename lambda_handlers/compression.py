@@ -0,0 +1,96 @@
+# Content negotiation for response bodies crossing the service network: bodies above the threshold are compressed with the
+# best encoding the caller accepts and returned base64 encoded. Compressed bodies are memoised on the response, so responses
+# served from ResponseCache are compressed once per encoding and not on every hit.
+import gzip
+
+from lambda_handlers.config import CONFIG
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+
+try:
+    import brotli
+except ImportError:  # Not shipped with the Lambda runtime, only used when the layer provides it
+    brotli = None
+
+# Preferred first when the caller weights them equally
+SUPPORTED_ENCODINGS: tuple[str, ...] = ('br', 'gzip') if brotli else ('gzip',)
+COMPRESSIBLE_CONTENT_TYPES: tuple[str, ...] = ('application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+
+def parse_accept_encoding(accept_encoding: str | None) -> dict[str, float]:
+    weights = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, parameters = item.partition(';')
+        coding = coding.strip()
+        if not coding:
+            continue
+        weight = 1.0
+        for parameter in parameters.split(';'):
+            name, _, value = parameter.strip().partition('=')
+            if name == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    return weights
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    weights = parse_accept_encoding(accept_encoding)
+    candidates = [(weights.get(encoding, weights.get('*', 0.0)), -index, encoding) for index, encoding in enumerate(SUPPORTED_ENCODINGS)]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=CONFIG.brotli_quality)
+    # mtime=0 keeps the output, and so its ETag, identical across execution environments
+    return gzip.compress(body, compresslevel=CONFIG.gzip_level, mtime=0)
+
+
+def representation_etag(etag: str, encoding: str) -> str:
+    # Each representation needs its own strong validator
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _identity_body(response: LatticeResponse) -> bytes:
+    # A str body is sent UTF-8 encoded, memoised as both the threshold check and the compression need it
+    if isinstance(response.body, bytes):
+        return response.body
+    body = response.encoded_bodies.get('identity')
+    if body is None:
+        body = response.encoded_bodies['identity'] = response.body.encode()
+    return body
+
+
+def is_compressible(response: LatticeResponse) -> bool:
+    if not response.body or 'Content-Encoding' in response.headers:
+        return False
+    return response.headers.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+
+def select_encoding(request: LatticeRequest, response: LatticeResponse) -> str | None:
+    # The encoding compress_response sends the response with, None for the identity representation
+    if not is_compressible(response) or len(_identity_body(response)) < CONFIG.compression_min_bytes:
+        return None
+    return negotiate_encoding(request.header('accept-encoding'))
+
+
+def compress_response(request: LatticeRequest, response: LatticeResponse) -> LatticeResponse:
+    # A 304 has no body and already carries the tag of the representation the caller holds, see ResponseCache
+    if not is_compressible(response):
+        return response
+    encoding = select_encoding(request, response)
+    vary = ', '.join(value for value in (response.headers.get('Vary'), 'Accept-Encoding') if value)
+    if encoding is None:
+        return LatticeResponse(status_code=response.status_code, body=response.body, headers={
+            **response.headers, 'Vary': vary
+        }, encoded_bodies=response.encoded_bodies)
+    compressed = response.encoded_bodies.get(encoding)
+    if compressed is None:
+        compressed = response.encoded_bodies[encoding] = compress(_identity_body(response), encoding)
+    headers = {**response.headers, 'Content-Encoding': encoding, 'Vary': vary}
+    if 'ETag' in headers:
+        headers['ETag'] = representation_etag(headers['ETag'], encoding)
+    return LatticeResponse(status_code=response.status_code, body=compressed, headers=headers, encoded_bodies=response.encoded_bodies)
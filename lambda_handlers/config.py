@@ -0,0 +1,33 @@
+# Everything here lives for the whole lifetime of the execution environment and is shared by all warm invocations
+import os
+from dataclasses import dataclass
+from functools import cache
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Config:
+    log_level: str
+    region: str
+    response_cache_max_entries: int
+    compression_min_bytes: int
+    gzip_level: int
+    brotli_quality: int
+
+
+CONFIG = Config(
+    log_level=os.environ.get('LOG_LEVEL', 'INFO'),
+    region=os.environ.get('AWS_REGION', 'eu-west-1'),
+    response_cache_max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '256')),
+    compression_min_bytes=int(os.environ.get('COMPRESSION_MIN_BYTES', '1024')),
+    gzip_level=int(os.environ.get('GZIP_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('BROTLI_QUALITY', '5')),
+)
+
+
+@cache
+def get_client(service_name: str) -> Any:
+    # boto3 takes a while to import, routes that don't talk to AWS shouldn't pay for it
+    import boto3  # pylint: disable=import-outside-toplevel
+
+    return boto3.client(service_name, region_name=CONFIG.region)
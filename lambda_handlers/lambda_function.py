@@ -1,6 +1,30 @@
 # pylint: disable=unused-argument
-import json
+import logging
+from dataclasses import replace
+
+from lambda_handlers.compression import compress_response
+from lambda_handlers.config import CONFIG
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+from lambda_handlers.response_cache import ResponseCache
+from lambda_handlers.router import Router
+
+logging.getLogger().setLevel(CONFIG.log_level)
+
+router = Router()
+# Routes opt in with @response_cache.cached(ttl_seconds=...)
+response_cache = ResponseCache(max_entries=CONFIG.response_cache_max_entries)
+
+
+@router.get('/')
+@response_cache.cached(ttl_seconds=60)
+def get_status(request: LatticeRequest) -> LatticeResponse:
+    return LatticeResponse.json({"status ": "Lambda works!"})
 
 
 def handle(event, context):
-    return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"status ": "Lambda works!"})}
+    request = LatticeRequest.from_event(event)
+    response = compress_response(request, router.dispatch(request))
+    if request.method == 'HEAD':
+        # Negotiated like the GET it's answered by, so Content-Encoding and ETag match it, only the body isn't sent
+        response = replace(response, body='')
+    return response.to_lattice()
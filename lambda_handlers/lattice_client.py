@@ -0,0 +1,179 @@
+# Client for calling VPC Lattice services that use AWS_IAM auth, from a Lambda function or any other Python caller.
+# Connections are kept alive in a pool per service, credentials are fetched from botocore once and refreshed only when they
+# expire, and the SigV4 signing key is derived once per day instead of for every request. Payloads are sent unsigned, which
+# Lattice accepts, so bodies are never hashed. Async helpers fan calls out with per-call timeouts and hedged retries.
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
+from urllib.parse import SplitResult, parse_qsl, quote, urlsplit
+
+import urllib3
+from botocore.exceptions import NoCredentialsError
+from botocore.session import get_session
+
+from lambda_handlers.config import CONFIG, get_client
+
+LATTICE_SIGNING_SERVICE = 'vpc-lattice-svcs'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+# Only these are safe to send twice when hedging or retrying
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+@dataclass(frozen=True)
+class ServiceResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+@dataclass(frozen=True)
+class ServiceCall:
+    method: str
+    url: str
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes | None = None
+
+
+def _sign(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class SigV4Signer:
+
+    def __init__(self, region: str, service: str = LATTICE_SIGNING_SERVICE, credentials: Any | None = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.region = region
+        self.service = service
+        self.clock = clock
+        # botocore credentials refresh themselves shortly before they expire
+        self.credentials = credentials or get_session().get_credentials()
+        if self.credentials is None:
+            # Otherwise the first request would fail with an AttributeError
+            raise NoCredentialsError()
+        self.scope_suffix = f'{region}/{service}/aws4_request'
+        self._signing_key: tuple[tuple[str, str], bytes] = (('', ''), b'')
+
+    def get_signing_key(self, secret_key: str, date_stamp: str) -> bytes:
+        cache_key, signing_key = self._signing_key
+        if cache_key != (secret_key, date_stamp):
+            signing_key = _sign(_sign(_sign(_sign(f'AWS4{secret_key}'.encode(), date_stamp), self.region), self.service), 'aws4_request')
+            self._signing_key = ((secret_key, date_stamp), signing_key)
+        return signing_key
+
+    def sign(self, method: str, url: str, headers: dict[str, str]) -> dict[str, str]:
+        credentials = self.credentials.get_frozen_credentials()
+        amz_date = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(self.clock()))
+        date_stamp = amz_date[:8]
+        parts = urlsplit(url)
+        signed = {
+            **headers,
+            'host': parts.netloc,
+            'x-amz-date': amz_date,
+            'x-amz-content-sha256': UNSIGNED_PAYLOAD,
+        }
+        if credentials.token:
+            signed['x-amz-security-token'] = credentials.token
+        canonical_request, signed_headers = _canonical_request(method, parts, signed)
+        credential_scope = f'{date_stamp}/{self.scope_suffix}'
+        string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, credential_scope, hashlib.sha256(canonical_request.encode()).hexdigest()])
+        signature = hmac.new(self.get_signing_key(credentials.secret_key, date_stamp), string_to_sign.encode(), hashlib.sha256).hexdigest()
+        signed['authorization'] = (f'AWS4-HMAC-SHA256 Credential={credentials.access_key}/{credential_scope}, '
+                                   f'SignedHeaders={signed_headers}, Signature={signature}')
+        return signed
+
+
+def _canonical_request(method: str, parts: SplitResult, headers: dict[str, str]) -> tuple[str, str]:
+    # The canonical request and the names of the headers it signs
+    canonical_headers = {name.lower(): ' '.join(str(value).split()) for name, value in headers.items()}
+    signed_headers = ';'.join(sorted(canonical_headers))
+    # Sorted by the encoded names, as SigV4 specifies
+    query = sorted((quote(name, safe='-_.~'), quote(value, safe='-_.~')) for name, value in parse_qsl(parts.query, keep_blank_values=True))
+    canonical_request = '\n'.join([
+        method.upper(),
+        quote(parts.path or '/', safe='/-_.~'),
+        '&'.join(f'{name}={value}' for name, value in query),
+        ''.join(f'{name}:{canonical_headers[name]}\n' for name in sorted(canonical_headers)),
+        signed_headers,
+        UNSIGNED_PAYLOAD,
+    ])
+    return canonical_request, signed_headers
+
+
+class LatticeClient:
+
+    def __init__(self, region: str | None = None, signer: SigV4Signer | None = None, pool_size: int = 10, timeout: float = 2.0,
+                 executor: Executor | None = None) -> None:
+        self.signer = signer or SigV4Signer(region or CONFIG.region)
+        self.timeout = timeout
+        self.executor = executor
+        # One keep-alive pool per service host, connections beyond pool_size are opened for bursts and closed afterwards
+        self.pool = urllib3.PoolManager(num_pools=50, maxsize=pool_size, block=False, retries=False)
+        self.service_domains: dict[str, str] = {}
+
+    def resolve(self, service_identifier: str) -> str:
+        # Service name, ID or ARN to the DNS name Lattice generated for it, looked up once per client
+        domain = self.service_domains.get(service_identifier)
+        if domain is None:
+            service = get_client('vpc-lattice').get_service(serviceIdentifier=service_identifier)
+            domain = self.service_domains[service_identifier] = service['dnsEntry']['domainName']
+        return domain
+
+    def service_url(self, service_identifier: str, path: str = '/', scheme: str = 'https') -> str:
+        return f'{scheme}://{self.resolve(service_identifier)}{path}'
+
+    def request(self, method: str, url: str, headers: dict[str, str] | None = None, body: bytes | str | None = None,
+                timeout: float | None = None) -> ServiceResponse:
+        # Lattice services behind the Lambda handler compress responses when asked to, urllib3 decodes them
+        signed_headers = self.signer.sign(method, url, {'accept-encoding': 'gzip', **(headers or {})})
+        response = self.pool.request(method, url, headers=signed_headers, body=body, timeout=timeout or self.timeout, redirect=False)
+        return ServiceResponse(status=response.status, headers=dict(response.headers), body=response.data)
+
+    def call(self, service_call: ServiceCall, timeout: float | None = None) -> ServiceResponse:
+        return self.request(service_call.method, service_call.url, headers=service_call.headers, body=service_call.body, timeout=timeout)
+
+    async def call_async(self, service_call: ServiceCall, timeout: float | None = None, hedge_after: float | None = None,
+                         max_attempts: int = 2) -> ServiceResponse:
+        timeout = timeout or self.timeout
+        call = partial(self.call, service_call, timeout)
+        if hedge_after is None or service_call.method.upper() not in IDEMPOTENT_METHODS:
+            return await asyncio.wait_for(self._run(call), timeout)
+        return await asyncio.wait_for(self._hedged(call, hedge_after, max_attempts), timeout)
+
+    async def gather(self, service_calls: Sequence[ServiceCall], timeout: float | None = None, hedge_after: float | None = None,
+                     max_attempts: int = 2) -> list[ServiceResponse | BaseException]:
+        # Failures are returned in place of their response so one slow or broken service doesn't fail the whole fan-out
+        return await asyncio.gather(
+            *(self.call_async(service_call, timeout=timeout, hedge_after=hedge_after, max_attempts=max_attempts)
+              for service_call in service_calls), return_exceptions=True)
+
+    def _run(self, call: Callable[[], ServiceResponse]) -> Awaitable[ServiceResponse]:
+        return asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def _hedged(self, call: Callable[[], ServiceResponse], hedge_after: float, max_attempts: int) -> ServiceResponse:
+        # A second attempt starts when the first hasn't answered within hedge_after, or right away when it failed.
+        # The first successful answer wins, the attempts still running are abandoned
+        pending = {asyncio.ensure_future(self._run(call))}
+        attempts, last_attempt = 1, None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after if attempts < max_attempts else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None and attempt.result().status < 500:
+                    for other in pending:
+                        other.cancel()
+                    return attempt.result()
+                last_attempt = attempt
+            if attempts < max_attempts:
+                pending.add(asyncio.ensure_future(self._run(call)))
+                attempts += 1
+        return last_attempt.result()
@@ -0,0 +1,108 @@
+# VPC Lattice sends one of two payloads to Lambda targets depending on the target group's event structure version:
+# V1 with snake_case keys and single-value headers, V2 with camelCase keys, multi-value headers and a request context.
+import base64
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any
+
+MultiValue = dict[str, list[str]]
+
+
+def _reason_phrase(status_code: int) -> str:
+    # Routes may answer with codes HTTPStatus doesn't know, e.g. 499
+    try:
+        return HTTPStatus(status_code).phrase
+    except ValueError:
+        return ''
+
+
+def _to_multi_value(values: dict[str, str | list[str]] | None, lowercase_keys: bool = False) -> MultiValue:
+    multi_value: MultiValue = {}
+    for key, value in (values or {}).items():
+        if lowercase_keys:
+            key = key.lower()
+        multi_value.setdefault(key, []).extend(value if isinstance(value, list) else [value])
+    return multi_value
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class LatticeRequest:
+    method: str
+    # Percent-encoded as sent, Router decodes every segment on its own so an encoded / stays inside its segment
+    path: str
+    # Header names are lowercased, every header and query parameter can repeat
+    headers: MultiValue
+    query: MultiValue
+    body: bytes
+    version: str
+    request_context: dict[str, Any] = field(default_factory=dict)
+    path_params: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_event(cls, event: dict[str, Any]) -> 'LatticeRequest':
+        if event.get('version') == '2.0':
+            body, is_base64_encoded = event.get('body'), event.get('isBase64Encoded', False)
+            path = event.get('path', '/')
+            query = event.get('queryStringParameters')
+            version = '2.0'
+        else:
+            body, is_base64_encoded = event.get('body'), event.get('is_base64_encoded', False)
+            path = event.get('raw_path', '/')
+            query = event.get('query_string_parameters')
+            version = '1.0'
+        # The path may still carry the query string
+        path, _, _ = path.partition('?')
+        return cls(
+            method=event.get('method', 'GET').upper(),
+            path=path or '/',
+            headers=_to_multi_value(event.get('headers'), lowercase_keys=True),
+            query=_to_multi_value(query),
+            body=(base64.b64decode(body) if is_base64_encoded else body.encode()) if body else b'',
+            version=version,
+            request_context=event.get('requestContext', {}),
+        )
+
+    def header(self, name: str, default: str | None = None) -> str | None:
+        values = self.headers.get(name.lower())
+        return values[0] if values else default
+
+    def query_param(self, name: str, default: str | None = None) -> str | None:
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+    @property
+    def source_vpc_arn(self) -> str | None:
+        return self.request_context.get('identity', {}).get('sourceVpcArn')
+
+
+@dataclass
+class LatticeResponse:
+    status_code: int = HTTPStatus.OK
+    body: str | bytes = ''
+    headers: dict[str, str] = field(default_factory=dict)
+    # Compressed variants of the body keyed by content encoding, shared by responses built from the same body
+    encoded_bodies: dict[str, bytes] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def json(cls, payload: Any, status_code: int = HTTPStatus.OK, headers: dict[str, str] | None = None) -> 'LatticeResponse':
+        return cls(status_code=status_code, body=json.dumps(payload), headers={'Content-Type': 'application/json', **(headers or {})})
+
+    @classmethod
+    def error(cls, status_code: int, headers: dict[str, str] | None = None) -> 'LatticeResponse':
+        return cls.json({'message': _reason_phrase(status_code)}, status_code=status_code, headers=headers)
+
+    def to_lattice(self) -> dict[str, Any]:
+        is_base64_encoded = isinstance(self.body, bytes)
+        status_code = int(self.status_code)
+        return {
+            'statusCode': status_code,
+            'statusDescription': f'{status_code} {_reason_phrase(status_code)}'.rstrip(),
+            'headers': self.headers,
+            'body': base64.b64encode(self.body).decode() if is_base64_encoded else self.body,
+            'isBase64Encoded': is_base64_encoded,
+        }
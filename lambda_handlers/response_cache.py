@@ -0,0 +1,118 @@
+# Opt-in cache of GET responses kept in the execution environment between warm invocations.
+# A cached entry keeps the already serialised body and its ETag, so a hit neither runs the route nor serialises again,
+# and a caller sending a matching If-None-Match gets an empty 304.
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import wraps
+from http import HTTPStatus
+
+from lambda_handlers.compression import is_compressible, representation_etag, select_encoding
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+from lambda_handlers.router import RouteHandler
+
+CacheKey = tuple[str, str, tuple[tuple[str, tuple[str, ...]], ...], tuple[str | None, ...]]
+
+
+@dataclass
+class _CacheEntry:
+    response: LatticeResponse
+    etag: str
+    expires_at: float
+
+
+def compute_etag(body: str | bytes) -> str:
+    # Strong validator: the same bytes always produce the same tag across execution environments
+    digest = hashlib.blake2b(body.encode() if isinstance(body, str) else body, digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match requires
+    tags = (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    return if_none_match.strip() == '*' or etag.removeprefix('W/') in tags
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int = 256, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries: OrderedDict[CacheKey, _CacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> _CacheEntry | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, response: LatticeResponse, ttl_seconds: float) -> _CacheEntry:
+        entry = _CacheEntry(response=response, etag=compute_etag(response.body), expires_at=self.clock() + ttl_seconds)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def cached(self, ttl_seconds: float, vary_headers: tuple[str, ...] = ()) -> Callable[[RouteHandler], RouteHandler]:
+        vary_headers = tuple(header.lower() for header in vary_headers)
+
+        def decorate(handler: RouteHandler) -> RouteHandler:
+
+            @wraps(handler)
+            def cached_handler(request: LatticeRequest) -> LatticeResponse:
+                if request.method not in ('GET', 'HEAD'):
+                    return handler(request)
+                key = self._build_key(request, vary_headers)
+                entry = self.get(key)
+                if entry is None:
+                    self.misses += 1
+                    response = handler(request)
+                    if response.status_code != HTTPStatus.OK:
+                        return response
+                    entry = self.put(key, response, ttl_seconds)
+                else:
+                    self.hits += 1
+                return self._respond(request, entry, vary_headers)
+
+            return cached_handler
+
+        return decorate
+
+    @staticmethod
+    def _build_key(request: LatticeRequest, vary_headers: tuple[str, ...]) -> CacheKey:
+        query = tuple(sorted((name, tuple(values)) for name, values in request.query.items()))
+        # HEAD is answered from the GET entry
+        return 'GET', request.path, query, tuple(request.header(header) for header in vary_headers)
+
+    def _respond(self, request: LatticeRequest, entry: _CacheEntry, vary_headers: tuple[str, ...]) -> LatticeResponse:
+        # Downstream caches may keep the response only for as long as this entry is still fresh
+        max_age = max(int(entry.expires_at - self.clock()), 0)
+        headers = {**entry.response.headers, 'ETag': entry.etag, 'Cache-Control': f'max-age={max_age}'}
+        if vary_headers:
+            headers['Vary'] = ', '.join(vary_headers)
+        # The caller holds the representation negotiated for it, compressed ones have their own tag
+        encoding = select_encoding(request, entry.response)
+        etag = representation_etag(entry.etag, encoding) if encoding else entry.etag
+        if etag_matches(request.header('if-none-match'), etag):
+            headers.pop('Content-Type', None)
+            if is_compressible(entry.response):
+                # compress_response skips bodiless responses, the 304 varies like the response it stands for
+                headers['Vary'] = ', '.join(value for value in (headers.get('Vary'), 'Accept-Encoding') if value)
+            return LatticeResponse(status_code=HTTPStatus.NOT_MODIFIED, headers={**headers, 'ETag': etag})
+        # The body is shared with the cached entry, only the headers are copied
+        return LatticeResponse(status_code=entry.response.status_code, body=entry.response.body, headers=headers,
+                               encoded_bodies=entry.response.encoded_bodies)
@@ -0,0 +1,124 @@
+# Routes are compiled into a lookup table while the module is imported, so the cost of matching a request depends on the
+# number of path segments and not on the number of routes: static paths are a single dict lookup, paths with {parameters}
+# walk a segment tree.
+import logging
+from collections.abc import Callable
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+
+RouteHandler = Callable[[LatticeRequest], LatticeResponse]
+
+logger = logging.getLogger(__name__)
+
+
+class _SegmentNode:
+
+    def __init__(self) -> None:
+        self.static: dict[str, _SegmentNode] = {}
+        self.parameter: _SegmentNode | None = None
+        self.parameter_name: str | None = None
+        self.handlers: dict[str, RouteHandler] = {}
+
+
+def _split_path(path: str) -> list[str]:
+    return [segment for segment in path.split('/') if segment]
+
+
+def _split_request_path(path: str) -> list[str]:
+    # Decoded after splitting, so %2F in a path parameter doesn't become a segment boundary
+    return [unquote(segment) for segment in _split_path(path)]
+
+
+class Router:
+
+    def __init__(self) -> None:
+        # Static routes, keyed by path segments and then method
+        self.static_routes: dict[tuple[str, ...], dict[str, RouteHandler]] = {}
+        self.dynamic_routes = _SegmentNode()
+
+    def add_route(self, method: str, path: str, handler: RouteHandler) -> None:
+        segments = _split_path(path)
+        if not any(segment.startswith('{') for segment in segments):
+            handlers = self.static_routes.setdefault(tuple(segments), {})
+        else:
+            handlers = self._add_dynamic_route(segments)
+        if method.upper() in handlers:
+            raise ValueError(f'Route {method.upper()} {path} is defined more than once')
+        handlers[method.upper()] = handler
+
+    def _add_dynamic_route(self, segments: list[str]) -> dict[str, RouteHandler]:
+        node = self.dynamic_routes
+        for segment in segments:
+            if not segment.startswith('{'):
+                node = node.static.setdefault(segment, _SegmentNode())
+                continue
+            name = segment.strip('{}')
+            if node.parameter is None:
+                node.parameter, node.parameter_name = _SegmentNode(), name
+            elif node.parameter_name != name:
+                raise ValueError(f'Path parameter {{{name}}} clashes with {{{node.parameter_name}}} at the same position')
+            node = node.parameter
+        return node.handlers
+
+    def route(self, method: str, path: str) -> Callable[[RouteHandler], RouteHandler]:
+
+        def register(handler: RouteHandler) -> RouteHandler:
+            self.add_route(method, path, handler)
+            return handler
+
+        return register
+
+    def get(self, path: str) -> Callable[[RouteHandler], RouteHandler]:
+        return self.route('GET', path)
+
+    def post(self, path: str) -> Callable[[RouteHandler], RouteHandler]:
+        return self.route('POST', path)
+
+    def put(self, path: str) -> Callable[[RouteHandler], RouteHandler]:
+        return self.route('PUT', path)
+
+    def delete(self, path: str) -> Callable[[RouteHandler], RouteHandler]:
+        return self.route('DELETE', path)
+
+    def match(self, path: str) -> tuple[dict[str, RouteHandler] | None, dict[str, str]]:
+        segments = _split_request_path(path)
+        handlers = self.static_routes.get(tuple(segments))
+        if handlers is not None:
+            return handlers, {}
+        path_params: dict[str, str] = {}
+        node = self._match_segments(self.dynamic_routes, segments, 0, path_params)
+        return (node.handlers, path_params) if node else (None, {})
+
+    def _match_segments(self, node: _SegmentNode, segments: list[str], index: int, path_params: dict[str, str]) -> _SegmentNode | None:
+        if index == len(segments):
+            return node if node.handlers else None
+        segment = segments[index]
+        # A static segment wins over a parameter, the parameter is only tried when the static branch leads nowhere
+        static_node = node.static.get(segment)
+        if static_node is not None:
+            matched = self._match_segments(static_node, segments, index + 1, path_params)
+            if matched is not None:
+                return matched
+        if node.parameter is not None:
+            matched = self._match_segments(node.parameter, segments, index + 1, path_params)
+            if matched is not None:
+                path_params[node.parameter_name] = segment
+                return matched
+        return None
+
+    def dispatch(self, request: LatticeRequest) -> LatticeResponse:
+        handlers, request.path_params = self.match(request.path)
+        if not handlers:
+            return LatticeResponse.error(HTTPStatus.NOT_FOUND)
+        handler = handlers.get(request.method) or (handlers.get('GET') if request.method == 'HEAD' else None)
+        if handler is None:
+            return LatticeResponse.error(HTTPStatus.METHOD_NOT_ALLOWED, headers={'Allow': ', '.join(sorted(handlers))})
+        try:
+            response = handler(request)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception('Route %s %s failed', request.method, request.path)
+            return LatticeResponse.error(HTTPStatus.INTERNAL_SERVER_ERROR)
+        # A HEAD keeps the body of its GET until the content is negotiated, see lambda_function.handle
+        return response
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import pytest
+
+from tools import build_lambda
+
+
+@pytest.fixture(name='layer_dir')
+def fixture_layer_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    layer_dir = tmp_path / 'common_layer' / 'python'
+    layer_dir.mkdir(parents=True)
+    monkeypatch.setattr(build_lambda, 'LAYER_PYTHON_DIR', layer_dir)
+    return layer_dir
+
+
+def write_distribution(layer_dir: Path, name: str, files: list[str]) -> Path:
+    dist_info = layer_dir / f'{name}-1.0.dist-info'
+    dist_info.mkdir()
+    (dist_info / 'METADATA').write_text(f'Name: {name}\n', encoding='utf-8')
+    (dist_info / 'RECORD').write_text(''.join(f'{file},,\n' for file in files), encoding='utf-8')
+    return dist_info
+
+
+def test_remove_keeps_files_outside_the_layer(layer_dir: Path) -> None:
+    outside = layer_dir.parent.parent / 'bin' / 'tool'
+    outside.parent.mkdir()
+    outside.write_text('#!/bin/sh', encoding='utf-8')
+    (layer_dir / 'tool').mkdir()
+    (layer_dir / 'tool' / '__init__.py').write_text('', encoding='utf-8')
+    dist_info = write_distribution(layer_dir, 'tool', ['tool/__init__.py', '../../bin/tool'])
+
+    distribution = build_lambda.Distribution(dist_info)
+    distribution.remove()
+
+    assert distribution.top_level == {'tool'}
+    assert not (layer_dir / 'tool' / '__init__.py').exists()
+    assert not dist_info.exists()
+    assert outside.exists()
+
+
+def test_strip_files_only_strips_tests_inside_packages(layer_dir: Path) -> None:
+    for path in ('test/__init__.py', 'tests/__init__.py', 'package/tests/test_package.py', 'package/__pycache__/module.pyc',
+                 'package/module.pyi', 'package/module.py'):
+        (layer_dir / path).parent.mkdir(parents=True, exist_ok=True)
+        (layer_dir / path).write_text('', encoding='utf-8')
+
+    build_lambda.strip_files(layer_dir)
+
+    remaining = sorted(str(path.relative_to(layer_dir)) for path in layer_dir.rglob('*') if path.is_file())
+    assert remaining == ['package/module.py', 'test/__init__.py', 'tests/__init__.py']
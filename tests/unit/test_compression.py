@@ -0,0 +1,99 @@
+import base64
+import gzip
+import json
+from http import HTTPStatus
+
+import pytest
+
+from lambda_handlers import compression
+from lambda_handlers.compression import compress_response, negotiate_encoding, parse_accept_encoding
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+
+
+def make_request(accept_encoding: str | None) -> LatticeRequest:
+    headers = {'accept-encoding': [accept_encoding]} if accept_encoding is not None else {}
+    return LatticeRequest.from_event({'version': '2.0', 'method': 'GET', 'path': '/', 'headers': headers})
+
+
+def test_parse_accept_encoding() -> None:
+    assert parse_accept_encoding('gzip;q=0.5, BR ;q=0, *;q=0.1, deflate, compress;q=oops') == {
+        'gzip': 0.5,
+        'br': 0.0,
+        '*': 0.1,
+        'deflate': 1.0,
+        'compress': 0.0,
+    }
+    assert not parse_accept_encoding(None)
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip, br', 'br'),
+    ('br;q=0.5, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0.1', 'gzip'),
+    ('br;q=0, gzip;q=0', None),
+    ('*', 'br'),
+    ('*;q=0.2, br;q=0.1', 'gzip'),
+    ('identity', None),
+    ('', None),
+    (None, None),
+])
+def test_negotiate_encoding(monkeypatch: pytest.MonkeyPatch, accept_encoding: str | None, expected: str | None) -> None:
+    monkeypatch.setattr(compression, 'SUPPORTED_ENCODINGS', ('br', 'gzip'))
+
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_threshold_counts_encoded_bytes() -> None:
+    # 600 characters, but 1200 bytes once UTF-8 encoded, above the 1024 byte threshold
+    body = json.dumps({'name': 'ż' * 600}, ensure_ascii=False)
+    response = LatticeResponse(body=body, headers={'Content-Type': 'application/json', 'ETag': '"abc"'})
+
+    compressed = compress_response(make_request('gzip'), response)
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] == '"abc-gzip"'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(base64.b64decode(compressed.to_lattice()['body'])).decode() == body
+
+
+def test_compressed_body_is_memoised() -> None:
+    response = LatticeResponse.json({'padding': 'x' * 2048})
+
+    first = compress_response(make_request('gzip'), response)
+    second = compress_response(make_request('gzip'), response)
+
+    assert first.body is second.body
+    assert response.encoded_bodies == {'identity': response.body.encode(), 'gzip': first.body}
+
+
+def test_small_str_body_is_encoded_once() -> None:
+    response = LatticeResponse.json({'status': 'ok'})
+
+    compress_response(make_request('gzip'), response)
+    identity = response.encoded_bodies['identity']
+    compress_response(make_request('gzip'), response)
+
+    assert response.encoded_bodies == {'identity': response.body.encode()}
+    assert response.encoded_bodies['identity'] is identity
+
+
+def test_small_body_is_sent_as_is_with_vary() -> None:
+    response = compress_response(make_request('gzip'), LatticeResponse.json({'status': 'ok'}, headers={'Vary': 'Accept-Language'}))
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Language, Accept-Encoding'
+
+
+def test_incompressible_content_type_is_untouched() -> None:
+    response = LatticeResponse(body=b'\x89PNG' * 1024, headers={'Content-Type': 'image/png'})
+
+    assert compress_response(make_request('gzip'), response) is response
+
+
+def test_not_modified_is_passed_through() -> None:
+    not_modified = LatticeResponse(status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': '"abc-gzip"'})
+
+    response = compress_response(make_request('gzip'), not_modified)
+
+    assert response is not_modified
+    assert response.headers == {'ETag': '"abc-gzip"'}
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+from aws_cdk import App, Stack
+from aws_cdk.assertions import Match, Template
+from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function import lambda_construct
+from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function.lambda_construct import LambdaConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function.lambda_tuning import LambdaTuning, ProvisionedConcurrencySchedule
+
+
+@pytest.fixture(name='stack')
+def fixture_stack(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Stack:
+    # Stands in for the output of tools/build_lambda.py
+    (tmp_path / 'lambdas').mkdir()
+    (tmp_path / 'lambdas' / 'lambda_function.py').write_text('', encoding='utf-8')
+    monkeypatch.setattr(lambda_construct, 'LAMBDA_CODE_DIR', str(tmp_path / 'lambdas'))
+    monkeypatch.setattr(lambda_construct, 'COMMON_LAYER_DIR', str(tmp_path / 'common_layer'))
+    return Stack(App(), 'Stack')
+
+
+def test_live_alias_points_to_the_current_version(stack: Stack) -> None:
+    LambdaConstruct(stack, 'Lambda')
+    template = Template.from_stack(stack)
+
+    template.has_resource_properties(
+        'AWS::Lambda::Alias', {
+            'Name': 'live',
+            'FunctionVersion': {
+                'Fn::GetAtt': [Match.string_like_regexp('LambdaLambdaFunctionCurrentVersion'), 'Version']
+            },
+            'ProvisionedConcurrencyConfig': Match.absent(),
+        })
+    template.resource_count_is('AWS::ApplicationAutoScaling::ScalableTarget', 0)
+
+
+def test_provisioned_concurrency_scales_on_utilization_and_schedules(stack: Stack) -> None:
+    LambdaConstruct(
+        stack, 'Lambda', tuning=LambdaTuning(
+            provisioned_concurrency_min=2, provisioned_concurrency_max=10, provisioned_concurrency_schedules=(
+                ProvisionedConcurrencySchedule(name='WorkdayMorning', expression='cron(0 7 ? * MON-FRI *)', min_capacity=5,
+                                               max_capacity=20),
+                ProvisionedConcurrencySchedule(name='WorkdayEvening', expression='cron(0 19 ? * MON-FRI *)', min_capacity=2,
+                                               max_capacity=10),
+            )))
+    template = Template.from_stack(stack)
+
+    template.has_resource_properties('AWS::Lambda::Alias', {
+        'Name': 'live',
+        'ProvisionedConcurrencyConfig': {
+            'ProvisionedConcurrentExecutions': 2
+        }
+    })
+    template.has_resource_properties(
+        'AWS::ApplicationAutoScaling::ScalableTarget', {
+            'ServiceNamespace':
+                'lambda',
+            'ScalableDimension':
+                'lambda:function:ProvisionedConcurrency',
+            'MinCapacity':
+                2,
+            'MaxCapacity':
+                10,
+            'ScheduledActions': [
+                {
+                    'ScheduledActionName': 'WorkdayMorning',
+                    'Schedule': 'cron(0 7 ? * MON-FRI *)',
+                    'ScalableTargetAction': {
+                        'MinCapacity': 5,
+                        'MaxCapacity': 20
+                    }
+                },
+                {
+                    'ScheduledActionName': 'WorkdayEvening',
+                    'Schedule': 'cron(0 19 ? * MON-FRI *)',
+                    'ScalableTargetAction': {
+                        'MinCapacity': 2,
+                        'MaxCapacity': 10
+                    }
+                },
+            ],
+        })
+    template.has_resource_properties(
+        'AWS::ApplicationAutoScaling::ScalingPolicy', {
+            'PolicyType': 'TargetTrackingScaling',
+            'TargetTrackingScalingPolicyConfiguration': {
+                'TargetValue': 0.7,
+                'PredefinedMetricSpecification': {
+                    'PredefinedMetricType': 'LambdaProvisionedConcurrencyUtilization'
+                }
+            }
+        })
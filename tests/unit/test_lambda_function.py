@@ -0,0 +1,48 @@
+import base64
+import gzip
+import json
+from dataclasses import replace
+from typing import Any
+
+import pytest
+
+from lambda_handlers import compression, lambda_function
+from lambda_handlers.config import CONFIG
+
+
+def make_event(method: str, headers: dict[str, list[str]]) -> dict[str, Any]:
+    return {'version': '2.0', 'method': method, 'path': '/', 'headers': headers}
+
+
+@pytest.fixture(name='compress_everything', autouse=True)
+def fixture_compress_everything(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The status route's body is below the default threshold
+    monkeypatch.setattr(compression, 'CONFIG', replace(CONFIG, compression_min_bytes=1))
+    lambda_function.response_cache.clear()
+
+
+def test_get_is_compressed_and_tagged_per_encoding() -> None:
+    response = lambda_function.handle(make_event('GET', {'accept-encoding': ['gzip']}), None)
+
+    assert response['headers']['Content-Encoding'] == 'gzip'
+    assert response['headers']['ETag'].endswith('-gzip"')
+    assert json.loads(gzip.decompress(base64.b64decode(response['body']))) == {'status ': 'Lambda works!'}
+
+
+@pytest.mark.parametrize('accept_encoding', ['gzip', 'identity'])
+def test_head_has_the_headers_of_get_without_the_body(accept_encoding: str) -> None:
+    get = lambda_function.handle(make_event('GET', {'accept-encoding': [accept_encoding]}), None)
+    head = lambda_function.handle(make_event('HEAD', {'accept-encoding': [accept_encoding]}), None)
+
+    assert head['statusCode'] == 200
+    assert head['headers'] == get['headers']
+    assert (head['body'], head['isBase64Encoded']) == ('', False)
+
+
+def test_head_revalidates_against_the_compressed_etag() -> None:
+    etag = lambda_function.handle(make_event('HEAD', {'accept-encoding': ['gzip']}), None)['headers']['ETag']
+
+    response = lambda_function.handle(make_event('GET', {'accept-encoding': ['gzip'], 'if-none-match': [etag]}), None)
+
+    assert response['statusCode'] == 304
+    assert response['headers']['ETag'] == etag
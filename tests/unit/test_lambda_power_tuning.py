@@ -0,0 +1,35 @@
+import json
+from pathlib import Path
+
+from lambda_handlers.lambda_function import handle
+from lambda_handlers.lattice_event import LatticeRequest
+from tools.lambda_power_tuning import SAMPLE_EVENT, LambdaContext, run_worker, write_sample_event
+
+
+def test_sample_event_is_a_lattice_v2_get_of_the_status_route() -> None:
+    request = LatticeRequest.from_event(SAMPLE_EVENT)
+
+    assert (request.version, request.method, request.path, request.body) == ('2.0', 'GET', '/', b'')
+    assert request.header('Accept') == 'application/json'
+    assert request.source_vpc_arn == 'arn:aws:ec2:eu-west-1:123456789012:vpc/vpc-0123456789abcdef0'
+
+
+def test_sample_event_is_answered_by_the_handler() -> None:
+    response = handle(SAMPLE_EVENT, LambdaContext(512))
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == {'status ': 'Lambda works!'}
+
+
+def test_sample_event_is_written_for_the_workers(tmp_path: Path) -> None:
+    event_path = write_sample_event(tmp_path / 'build' / 'power_tuning_event.json')
+
+    assert json.loads(event_path.read_text(encoding='utf-8')) == SAMPLE_EVENT
+
+
+def test_worker_measures_the_cold_and_warm_invocations() -> None:
+    result = run_worker(512, 3, SAMPLE_EVENT)
+
+    assert result['memory_size_mib'] == 512
+    assert len(result['warm_ms']) == 2
+    assert min(result['init_ms'], result['cold_ms'], *result['warm_ms']) >= 0
@@ -0,0 +1,130 @@
+import gzip
+import json
+import math
+import random
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from tools.lattice_access_logs import RELATIVE_ACCURACY, REPORTED_QUANTILES, AccessLogAnalysis, QuantileSketch, analyse, normalize_path
+
+SERVICE_ARN = 'arn:aws:vpc-lattice:eu-west-1:123456789012:service/svc-0123456789abcdef0'
+TARGET_GROUP_ARN = 'arn:aws:vpc-lattice:eu-west-1:123456789012:targetgroup/tg-0123456789abcdef0'
+
+
+def make_record(duration: float, response_code: int = 200, path: str = '/items', **fields: Any) -> str:
+    record = {
+        'serviceArn': SERVICE_ARN,
+        'targetGroupArn': TARGET_GROUP_ARN,
+        'requestPath': path,
+        'duration': duration,
+        'responseCode': response_code,
+        **fields,
+    }
+    return json.dumps(record)
+
+
+def exact_quantile(sorted_values: list[float], quantile: float) -> float:
+    # The value at the rank the sketch looks up
+    return sorted_values[math.floor(quantile * (len(sorted_values) - 1))]
+
+
+@pytest.fixture(name='latencies')
+def fixture_latencies() -> list[float]:
+    # Long-tailed like request latencies, from a fraction of a millisecond to seconds
+    generator = random.Random(42)
+    return [generator.lognormvariate(3, 1.5) for _ in range(20000)]
+
+
+def test_quantiles_are_within_the_relative_accuracy(latencies: list[float]) -> None:
+    sketch = QuantileSketch()
+    for latency in latencies:
+        sketch.add(latency)
+
+    sorted_latencies = sorted(latencies)
+    for quantile in (0.0, 0.25, *REPORTED_QUANTILES, 1.0):
+        expected = exact_quantile(sorted_latencies, quantile)
+        assert sketch.quantile(quantile) == pytest.approx(expected, rel=RELATIVE_ACCURACY)
+    assert sketch.count == len(latencies)
+    assert sketch.max == max(latencies)
+
+
+def test_merged_sketches_equal_one_sketch(latencies: list[float]) -> None:
+    whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for index, latency in enumerate(latencies):
+        whole.add(latency)
+        (first if index % 2 else second).add(latency)
+
+    first.merge(QuantileSketch.from_dict(json.loads(json.dumps(second.to_dict()))))
+
+    assert first.bins == whole.bins
+    assert [first.quantile(quantile) for quantile in REPORTED_QUANTILES] == [whole.quantile(quantile) for quantile in REPORTED_QUANTILES]
+
+
+def test_collapsing_keeps_the_upper_quantiles(latencies: list[float]) -> None:
+    sketch = QuantileSketch(max_bins=64)
+    for latency in latencies:
+        sketch.add(latency)
+
+    assert len(sketch.bins) <= 64
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile(sorted(latencies), 0.99), rel=RELATIVE_ACCURACY)
+
+
+def test_sketches_of_different_accuracy_are_not_merged() -> None:
+    with pytest.raises(ValueError):
+        QuantileSketch().merge(QuantileSketch(relative_accuracy=0.02))
+
+
+def test_parses_records_and_counts_errors() -> None:
+    analysis = AccessLogAnalysis()
+    for line in (
+            make_record(10.0),
+            make_record(20.0, 404, path='/items/42?verbose=true'),
+            # CloudWatch Logs exports prefix the record with its timestamp
+            f'2024-03-01T12:30:45.000Z {make_record(30.0, 503, path="/items/6f1c2a4e-9b0d-4c3e-8f7a-1b2c3d4e5f60")}',
+            make_record(0.0, 200, targetGroupArn='-'),
+            'not a record',
+            json.dumps({'serviceArn': SERVICE_ARN}),
+            '',
+    ):
+        analysis.add_line(line)
+
+    stats = analysis.targets[('svc-0123456789abcdef0', 'tg-0123456789abcdef0')]
+    assert (stats.sketch.count, stats.client_errors, stats.server_errors) == (3, 1, 1)
+    assert analysis.targets[('svc-0123456789abcdef0', '-')].sketch.zero_count == 1
+    assert analysis.paths[('svc-0123456789abcdef0', '/items/{id}')].sketch.count == 2
+    assert analysis.malformed_lines == 2
+
+
+def test_normalize_path() -> None:
+    assert normalize_path('/items/42/parts?page=2') == '/items/{id}/parts'
+    assert normalize_path('/users/0123456789abcdef0123') == '/users/{id}'
+    assert normalize_path('/health') == '/health'
+    assert normalize_path('') == '/'
+
+
+def test_analyses_plain_and_gzipped_files(tmp_path: Path, latencies: list[float]) -> None:
+    # Gzipped without the .gz suffix, as S3 delivery sometimes names them
+    (tmp_path / 'delivered.log').write_bytes(gzip.compress('\n'.join(make_record(latency) for latency in latencies[:10000]).encode()))
+    (tmp_path / 'exported.log').write_text('\n'.join(make_record(latency) for latency in latencies[10000:]), encoding='utf-8')
+
+    analysis = analyse(sorted(tmp_path.iterdir()), jobs=1)
+
+    sketch = analysis.targets[('svc-0123456789abcdef0', 'tg-0123456789abcdef0')].sketch
+    assert sketch.count == len(latencies)
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile(sorted(latencies), 0.99), rel=RELATIVE_ACCURACY)
+
+
+def test_saved_analyses_merge(latencies: list[float]) -> None:
+    whole, first, second = AccessLogAnalysis(), AccessLogAnalysis(), AccessLogAnalysis()
+    for index, latency in enumerate(latencies[:1000]):
+        line = make_record(latency, path=f'/items/{index % 3}')
+        whole.add_line(line)
+        (first if index % 2 else second).add_line(line)
+
+    first.merge(AccessLogAnalysis.from_dict(json.loads(json.dumps(second.to_dict()))))
+
+    assert first.paths.keys() == whole.paths.keys()
+    for key, stats in whole.targets.items():
+        assert first.targets[key].sketch.bins == stats.sketch.bins
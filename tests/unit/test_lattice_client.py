@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import urllib3
+from botocore import auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from botocore.exceptions import NoCredentialsError
+
+from lambda_handlers import lattice_client
+from lambda_handlers.lattice_client import LATTICE_SIGNING_SERVICE, LatticeClient, ServiceCall, ServiceResponse, SigV4Signer
+
+FIXED_TIME = datetime(2024, 3, 1, 12, 30, 45, tzinfo=timezone.utc)
+REGION = 'eu-west-1'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the client can reuse its connections
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self._answer()
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get('content-length', 0)))
+        self._answer()
+
+    def _answer(self) -> None:
+        server: StandInServer = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.client_address))
+            attempt = sum(path == self.path for _, path, _ in server.requests)
+        # /slow always takes a second, /slow-once only the first time it's called
+        if self.path == '/slow' or self.path.startswith('/slow-once') and attempt == 1:
+            time.sleep(1)
+        body = f'{{"attempt": {attempt}}}'.encode()
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.lock = threading.Lock()
+        self.requests: list[tuple[str, str, tuple[str, int]]] = []
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+@pytest.fixture(name='server')
+def fixture_server() -> Iterator[StandInServer]:
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_signer(token: str | None = 'session-token') -> SigV4Signer:
+    return SigV4Signer(REGION, credentials=Credentials('AKIDEXAMPLE', 'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY', token),
+                       clock=FIXED_TIME.timestamp)
+
+
+@pytest.fixture(name='client')
+def fixture_client() -> LatticeClient:
+    return LatticeClient(signer=make_signer(), pool_size=2, timeout=2.0)
+
+
+@pytest.mark.parametrize('url', [
+    'https://svc-0123456789abcdef0.7d67968.vpc-lattice-svcs.eu-west-1.on.aws/',
+    'https://svc-0123456789abcdef0.7d67968.vpc-lattice-svcs.eu-west-1.on.aws/items/a%20b?z=1&a=%2F&empty=&A=upper',
+    'http://localhost:8080/items/42?tag=b&tag=a',
+])
+@pytest.mark.parametrize('token', ['session-token', None])
+def test_signature_matches_botocore(monkeypatch: pytest.MonkeyPatch, url: str, token: str | None) -> None:
+    signer = make_signer(token)
+    signed = signer.sign('GET', url, {'accept-encoding': 'gzip', 'x-custom': '  spaced   value '})
+
+    monkeypatch.setattr(auth, 'get_current_datetime', lambda: FIXED_TIME.replace(tzinfo=None))
+    request = AWSRequest(method='GET', url=url, headers={name: value for name, value in signed.items() if name != 'authorization'})
+    request.context['payload_signing_enabled'] = False
+    auth.SigV4Auth(signer.credentials, LATTICE_SIGNING_SERVICE, REGION).add_auth(request)
+
+    assert signed['x-amz-date'] == request.headers['X-Amz-Date'] == '20240301T123045Z'
+    assert signed['authorization'] == request.headers['Authorization']
+
+
+def test_missing_credentials_are_reported_by_the_signer(monkeypatch: pytest.MonkeyPatch) -> None:
+    # What botocore's session returns when no credential provider finds any
+    monkeypatch.setattr(lattice_client, 'get_session', lambda: SimpleNamespace(get_credentials=lambda: None))
+
+    with pytest.raises(NoCredentialsError):
+        SigV4Signer(REGION)
+
+
+def test_signing_key_is_derived_once_per_day() -> None:
+    signer = make_signer()
+
+    key = signer.get_signing_key('secret', '20240301')
+
+    assert signer.get_signing_key('secret', '20240301') is key
+    assert signer.get_signing_key('secret', '20240302') != key
+
+
+def test_pool_reuses_connections(server: StandInServer, client: LatticeClient) -> None:
+    responses = [client.request('GET', f'{server.url}/items/{index}') for index in range(5)]
+
+    assert [response.status for response in responses] == [200] * 5
+    assert len({client_address for _, _, client_address in server.requests}) == 1
+
+
+def test_requests_are_signed(server: StandInServer, client: LatticeClient) -> None:
+    response = client.call(ServiceCall('POST', f'{server.url}/items', body=b'{}'))
+
+    assert response.json() == {'attempt': 1}
+    assert server.requests[0][:2] == ('POST', '/items')
+
+
+def test_timeout_cancels_the_call(server: StandInServer, client: LatticeClient) -> None:
+    started = time.perf_counter()
+
+    with pytest.raises((asyncio.TimeoutError, urllib3.exceptions.TimeoutError)):
+        asyncio.run(client.call_async(ServiceCall('GET', f'{server.url}/slow'), timeout=0.2))
+
+    assert time.perf_counter() - started < 0.8
+
+
+def test_gather_returns_failures_in_place(server: StandInServer, client: LatticeClient) -> None:
+    calls = [ServiceCall('GET', f'{server.url}/fast'), ServiceCall('GET', f'{server.url}/slow')]
+
+    fast, slow = asyncio.run(client.gather(calls, timeout=0.3))
+
+    assert fast.status == 200
+    assert isinstance(slow, (asyncio.TimeoutError, urllib3.exceptions.TimeoutError))
+
+
+def test_hedged_retry_answers_before_the_slow_attempt(server: StandInServer, client: LatticeClient) -> None:
+
+    async def timed_call() -> tuple[ServiceResponse, float]:
+        # Timed inside the loop, asyncio.run still waits for the abandoned attempt's thread on shutdown
+        started = time.perf_counter()
+        response = await client.call_async(ServiceCall('GET', f'{server.url}/slow-once'), timeout=2.0, hedge_after=0.1)
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(timed_call())
+
+    assert elapsed < 0.8
+    assert response.json() == {'attempt': 2}
+    assert [path for _, path, _ in server.requests] == ['/slow-once', '/slow-once']
+
+
+def test_non_idempotent_calls_are_not_hedged(server: StandInServer, client: LatticeClient) -> None:
+    response = asyncio.run(client.call_async(ServiceCall('POST', f'{server.url}/slow-once-post'), timeout=2.0, hedge_after=0.1))
+
+    assert response.json() == {'attempt': 1}
+    assert len(server.requests) == 1
@@ -0,0 +1,271 @@
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Final
+
+import pytest
+from aws_cdk import App, Environment, Stack, aws_ec2
+from aws_cdk.assertions import Template
+from simple_networks_with_amazon_vpc_lattice_cdk import simple_networks_with_amazon_vpc_lattice_stack as lattice_stack
+from simple_networks_with_amazon_vpc_lattice_cdk.lambda_function import lambda_construct
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_construct import LatticeConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import (
+    LatticeAuthSpec,
+    LatticeHeaderMatch,
+    LatticeListenerSpec,
+    LatticeRouteSpec,
+    LatticeRoutingSpec,
+    LatticeServiceSpec,
+    LatticeTargetGroupSpec,
+    LatticeWeightedTarget,
+)
+
+LATTICE_ID: Final[str] = 'SimpleNetworksWithAmazonVPCLatticeLattice'
+EC2_VPC_ID: Final[str] = 'SimpleNetworksWithAmazonVPCLatticeEC2InstanceEc2Vpc3B01F663'
+
+# Logical IDs of the Lattice resources of deployed stacks, a changed ID replaces the resource
+LATTICE_LOGICAL_IDS: Final[dict[str, str]] = {
+    f'{LATTICE_ID}LatticeNetwork0F0D26D9': 'AWS::VpcLattice::ServiceNetwork',
+    f'{LATTICE_ID}ec2vpcassociation30806680': 'AWS::VpcLattice::ServiceNetworkVpcAssociation',
+    f'{LATTICE_ID}ecsvpcassociationE1A5A1F5': 'AWS::VpcLattice::ServiceNetworkVpcAssociation',
+    f'{LATTICE_ID}lambdavpcassociation189572E2': 'AWS::VpcLattice::ServiceNetworkVpcAssociation',
+    f'{LATTICE_ID}latticenetworkaccesslogss31D097503': 'AWS::VpcLattice::AccessLogSubscription',
+    f'{LATTICE_ID}ec2asgtargetgroupA7CD0678': 'AWS::VpcLattice::TargetGroup',
+    f'{LATTICE_ID}ecsiptargetgroup7169A232': 'AWS::VpcLattice::TargetGroup',
+    f'{LATTICE_ID}lambdatargetgroup871D34C2': 'AWS::VpcLattice::TargetGroup',
+    f'{LATTICE_ID}ec2service754D3D52': 'AWS::VpcLattice::Service',
+    f'{LATTICE_ID}ec2serviceenetworkassociation9AE47E13': 'AWS::VpcLattice::ServiceNetworkServiceAssociation',
+    f'{LATTICE_ID}ec2listenerC9B4C89A': 'AWS::VpcLattice::Listener',
+    f'{LATTICE_ID}ecsservice0921409D': 'AWS::VpcLattice::Service',
+    f'{LATTICE_ID}ecsserviceenetworkassociationEA317F02': 'AWS::VpcLattice::ServiceNetworkServiceAssociation',
+    f'{LATTICE_ID}ecslistenerE0E1CCC0': 'AWS::VpcLattice::Listener',
+    f'{LATTICE_ID}lambdaserviceF62F2C4E': 'AWS::VpcLattice::Service',
+    f'{LATTICE_ID}lambdaserviceenetworkassociationEF9DC1AF': 'AWS::VpcLattice::ServiceNetworkServiceAssociation',
+    f'{LATTICE_ID}lambdalistener8651352A': 'AWS::VpcLattice::Listener',
+    f'{LATTICE_ID}lambdaserviceauthpolicy197AE5FF': 'AWS::VpcLattice::AuthPolicy',
+}
+
+
+def get_att_arn(logical_id: str) -> dict[str, Any]:
+    return {'Fn::GetAtt': [logical_id, 'Arn']}
+
+
+def target_group_arn(template: Template, name: str) -> dict[str, Any]:
+    (logical_id,) = template.find_resources('AWS::VpcLattice::TargetGroup', {'Properties': {'Name': name}})
+    return get_att_arn(logical_id)
+
+
+def vpc_logical_id(template: Template, construct_id: str) -> str:
+    return next(logical_id for logical_id in template.find_resources('AWS::EC2::VPC') if logical_id.startswith(construct_id))
+
+
+def forward(template: Template, *weights: tuple[str, int]) -> dict[str, Any]:
+    return {
+        'Forward': {
+            'TargetGroups': [{
+                'TargetGroupIdentifier': target_group_arn(template, f'{service}targetgroup'),
+                'Weight': weight
+            } for service, weight in weights]
+        }
+    }
+
+
+def synth_lattice(*specs: LatticeServiceSpec) -> Template:
+    stack = Stack.of(specs[0].vpc)
+    LatticeConstruct(stack, 'Lattice', services=specs)
+    return Template.from_stack(stack)
+
+
+@pytest.fixture(name='vpc')
+def fixture_vpc() -> aws_ec2.Vpc:
+    return aws_ec2.Vpc(Stack(App(), 'Stack'), 'Vpc', max_azs=1)
+
+
+@pytest.fixture(name='template', scope='module')
+def fixture_template(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Template]:
+    # The stack is synthesized once, without the output of tools/build_lambda.py
+    build_dir = tmp_path_factory.mktemp('build')
+    (build_dir / 'lambdas').mkdir()
+    (build_dir / 'lambdas' / 'lambda_function.py').write_text('', encoding='utf-8')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(lambda_construct, 'LAMBDA_CODE_DIR', str(build_dir / 'lambdas'))
+        monkeypatch.setattr(lambda_construct, 'COMMON_LAYER_DIR', str(Path(build_dir, 'common_layer')))
+        stack = lattice_stack.SimpleNetworksWithAmazonVpcLatticeStack(App(), 'Stack',
+                                                                      env=Environment(account='123456789012', region='eu-west-1'))
+        yield Template.from_stack(stack)
+
+
+def test_lattice_logical_ids_are_unchanged(template: Template) -> None:
+    lattice_resources = {
+        logical_id: resource['Type']
+        for logical_id, resource in template.to_json()['Resources'].items()
+        if resource['Type'].startswith('AWS::VpcLattice::')
+    }
+
+    assert lattice_resources == LATTICE_LOGICAL_IDS
+
+
+@pytest.mark.parametrize('service, target_group', [('ec2', 'ec2asgtargetgroupA7CD0678'), ('ecs', 'ecsiptargetgroup7169A232'),
+                                                   ('lambda', 'lambdatargetgroup871D34C2')])
+def test_listeners_forward_to_their_own_target_group(template: Template, service: str, target_group: str) -> None:
+    service_id = next(logical_id for logical_id in LATTICE_LOGICAL_IDS if logical_id.startswith(f'{LATTICE_ID}{service}service'))
+    template.has_resource_properties(
+        'AWS::VpcLattice::Listener', {
+            'Port': 80,
+            'Protocol': 'HTTP',
+            'ServiceIdentifier': get_att_arn(service_id),
+            'DefaultAction': {
+                'Forward': {
+                    'TargetGroups': [{
+                        'TargetGroupIdentifier': get_att_arn(f'{LATTICE_ID}{target_group}'),
+                        'Weight': 100
+                    }]
+                }
+            },
+        })
+
+
+def test_services_have_no_rules(template: Template) -> None:
+    template.resource_count_is('AWS::VpcLattice::Rule', 0)
+
+
+def test_only_the_ec2_vpc_may_invoke_the_lambda_service(template: Template) -> None:
+    template.has_resource_properties('AWS::VpcLattice::Service', {'AuthType': 'AWS_IAM'})
+    template.has_resource_properties(
+        'AWS::VpcLattice::AuthPolicy', {
+            'ResourceIdentifier': get_att_arn(f'{LATTICE_ID}lambdaserviceF62F2C4E'),
+            'Policy': {
+                'Version':
+                    '2012-10-17',
+                'Statement': [{
+                    'Effect': 'Allow',
+                    'Principal': '*',
+                    'Action': 'vpc-lattice-svcs:Invoke',
+                    'Resource': '*',
+                    'Condition': {
+                        'StringEquals': {
+                            'vpc-lattice-svcs:SourceVpc': {
+                                'Ref': EC2_VPC_ID
+                            }
+                        }
+                    }
+                }]
+            },
+        })
+
+
+def test_routes_become_rules_with_weighted_actions(vpc: aws_ec2.Vpc) -> None:
+    ecs = LatticeServiceSpec(
+        name='ecs', vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='IP'), routing=LatticeRoutingSpec(
+            default_forward=(LatticeWeightedTarget(service='ecs', weight=95), LatticeWeightedTarget(service='ecscanary', weight=5)),
+            routes=(
+                LatticeRouteSpec(priority=10, path_prefix='/items', method='GET', forward=(LatticeWeightedTarget(service='lambda'),)),
+                LatticeRouteSpec(
+                    priority=20, headers=(LatticeHeaderMatch(name='x-canary', value='true'),),
+                    forward=(LatticeWeightedTarget(service='ecs', weight=50), LatticeWeightedTarget(service='ecscanary', weight=50))),
+            )))
+    template = synth_lattice(
+        ecs,
+        LatticeServiceSpec(name='ecscanary', vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='IP'), target_group_only=True),
+        LatticeServiceSpec(name='lambda', vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='LAMBDA')),
+    )
+
+    template.resource_count_is('AWS::VpcLattice::Service', 2)
+    template.has_resource_properties('AWS::VpcLattice::Listener', {'DefaultAction': forward(template, ('ecs', 95), ('ecscanary', 5))})
+    template.has_resource_properties(
+        'AWS::VpcLattice::Rule', {
+            'Name': 'ecsrule10',
+            'Priority': 10,
+            'Match': {
+                'HttpMatch': {
+                    'Method': 'GET',
+                    'PathMatch': {
+                        'Match': {
+                            'Prefix': '/items'
+                        }
+                    }
+                }
+            },
+            'Action': forward(template, ('lambda', 100)),
+        })
+    template.has_resource_properties(
+        'AWS::VpcLattice::Rule', {
+            'Name': 'ecsrule20',
+            'Priority': 20,
+            'Match': {
+                'HttpMatch': {
+                    'HeaderMatches': [{
+                        'Name': 'x-canary',
+                        'CaseSensitive': False,
+                        'Match': {
+                            'Exact': 'true'
+                        }
+                    }]
+                }
+            },
+            'Action': forward(template, ('ecs', 50), ('ecscanary', 50)),
+        })
+
+
+def test_auth_policy_allows_every_source_vpc(vpc: aws_ec2.Vpc) -> None:
+    source_vpc = aws_ec2.Vpc(Stack.of(vpc), 'SourceVpc', max_azs=1)
+    template = synth_lattice(
+        LatticeServiceSpec(name='lambda', vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='LAMBDA'),
+                           auth=LatticeAuthSpec(auth_type='AWS_IAM', allowed_source_vpcs=(vpc, source_vpc))))
+    vpc_refs = [{'Ref': vpc_logical_id(template, name)} for name in ('Vpc', 'SourceVpc')]
+
+    template.has_resource_properties('AWS::VpcLattice::Service', {'AuthType': 'AWS_IAM'})
+    template.resource_count_is('AWS::VpcLattice::ServiceNetworkVpcAssociation', 2)
+    template.has_resource_properties(
+        'AWS::VpcLattice::AuthPolicy', {
+            'Policy': {
+                'Version':
+                    '2012-10-17',
+                'Statement': [{
+                    'Effect': 'Allow',
+                    'Principal': '*',
+                    'Action': 'vpc-lattice-svcs:Invoke',
+                    'Resource': '*',
+                    'Condition': {
+                        'StringEquals': {
+                            'vpc-lattice-svcs:SourceVpc': vpc_refs
+                        }
+                    }
+                }]
+            }
+        })
+
+
+def test_grpc_targets_are_health_checked_over_http2_behind_an_https_listener(vpc: aws_ec2.Vpc) -> None:
+    template = synth_lattice(
+        LatticeServiceSpec(
+            name='grpc', vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='IP', port=50051, protocol_version='GRPC'),
+            listener=LatticeListenerSpec(protocol='HTTPS', custom_domain_name='grpc.example.com',
+                                         certificate_arn='arn:aws:acm:eu-west-1:123456789012:certificate/example')))
+
+    template.has_resource_properties(
+        'AWS::VpcLattice::TargetGroup', {
+            'Config': {
+                'Port': 50051,
+                'Protocol': 'HTTP',
+                'ProtocolVersion': 'GRPC',
+                'HealthCheck': {
+                    'Enabled': True,
+                    'Path': '/',
+                    'HealthCheckIntervalSeconds': 10,
+                    'HealthCheckTimeoutSeconds': 5,
+                    'HealthyThresholdCount': 2,
+                    'UnhealthyThresholdCount': 2,
+                    'Matcher': {
+                        'HttpCode': '200-399'
+                    },
+                    'Port': 50051,
+                    'Protocol': 'HTTP',
+                    'ProtocolVersion': 'HTTP2',
+                },
+            }
+        })
+    template.has_resource_properties('AWS::VpcLattice::Listener', {'Protocol': 'HTTPS', 'Port': 443})
+    template.has_resource_properties('AWS::VpcLattice::Service', {
+        'CustomDomainName': 'grpc.example.com',
+        'CertificateArn': 'arn:aws:acm:eu-west-1:123456789012:certificate/example'
+    })
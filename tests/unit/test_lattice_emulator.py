@@ -0,0 +1,204 @@
+import asyncio
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from tools.lattice_emulator.emulator import SOURCE_VPC_HEADER, LatticeEmulator
+from tools.lattice_emulator.http1 import ConnectionPool, HttpRequest, HttpResponse
+from tools.lattice_emulator.load_test import LoadProfile, ServiceResult, run_service
+from tools.lattice_emulator.topology import Topology, load_topology
+
+
+def lattice_resource(resource_type: str, name: str, properties: dict[str, Any]) -> dict[str, Any]:
+    return {'Type': resource_type, 'Properties': properties, 'Metadata': {'aws:cdk:path': f'Stack/Lattice/{name}'}}
+
+
+def forward(*weights: tuple[str, int]) -> dict[str, Any]:
+    return {'Forward': {'TargetGroups': [{'TargetGroupIdentifier': {'Ref': name}, 'Weight': weight} for name, weight in weights]}}
+
+
+TEMPLATE: dict[str, Any] = {
+    'Resources': {
+        'Vpc': {
+            'Type': 'AWS::EC2::VPC',
+            'Properties': {},
+            'Metadata': {
+                'aws:cdk:path': 'Stack/Ec2Construct/Ec2Vpc/Resource'
+            }
+        },
+        'ecsservice':
+            lattice_resource('AWS::VpcLattice::Service', 'ecsservice', {'AuthType': 'AWS_IAM'}),
+        'blue':
+            lattice_resource('AWS::VpcLattice::TargetGroup', 'blue', {
+                'Name': 'blue',
+                'Type': 'IP',
+                'Config': {
+                    'Port': 80
+                }
+            }),
+        'green':
+            lattice_resource('AWS::VpcLattice::TargetGroup', 'green', {
+                'Name': 'green',
+                'Type': 'IP',
+                'Config': {
+                    'Port': 80
+                }
+            }),
+        'drained':
+            lattice_resource('AWS::VpcLattice::TargetGroup', 'drained', {
+                'Name': 'drained',
+                'Type': 'IP',
+                'Config': {
+                    'Port': 80
+                }
+            }),
+        'listener':
+            lattice_resource('AWS::VpcLattice::Listener', 'listener', {
+                'ServiceIdentifier': {
+                    'Ref': 'ecsservice'
+                },
+                'Port': 80,
+                'DefaultAction': forward(('blue', 100)),
+            }),
+        'canaryrule':
+            lattice_resource(
+                'AWS::VpcLattice::Rule', 'canaryrule', {
+                    'ListenerIdentifier': {
+                        'Ref': 'listener'
+                    },
+                    'Priority': 10,
+                    'Match': {
+                        'HttpMatch': {
+                            'PathMatch': {
+                                'Match': {
+                                    'Prefix': '/canary'
+                                }
+                            }
+                        }
+                    },
+                    'Action': forward(('blue', 75), ('green', 25), ('drained', 0)),
+                }),
+        'policy':
+            lattice_resource(
+                'AWS::VpcLattice::AuthPolicy', 'policy', {
+                    'ResourceIdentifier': {
+                        'Ref': 'ecsservice'
+                    },
+                    'Policy': {
+                        'Statement': [{
+                            'Effect': 'Allow',
+                            'Condition': {
+                                'StringEquals': {
+                                    'vpc-lattice-svcs:SourceVpc': {
+                                        'Fn::GetAtt': ['Vpc', 'VpcId']
+                                    }
+                                }
+                            }
+                        }]
+                    },
+                }),
+    }
+}
+
+
+class RecordingBackend:
+
+    def __init__(self, name: str, calls: Counter) -> None:
+        self.name = name
+        self.calls = calls
+
+    async def handle(self, _request: HttpRequest, source_vpc: str) -> HttpResponse:
+        self.calls[self.name] += 1
+        return HttpResponse(status=200, reason='OK', headers={'content-type': 'text/plain'}, body=f'{self.name} {source_vpc}'.encode())
+
+
+@pytest.fixture(name='topology')
+def fixture_topology(tmp_path: Path) -> Topology:
+    template_path = tmp_path / 'Stack.template.json'
+    template_path.write_text(json.dumps(TEMPLATE), encoding='utf-8')
+    return load_topology(template_path)
+
+
+def test_topology_reads_weighted_rules(topology: Topology) -> None:
+    service = topology.services['ecs']
+
+    assert service.listener_port == 80
+    assert service.allowed_source_vpcs == frozenset({'Ec2Vpc'})
+    assert [(target.target_group.name, target.weight) for target in service.select_forward('GET', '/canary/1', {})] == [
+        ('blue', 75),
+        ('green', 25),
+        ('drained', 0),
+    ]
+    assert [target.target_group.name for target in service.select_forward('GET', '/other', {})] == ['blue']
+
+
+async def send_through_emulator(emulator: LatticeEmulator, requests: list[HttpRequest]) -> list[HttpResponse]:
+    # Bound to an ephemeral port, the responses travel over real keep-alive connections
+    server = await asyncio.start_server(emulator.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    pool = ConnectionPool()
+    try:
+        return [await pool.request('127.0.0.1', port, request) for request in requests]
+    finally:
+        pool.close()
+        server.close()
+        await server.wait_closed()
+
+
+def make_request(path: str, host: str = 'ecs.lattice.local', source_vpc: str = 'Ec2Vpc') -> HttpRequest:
+    return HttpRequest(method='GET', target=path, headers={'host': host, SOURCE_VPC_HEADER: source_vpc})
+
+
+def test_weighted_route_splits_requests_by_weight(topology: Topology) -> None:
+    calls: Counter = Counter()
+    backends = {name: RecordingBackend(name, calls) for name in topology.target_groups}
+    emulator = LatticeEmulator(topology, backends, seed=7)
+
+    responses = asyncio.run(send_through_emulator(emulator, [make_request('/canary/items') for _ in range(200)]))
+
+    assert {response.status for response in responses} == {200}
+    assert {response.body.decode().split()[1] for response in responses} == {'Ec2Vpc'}
+    assert calls['drained'] == 0
+    assert calls['blue'] + calls['green'] == 200
+    assert 30 <= calls['green'] <= 70
+
+
+def test_requests_outside_the_rule_use_the_default_action(topology: Topology) -> None:
+    calls: Counter = Counter()
+    emulator = LatticeEmulator(topology, {name: RecordingBackend(name, calls) for name in topology.target_groups}, seed=7)
+
+    responses = asyncio.run(send_through_emulator(emulator, [make_request('/items') for _ in range(10)]))
+
+    assert [response.body for response in responses] == [b'blue Ec2Vpc'] * 10
+
+
+def test_auth_policy_and_unknown_hosts_are_rejected(topology: Topology) -> None:
+    emulator = LatticeEmulator(topology, {name: RecordingBackend(name, Counter()) for name in topology.target_groups})
+
+    denied, unknown = asyncio.run(
+        send_through_emulator(emulator, [make_request('/items', source_vpc='EcsVpc'),
+                                         make_request('/items', host='nothing.lattice.local')]))
+
+    assert denied.status == 403
+    assert unknown.status == 404
+
+
+def test_load_test_counts_unanswered_requests_as_timeouts() -> None:
+
+    async def load_silent_service() -> ServiceResult:
+        # Reads the requests and never answers them
+        server = await asyncio.start_server(lambda reader, writer: reader.read(), '127.0.0.1', 0)
+        url = f'http://127.0.0.1:{server.sockets[0].getsockname()[1]}'
+        try:
+            return await run_service(url, 'ecs', '/', 'Ec2Vpc',
+                                     LoadProfile(concurrency=2, warmup_seconds=0, duration_seconds=0.5, request_timeout_seconds=0.1))
+        finally:
+            server.close()
+
+    result = asyncio.run(load_silent_service())
+
+    assert set(result.statuses) == {'TimeoutError'}
+    assert result.errors == result.requests > 0
@@ -0,0 +1,78 @@
+import pytest
+from aws_cdk import App, Stack, aws_ec2
+from aws_cdk.assertions import Match, Template
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_construct import LatticeConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import LatticeServiceSpec, LatticeTargetGroupSpec
+from simple_networks_with_amazon_vpc_lattice_cdk.monitoring.lattice_monitoring_construct import LatticeMonitoringConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.monitoring.lattice_slo import LatticeSlo
+
+DEFAULT_SLO = LatticeSlo(p99_latency_ms=500, error_rate_percent=2.0)
+ECS_SLO = LatticeSlo(p99_latency_ms=250, error_rate_percent=0.5, period_seconds=300, evaluation_periods=3, datapoints_to_alarm=2)
+
+
+@pytest.fixture(name='template', scope='module')
+def fixture_template() -> Template:
+    stack = Stack(App(), 'Stack')
+    vpc = aws_ec2.Vpc(stack, 'Vpc', max_azs=1)
+    lattice = LatticeConstruct(
+        stack, 'Lattice',
+        services=[LatticeServiceSpec(name=name, vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='IP')) for name in ('ec2', 'ecs')])
+    LatticeMonitoringConstruct(stack, 'Monitoring', lattice=lattice, default_slo=DEFAULT_SLO, slos={'ecs': ECS_SLO})
+    return Template.from_stack(stack)
+
+
+@pytest.mark.parametrize('service, slo', [('ec2', DEFAULT_SLO), ('ecs', ECS_SLO)])
+def test_latency_alarm_follows_the_service_slo(template: Template, service: str, slo: LatticeSlo) -> None:
+    template.has_resource_properties(
+        'AWS::CloudWatch::Alarm',
+        {
+            'AlarmDescription': f'p99 latency of the {service} Lattice service is above {slo.p99_latency_ms} ms',
+            # Labelled metrics are alarmed on through a metric stat
+            'Metrics': [
+                Match.object_like({
+                    'MetricStat': {
+                        'Metric': Match.object_like({
+                            'MetricName': 'RequestTime',
+                            'Namespace': 'AWS/VpcLattice'
+                        }),
+                        'Period': slo.period_seconds,
+                        'Stat': 'p99',
+                    }
+                })
+            ],
+            'Threshold': slo.p99_latency_ms,
+            'EvaluationPeriods': slo.evaluation_periods,
+            'DatapointsToAlarm': slo.datapoints_to_alarm,
+            'ComparisonOperator': 'GreaterThanThreshold',
+            'TreatMissingData': 'notBreaching',
+        })
+
+
+@pytest.mark.parametrize('service, slo', [('ec2', DEFAULT_SLO), ('ecs', ECS_SLO)])
+def test_error_rate_alarm_follows_the_service_slo(template: Template, service: str, slo: LatticeSlo) -> None:
+    template.has_resource_properties(
+        'AWS::CloudWatch::Alarm', {
+            'AlarmDescription':
+                f'5XX rate of the {service} Lattice service is above {slo.error_rate_percent}%',
+            'Metrics':
+                Match.array_with([
+                    Match.object_like({'Expression': 'IF(requests > 0, 100 * errors5xx / requests, 0)'}),
+                    Match.object_like(
+                        {'MetricStat': Match.object_like({'Metric': Match.object_like({'MetricName': 'HTTPCode_5XX_Count'})})}),
+                ]),
+            'Threshold':
+                slo.error_rate_percent,
+            'EvaluationPeriods':
+                slo.evaluation_periods,
+            'DatapointsToAlarm':
+                slo.datapoints_to_alarm,
+        })
+
+
+def test_every_alarm_notifies_the_topic(template: Template) -> None:
+    (topic,) = template.find_resources('AWS::SNS::Topic')
+    alarms = template.find_resources('AWS::CloudWatch::Alarm')
+
+    assert len(alarms) == 4
+    for alarm in alarms.values():
+        assert alarm['Properties']['AlarmActions'] == alarm['Properties']['OKActions'] == [{'Ref': topic}]
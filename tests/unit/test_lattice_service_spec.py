@@ -0,0 +1,96 @@
+from typing import Any
+
+import pytest
+from aws_cdk import App, Stack, aws_ec2
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_construct import LatticeConstruct
+from simple_networks_with_amazon_vpc_lattice_cdk.lattice.lattice_service_spec import (
+    LatticeAuthSpec,
+    LatticeHeaderMatch,
+    LatticeHealthCheckThresholds,
+    LatticeListenerSpec,
+    LatticeRouteSpec,
+    LatticeRoutingSpec,
+    LatticeServiceSpec,
+    LatticeTargetGroupSpec,
+    LatticeWeightedTarget,
+)
+
+
+@pytest.fixture(name='stack')
+def fixture_stack() -> Stack:
+    return Stack(App(), 'Stack')
+
+
+@pytest.fixture(name='vpc')
+def fixture_vpc(stack: Stack) -> aws_ec2.Vpc:
+    return aws_ec2.Vpc(stack, 'Vpc', max_azs=1)
+
+
+def ip_service(vpc: aws_ec2.IVpc, name: str = 'ecs', **fields: Any) -> LatticeServiceSpec:
+    return LatticeServiceSpec(name=name, vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='IP'), **fields)
+
+
+def test_health_check_timeout_has_to_be_shorter_than_its_interval() -> None:
+    with pytest.raises(ValueError, match='shorter than its interval'):
+        LatticeHealthCheckThresholds(interval_seconds=5, timeout_seconds=5)
+
+
+@pytest.mark.parametrize('priority', [0, 101])
+def test_route_priority_has_to_be_within_1_and_100(priority: int) -> None:
+    with pytest.raises(ValueError, match='outside of 1-100'):
+        LatticeRouteSpec(priority=priority, path_prefix='/items', forward=(LatticeWeightedTarget(service='ecs'),))
+
+
+def test_route_needs_a_target() -> None:
+    with pytest.raises(ValueError, match='no target'):
+        LatticeRouteSpec(priority=10, path_prefix='/items', forward=())
+
+
+def test_route_has_to_match_something() -> None:
+    with pytest.raises(ValueError, match='matches nothing'):
+        LatticeRouteSpec(priority=10, forward=(LatticeWeightedTarget(service='ecs'),))
+
+
+def test_routes_need_unique_priorities() -> None:
+    routes = (
+        LatticeRouteSpec(priority=10, path_prefix='/items', forward=(LatticeWeightedTarget(service='ecs'),)),
+        LatticeRouteSpec(priority=10, headers=(LatticeHeaderMatch(name='x-canary', value='true'),),
+                         forward=(LatticeWeightedTarget(service='ecs'),)),
+    )
+
+    with pytest.raises(ValueError, match='same priority'):
+        LatticeRoutingSpec(routes=routes)
+
+
+def test_listener_certificate_needs_a_custom_domain() -> None:
+    with pytest.raises(ValueError, match='no custom domain name'):
+        LatticeListenerSpec(protocol='HTTPS', certificate_arn='arn:aws:acm:eu-west-1:123456789012:certificate/example')
+
+
+def test_source_vpcs_need_iam_auth(vpc: aws_ec2.Vpc) -> None:
+    with pytest.raises(ValueError, match='AWS_IAM'):
+        LatticeAuthSpec(allowed_source_vpcs=(vpc,))
+
+
+def test_grpc_targets_need_an_https_listener(vpc: aws_ec2.Vpc) -> None:
+    with pytest.raises(ValueError, match='HTTPS listener'):
+        LatticeServiceSpec(name='grpc', vpc=vpc, target_group=LatticeTargetGroupSpec(target_type='IP', protocol_version='GRPC'))
+
+
+def test_listener_port_defaults_to_the_protocol_port() -> None:
+    assert LatticeListenerSpec().get_port() == 80
+    assert LatticeListenerSpec(protocol='HTTPS').get_port() == 443
+    assert LatticeListenerSpec(protocol='HTTPS', port=8443).get_port() == 8443
+
+
+def test_service_names_have_to_be_unique(stack: Stack, vpc: aws_ec2.Vpc) -> None:
+    with pytest.raises(ValueError, match='more than once'):
+        LatticeConstruct(stack, 'Lattice', services=[ip_service(vpc), ip_service(vpc)])
+
+
+def test_forwarding_to_an_unknown_service_is_rejected(stack: Stack, vpc: aws_ec2.Vpc) -> None:
+    routing = LatticeRoutingSpec(
+        default_forward=(LatticeWeightedTarget(service='ecs', weight=90), LatticeWeightedTarget(service='ecscanary', weight=10)))
+
+    with pytest.raises(ValueError, match=r"unknown services \['ecscanary'\]"):
+        LatticeConstruct(stack, 'Lattice', services=[ip_service(vpc, routing=routing)])
@@ -0,0 +1,89 @@
+import pytest
+from aws_cdk import App, Stack, aws_ec2
+from aws_cdk.assertions import Match, Template
+from simple_networks_with_amazon_vpc_lattice_cdk.network.network_planner import NetworkPlanner
+
+
+def test_vpcs_get_consecutive_ranges_of_the_pool() -> None:
+    planner = NetworkPlanner()
+
+    assert [planner.allocate(name) for name in ('Ec2Vpc', 'EcsVpc', 'LambdaVpc')] == ['10.0.0.0/16', '10.1.0.0/16', '10.2.0.0/16']
+    assert planner.allocate('EcsVpc') == '10.1.0.0/16'
+
+
+def test_pinned_cidr_is_kept_and_skipped_by_others() -> None:
+    planner = NetworkPlanner(reserved={'EcsVpc': '10.0.0.0/16'})
+
+    assert planner.allocate('Ec2Vpc') == '10.1.0.0/16'
+    assert planner.allocate('EcsVpc') == '10.0.0.0/16'
+
+
+def test_reserved_ranges_are_skipped() -> None:
+    # Smaller and larger than a VPC, both take their whole /16 out of the pool
+    planner = NetworkPlanner(reserved={'onpremises': '10.0.16.0/20', 'peered': '10.2.0.0/15'})
+
+    assert [planner.allocate(name) for name in ('Ec2Vpc', 'EcsVpc')] == ['10.1.0.0/16', '10.4.0.0/16']
+
+
+def test_exhausted_pool_raises() -> None:
+    planner = NetworkPlanner(pool='10.0.0.0/15')
+    planner.allocate('Ec2Vpc')
+    planner.allocate('EcsVpc')
+
+    with pytest.raises(ValueError, match='No /16 left'):
+        planner.allocate('LambdaVpc')
+
+
+def test_overlapping_pins_raise() -> None:
+    planner = NetworkPlanner(reserved={'Ec2Vpc': '10.0.0.0/16', 'EcsVpc': '10.0.128.0/17'})
+
+    for name in ('Ec2Vpc', 'EcsVpc'):
+        with pytest.raises(ValueError, match='overlaps'):
+            planner.allocate(name)
+
+
+def test_pin_overlapping_a_reserved_range_raises() -> None:
+    planner = NetworkPlanner(reserved={'onpremises': '10.0.0.0/12', 'EcsVpc': '10.1.0.0/16'})
+
+    with pytest.raises(ValueError, match='EcsVpc pinned to 10.1.0.0/16'):
+        planner.allocate('EcsVpc')
+
+
+@pytest.mark.parametrize('prefix_length', [8, 25])
+def test_prefix_length_must_fit_the_pool_and_subnets(prefix_length: int) -> None:
+    with pytest.raises(ValueError):
+        NetworkPlanner(prefix_length=prefix_length)
+
+
+def synth_vpc(planner: NetworkPlanner) -> Template:
+    stack = Stack(App(), 'Stack')
+    planner.build_vpc(stack, 'LambdaVpc', max_azs=2, private_subnets=True,
+                      interface_endpoints={'Sts': aws_ec2.InterfaceVpcEndpointAwsService.STS}, s3_gateway_endpoint=True)
+    return Template.from_stack(stack)
+
+
+def test_nat_free_vpc_has_no_nat_or_public_subnets() -> None:
+    template = synth_vpc(NetworkPlanner(nat_free=True))
+
+    template.resource_count_is('AWS::EC2::NatGateway', 0)
+    template.resource_count_is('AWS::EC2::InternetGateway', 0)
+    template.resource_count_is('AWS::EC2::Subnet', 2)
+    template.all_resources_properties('AWS::EC2::Subnet', {'MapPublicIpOnLaunch': False})
+    template.has_resource_properties('AWS::EC2::VPC', {'CidrBlock': '10.0.0.0/16'})
+    template.has_resource_properties('AWS::EC2::VPCEndpoint', {'VpcEndpointType': 'Gateway'})
+    template.has_resource_properties('AWS::EC2::VPCEndpoint', {'VpcEndpointType': 'Interface', 'PrivateDnsEnabled': True})
+
+
+def test_private_subnets_with_egress_get_a_nat_gateway() -> None:
+    template = synth_vpc(NetworkPlanner())
+
+    template.resource_count_is('AWS::EC2::NatGateway', 1)
+    template.has_resource_properties('AWS::EC2::Subnet', {'MapPublicIpOnLaunch': True})
+    template.resource_count_is('AWS::EC2::VPCEndpoint', 0)
+    template.has_resource_properties('AWS::EC2::Route', {'NatGatewayId': Match.any_value()})
+
+
+def test_options_are_keyword_only() -> None:
+    # A reordered signature can't silently swap the pool and the prefix length of deployed VPCs
+    with pytest.raises(TypeError):
+        NetworkPlanner('10.0.0.0/8', 16)  # pylint: disable=too-many-function-args
@@ -0,0 +1,138 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from lambda_handlers.compression import compress_response
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+from lambda_handlers.response_cache import ResponseCache, etag_matches
+from lambda_handlers.router import RouteHandler
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_request(path: str = '/items', headers: dict[str, str] | None = None, method: str = 'GET') -> LatticeRequest:
+    return LatticeRequest.from_event({'method': method, 'raw_path': path, 'headers': headers or {}})
+
+
+@pytest.fixture(name='clock')
+def fixture_clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture(name='cache')
+def fixture_cache(clock: FakeClock) -> ResponseCache:
+    return ResponseCache(max_entries=2, clock=clock)
+
+
+def cached_route(cache: ResponseCache, body_size: int = 10, vary_headers: tuple[str, ...] = ()) -> tuple[RouteHandler, list[str]]:
+    calls = []
+
+    @cache.cached(ttl_seconds=60, vary_headers=vary_headers)
+    def route(request: LatticeRequest) -> LatticeResponse:
+        calls.append(request.path)
+        return LatticeResponse.json({'path': request.path, 'padding': 'x' * body_size, 'language': request.header('accept-language')})
+
+    return route, calls
+
+
+def test_hit_skips_the_route(cache: ResponseCache) -> None:
+    route, calls = cached_route(cache)
+
+    first, second = route(make_request()), route(make_request())
+
+    assert calls == ['/items']
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first.body == second.body
+    assert first.headers['ETag'] == second.headers['ETag']
+
+
+def test_entry_expires_and_max_age_counts_down(cache: ResponseCache, clock: FakeClock) -> None:
+    route, calls = cached_route(cache)
+
+    assert route(make_request()).headers['Cache-Control'] == 'max-age=60'
+    clock.now += 45
+    assert route(make_request()).headers['Cache-Control'] == 'max-age=15'
+    clock.now += 15
+    assert route(make_request()).headers['Cache-Control'] == 'max-age=60'
+    assert calls == ['/items', '/items']
+
+
+def test_least_recently_used_entry_is_evicted(cache: ResponseCache) -> None:
+    route, calls = cached_route(cache)
+
+    route(make_request('/a'))
+    route(make_request('/b'))
+    route(make_request('/a'))
+    route(make_request('/c'))
+    route(make_request('/a'))
+    route(make_request('/b'))
+
+    assert calls == ['/a', '/b', '/c', '/b']
+
+
+def test_vary_headers_are_part_of_the_key(cache: ResponseCache) -> None:
+    route, calls = cached_route(cache, vary_headers=('Accept-Language',))
+
+    english = route(make_request(headers={'Accept-Language': 'en'}))
+    polish = route(make_request(headers={'Accept-Language': 'pl'}))
+    route(make_request(headers={'Accept-Language': 'en'}))
+
+    assert len(calls) == 2
+    assert json.loads(english.body)['language'] == 'en'
+    assert json.loads(polish.body)['language'] == 'pl'
+    assert english.headers['Vary'] == 'accept-language'
+
+
+def test_only_get_and_head_are_cached(cache: ResponseCache) -> None:
+    route, calls = cached_route(cache)
+
+    route(make_request(method='POST'))
+    route(make_request(method='POST'))
+    route(make_request(method='HEAD'))
+    route(make_request(method='GET'))
+
+    assert calls == ['/items', '/items', '/items']
+
+
+def test_if_none_match_answers_304(cache: ResponseCache) -> None:
+    route, _ = cached_route(cache)
+    etag = route(make_request()).headers['ETag']
+
+    not_modified = route(make_request(headers={'If-None-Match': f'"other", W/{etag}'}))
+    modified = route(make_request(headers={'If-None-Match': '"other"'}))
+
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.body == ''
+    assert not_modified.headers['ETag'] == etag
+    assert 'Content-Type' not in not_modified.headers
+    assert modified.status_code == HTTPStatus.OK
+
+
+def test_compressed_validator_only_matches_its_representation(cache: ResponseCache) -> None:
+    route, _ = cached_route(cache, body_size=4096)
+    gzip_request = make_request(headers={'Accept-Encoding': 'gzip'})
+    gzip_etag = compress_response(gzip_request, route(gzip_request)).headers['ETag']
+
+    same_encoding = route(make_request(headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag}))
+    identity = route(make_request(headers={'Accept-Encoding': 'identity', 'If-None-Match': gzip_etag}))
+
+    assert gzip_etag.endswith('-gzip"')
+    assert same_encoding.status_code == HTTPStatus.NOT_MODIFIED
+    assert same_encoding.headers['ETag'] == gzip_etag
+    assert same_encoding.headers['Vary'] == 'Accept-Encoding'
+    assert identity.status_code == HTTPStatus.OK
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('*', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert not etag_matches('"a-gzip"', '"a"')
+    assert not etag_matches(None, '"a"')
@@ -0,0 +1,156 @@
+import base64
+import json
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+
+from lambda_handlers.lattice_event import LatticeRequest, LatticeResponse
+from lambda_handlers.router import Router
+
+V1_EVENT: dict[str, Any] = {
+    'raw_path': '/items/42?verbose=true',
+    'method': 'post',
+    'headers': {
+        'Content-Type': 'application/json',
+        'X-Forwarded-For': '10.0.0.1'
+    },
+    'query_string_parameters': {
+        'verbose': 'true'
+    },
+    'body': base64.b64encode(b'{"name": "item"}').decode(),
+    'is_base64_encoded': True,
+}
+
+V2_EVENT: dict[str, Any] = {
+    'version': '2.0',
+    'path': '/items/42',
+    'method': 'GET',
+    'headers': {
+        'Accept': ['application/json'],
+        'x-tag': ['a', 'b']
+    },
+    'queryStringParameters': {
+        'tag': ['a', 'b']
+    },
+    'body': '',
+    'isBase64Encoded': False,
+    'requestContext': {
+        'identity': {
+            'sourceVpcArn': 'arn:aws:ec2:eu-west-1:123456789012:vpc/vpc-0123456789abcdef0'
+        }
+    },
+}
+
+
+def make_request(method: str, path: str) -> LatticeRequest:
+    return LatticeRequest.from_event({'version': '2.0', 'method': method, 'path': path})
+
+
+@pytest.fixture(name='router')
+def fixture_router() -> Router:
+    router = Router()
+
+    @router.get('/items')
+    def list_items(_request: LatticeRequest) -> LatticeResponse:
+        return LatticeResponse.json({'items': []})
+
+    @router.get('/items/{item_id}')
+    def get_item(request: LatticeRequest) -> LatticeResponse:
+        return LatticeResponse.json({'id': request.path_params['item_id']})
+
+    @router.put('/items/{item_id}')
+    def put_item(request: LatticeRequest) -> LatticeResponse:
+        return LatticeResponse.json(request.json())
+
+    @router.get('/items/recent')
+    def recent_items(_request: LatticeRequest) -> LatticeResponse:
+        return LatticeResponse.json({'recent': True})
+
+    @router.get('/failing')
+    def failing(_request: LatticeRequest) -> LatticeResponse:
+        raise RuntimeError('boom')
+
+    @router.get('/closed')
+    def closed(_request: LatticeRequest) -> LatticeResponse:
+        return LatticeResponse(status_code=499)
+
+    return router
+
+
+def test_parses_v1_event() -> None:
+    request = LatticeRequest.from_event(V1_EVENT)
+
+    assert (request.version, request.method, request.path) == ('1.0', 'POST', '/items/42')
+    assert request.header('content-type') == 'application/json'
+    assert request.query_param('verbose') == 'true'
+    assert request.json() == {'name': 'item'}
+    assert request.source_vpc_arn is None
+
+
+def test_parses_v2_event() -> None:
+    request = LatticeRequest.from_event(V2_EVENT)
+
+    assert (request.version, request.method, request.path) == ('2.0', 'GET', '/items/42')
+    assert request.headers['x-tag'] == ['a', 'b']
+    assert request.query['tag'] == ['a', 'b']
+    assert request.body == b''
+    assert request.source_vpc_arn == 'arn:aws:ec2:eu-west-1:123456789012:vpc/vpc-0123456789abcdef0'
+
+
+def test_static_route_wins_over_parameter(router: Router) -> None:
+    assert json.loads(router.dispatch(make_request('GET', '/items/recent')).body) == {'recent': True}
+    assert json.loads(router.dispatch(make_request('GET', '/items/7/')).body) == {'id': '7'}
+
+
+def test_encoded_slash_stays_in_its_segment(router: Router) -> None:
+    response = router.dispatch(make_request('GET', '/items/a%2Fb'))
+
+    assert json.loads(response.body) == {'id': 'a/b'}
+
+
+def test_unknown_path_is_404(router: Router) -> None:
+    response = router.dispatch(make_request('GET', '/items/1/parts'))
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert json.loads(response.body) == {'message': 'Not Found'}
+
+
+def test_unknown_method_is_405_with_allow(router: Router) -> None:
+    response = router.dispatch(make_request('DELETE', '/items/1'))
+
+    assert response.status_code == HTTPStatus.METHOD_NOT_ALLOWED
+    assert response.headers['Allow'] == 'GET, PUT'
+
+
+def test_head_is_answered_by_get(router: Router) -> None:
+    response = router.dispatch(make_request('HEAD', '/items'))
+
+    assert response.status_code == HTTPStatus.OK
+    assert json.loads(response.body) == {'items': []}
+
+
+def test_failing_route_is_500(router: Router) -> None:
+    response = router.dispatch(make_request('GET', '/failing'))
+
+    assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def test_unknown_status_code_is_serialised(router: Router) -> None:
+    lattice_response = router.dispatch(make_request('GET', '/closed')).to_lattice()
+
+    assert lattice_response['statusCode'] == 499
+    assert lattice_response['statusDescription'] == '499'
+
+
+def test_binary_body_is_base64_encoded() -> None:
+    lattice_response = LatticeResponse(body=b'\x00\x01').to_lattice()
+
+    assert lattice_response['isBase64Encoded'] is True
+    assert base64.b64decode(lattice_response['body']) == b'\x00\x01'
+    assert lattice_response['statusDescription'] == '200 OK'
+
+
+def test_clashing_parameters_are_rejected(router: Router) -> None:
+    with pytest.raises(ValueError):
+        router.add_route('GET', '/items/{other_id}/parts', lambda request: LatticeResponse())
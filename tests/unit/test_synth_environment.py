@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+
+import pytest
+from simple_networks_with_amazon_vpc_lattice_cdk import synth_environment
+from simple_networks_with_amazon_vpc_lattice_cdk.synth_environment import get_git_branch, is_offline, resolve_environment
+
+ENVIRONMENT_VARIABLES = ('AWS_DEFAULT_ACCOUNT', 'AWS_DEFAULT_REGION', 'AWS_REGION', 'CDK_DEFAULT_ACCOUNT', 'CDK_DEFAULT_REGION',
+                         'AWS_PROFILE', synth_environment.OFFLINE_ENV_VARIABLE)
+
+
+@pytest.fixture(name='cache_file', autouse=True)
+def fixture_cache_file(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    for name in ENVIRONMENT_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    cache_file = tmp_path / '.build' / 'cdk_environment.json'
+    monkeypatch.setattr(synth_environment, 'ENVIRONMENT_CACHE_FILE', cache_file)
+    return cache_file
+
+
+def make_repository(path: Path, head: str) -> Path:
+    (path / '.git').mkdir(parents=True)
+    (path / '.git' / 'HEAD').write_text(f'{head}\n', encoding='utf-8')
+    return path
+
+
+def test_branch_is_read_from_the_enclosing_repository(tmp_path: Path) -> None:
+    subdirectory = make_repository(tmp_path / 'repo', 'ref: refs/heads/feature/lattice') / 'cdk'
+    subdirectory.mkdir()
+
+    assert get_git_branch(subdirectory) == 'feature/lattice'
+
+
+def test_detached_head_has_no_branch(tmp_path: Path) -> None:
+    assert get_git_branch(make_repository(tmp_path / 'repo', '0123456789abcdef0123456789abcdef01234567')) is None
+
+
+def test_worktree_branch_is_read_from_its_git_directory(tmp_path: Path) -> None:
+    git_dir = tmp_path / 'repo' / '.git' / 'worktrees' / 'review'
+    git_dir.mkdir(parents=True)
+    (git_dir / 'HEAD').write_text('ref: refs/heads/review\n', encoding='utf-8')
+    worktree = tmp_path / 'review'
+    worktree.mkdir()
+    (worktree / '.git').write_text(f'gitdir: {git_dir}\n', encoding='utf-8')
+
+    assert get_git_branch(worktree) == 'review'
+
+
+def test_offline_is_set_by_context_or_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert is_offline('true')
+    assert not is_offline(None)
+
+    monkeypatch.setenv(synth_environment.OFFLINE_ENV_VARIABLE, '1')
+
+    assert is_offline(None)
+
+
+def test_aws_variables_win_over_the_cdk_ones(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('AWS_DEFAULT_ACCOUNT', '111111111111')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'eu-west-1')
+    monkeypatch.setenv('CDK_DEFAULT_ACCOUNT', '222222222222')
+    monkeypatch.setenv('CDK_DEFAULT_REGION', 'us-east-1')
+
+    assert resolve_environment(offline=True) == ('111111111111', 'eu-west-1')
+
+
+def test_cdk_variables_are_used_without_aws_ones(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('CDK_DEFAULT_ACCOUNT', '222222222222')
+    monkeypatch.setenv('CDK_DEFAULT_REGION', 'us-east-1')
+
+    assert resolve_environment(offline=True) == ('222222222222', 'us-east-1')
+
+
+def test_offline_synth_falls_back_to_the_profile_cache(monkeypatch: pytest.MonkeyPatch, cache_file: Path) -> None:
+    cache_file.parent.mkdir()
+    cache_file.write_text(json.dumps({'sandbox': {'account': '333333333333', 'region': 'eu-central-1'}}), encoding='utf-8')
+    monkeypatch.setenv('AWS_PROFILE', 'sandbox')
+    monkeypatch.setattr(synth_environment, '_lookup_with_boto3', lambda: pytest.fail('Offline synth called AWS'))
+
+    assert resolve_environment(offline=True) == ('333333333333', 'eu-central-1')
+    # A variable still overrides the cached value
+    monkeypatch.setenv('AWS_REGION', 'eu-north-1')
+    assert resolve_environment(offline=True) == ('333333333333', 'eu-north-1')
+
+
+def test_offline_synth_without_a_cache_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(synth_environment, '_lookup_with_boto3', lambda: pytest.fail('Offline synth called AWS'))
+
+    with pytest.raises(RuntimeError, match='unknown offline'):
+        resolve_environment(offline=True)
+
+
+def test_online_lookup_is_cached_per_profile(monkeypatch: pytest.MonkeyPatch, cache_file: Path) -> None:
+    monkeypatch.setattr(synth_environment, '_lookup_with_boto3', lambda: ('444444444444', 'ap-southeast-2'))
+
+    assert resolve_environment() == ('444444444444', 'ap-southeast-2')
+    assert json.loads(cache_file.read_text(encoding='utf-8')) == {'default': {'account': '444444444444', 'region': 'ap-southeast-2'}}
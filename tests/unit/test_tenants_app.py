@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from simple_networks_with_amazon_vpc_lattice_cdk.constants import SERVICE_NAME
+from simple_networks_with_amazon_vpc_lattice_cdk.tenants_app import INPUT_HASH_FILE, Tenant, hash_tenant_inputs, is_up_to_date, load_tenants
+
+
+def write_tenants(tmp_path: Path, entries: list[dict[str, Any]]) -> Path:
+    path = tmp_path / 'tenants.json'
+    path.write_text(json.dumps(entries), encoding='utf-8')
+    return path
+
+
+def test_load_tenants(tmp_path: Path) -> None:
+    tenants = load_tenants(
+        write_tenants(tmp_path, [
+            {
+                'name': 'acme',
+                'account': '123456789012',
+                'region': 'eu-west-1'
+            },
+            {
+                'name': 'globex2',
+                'account': '210987654321',
+                'region': 'us-east-1',
+                'stack_name': 'GlobexLattice',
+                'context': {
+                    'offline': 'true'
+                }
+            },
+        ]))
+
+    assert [tenant.get_stack_name() for tenant in tenants] == [f'acme{SERVICE_NAME}', 'GlobexLattice']
+    assert tenants[1].context == {'offline': 'true'}
+
+
+def test_duplicate_tenant_names_are_rejected(tmp_path: Path) -> None:
+    path = write_tenants(tmp_path, [{'name': 'acme', 'account': '123456789012', 'region': region} for region in ('eu-west-1', 'us-east-1')])
+
+    with pytest.raises(ValueError, match='unique'):
+        load_tenants(path)
+
+
+@pytest.mark.parametrize('name', ['acme-corp', 'acme corp', '../acme', ''])
+def test_tenant_names_have_to_be_alphanumeric(tmp_path: Path, name: str) -> None:
+    with pytest.raises(ValueError, match='alphanumeric'):
+        load_tenants(write_tenants(tmp_path, [{'name': name, 'account': '123456789012', 'region': 'eu-west-1'}]))
+
+
+def test_tenant_hash_changes_with_the_tenant_and_shared_inputs() -> None:
+    tenant = Tenant(name='acme', account='123456789012', region='eu-west-1', context={'a': '1', 'b': '2'})
+    input_hash = hash_tenant_inputs(tenant, 'shared')
+
+    assert hash_tenant_inputs(Tenant(name='acme', account='123456789012', region='eu-west-1', context={
+        'b': '2',
+        'a': '1'
+    }), 'shared') == input_hash
+    assert hash_tenant_inputs(tenant, 'changed') != input_hash
+    assert hash_tenant_inputs(Tenant(name='acme', account='123456789012', region='eu-central-1', context=tenant.context),
+                              'shared') != input_hash
+    assert hash_tenant_inputs(Tenant(name='acme', account='123456789012', region='eu-west-1', context={'a': '1'}), 'shared') != input_hash
+
+
+def test_is_up_to_date(tmp_path: Path) -> None:
+    out_dir = tmp_path / 'acme'
+    assert not is_up_to_date(out_dir, 'hash')
+
+    out_dir.mkdir()
+    (out_dir / INPUT_HASH_FILE).write_text('hash', encoding='utf-8')
+    # The hash alone isn't enough, the assembly has to be there too
+    assert not is_up_to_date(out_dir, 'hash')
+
+    (out_dir / 'manifest.json').write_text('{}', encoding='utf-8')
+    assert is_up_to_date(out_dir, 'hash')
+    assert not is_up_to_date(out_dir, 'other')
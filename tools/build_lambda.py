@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Builds .build/lambdas and .build/common_layer for LambdaConstruct with as little to load on a cold start as possible:
+# runtime-provided and unused packages are left out, tests and metadata are stripped and everything is precompiled.
+import argparse
+import ast
+import compileall
+import py_compile
+import re
+import shutil
+import subprocess
+import sys
+from collections.abc import Iterable
+from email.parser import HeaderParser
+from pathlib import Path
+from typing import Final
+
+BUILD_DIR: Final[Path] = Path('.build')
+HANDLERS_DIR: Final[Path] = Path('lambda_handlers')
+LAMBDAS_DIR: Final[Path] = BUILD_DIR / 'lambdas'
+LAYER_PYTHON_DIR: Final[Path] = BUILD_DIR / 'common_layer' / 'python'
+
+# Must match the runtime and architecture in LambdaConstruct
+LAMBDA_PYTHON_VERSION: Final[tuple[int, int]] = (3, 12)
+LAMBDA_PLATFORM: Final[str] = 'manylinux2014_aarch64'
+
+# Shipped with the Lambda Python runtime
+RUNTIME_PROVIDED_PACKAGES: Final[frozenset[str]] = frozenset(
+    {'boto3', 'botocore', 's3transfer', 'jmespath', 'urllib3', 'python-dateutil', 'six'})
+
+STRIPPED_DIRS: Final[frozenset[str]] = frozenset({'__pycache__'})
+# Only stripped inside a package, a top-level 'test' or 'tests' may be a package handlers import
+STRIPPED_TEST_DIRS: Final[frozenset[str]] = frozenset({'tests'})
+STRIPPED_SUFFIXES: Final[frozenset[str]] = frozenset({'.pyi', '.pyx', '.pxd', '.c', '.h', '.cpp'})
+KEPT_METADATA_FILES: Final[tuple[str, ...]] = ('METADATA', 'LICENSE', 'LICENCE', 'COPYING', 'NOTICE')
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def read_requirements(requirements_path: Path) -> list[str]:
+    requirements = []
+    for line in requirements_path.read_text(encoding='utf-8').splitlines():
+        match = re.match(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)', line)
+        if match and normalize_name(match.group(1)) not in RUNTIME_PROVIDED_PACKAGES:
+            requirements.append(line.strip())
+    return requirements
+
+
+def install_requirements(requirements: list[str]) -> None:
+    if not requirements:
+        return
+    python_version = '.'.join(str(part) for part in LAMBDA_PYTHON_VERSION)
+    # The export already pins the whole dependency tree, so pip must not pull runtime-provided packages back in
+    subprocess.run([
+        sys.executable, '-m', 'pip', 'install', '--quiet', '--no-deps', '--no-compile', '--only-binary=:all:', '--implementation', 'cp',
+        '--platform', LAMBDA_PLATFORM, '--python-version', python_version, '--target',
+        str(LAYER_PYTHON_DIR), *requirements
+    ], check=True)
+
+
+class Distribution:
+
+    def __init__(self, dist_info: Path) -> None:
+        self.dist_info = dist_info
+        metadata = HeaderParser().parsestr((dist_info / 'METADATA').read_text(encoding='utf-8'))
+        self.name = normalize_name(metadata['Name'])
+        # Dependencies only needed by extras are not installed by the export either
+        self.requires = {
+            normalize_name(re.split(r'[\s;<>=!~\[(]', requirement, maxsplit=1)[0])
+            for requirement in metadata.get_all('Requires-Dist') or []
+            if 'extra ==' not in requirement
+        }
+        self.files = self._read_record()
+        self.top_level = {file.parts[0].removesuffix('.py') for file in self.files if not file.parts[0].endswith(('.dist-info', '..'))}
+
+    def _read_record(self) -> list[Path]:
+        record = self.dist_info / 'RECORD'
+        if not record.exists():
+            return []
+        return [Path(line.split(',', 1)[0]) for line in record.read_text(encoding='utf-8').splitlines() if line]
+
+    def remove(self) -> None:
+        layer_dir = LAYER_PYTHON_DIR.resolve()
+        for file in self.files:
+            # RECORD lists console scripts relative to the layer, e.g. ../../bin/, those must not be touched
+            path = (LAYER_PYTHON_DIR / file).resolve()
+            if path.is_relative_to(layer_dir):
+                path.unlink(missing_ok=True)
+        shutil.rmtree(self.dist_info, ignore_errors=True)
+
+
+def find_distributions() -> dict[str, Distribution]:
+    distributions = (Distribution(dist_info) for dist_info in LAYER_PYTHON_DIR.glob('*.dist-info'))
+    return {distribution.name: distribution for distribution in distributions}
+
+
+def find_imported_modules(source_dir: Path) -> set[str]:
+    modules = set()
+    for source in source_dir.rglob('*.py'):
+        for node in ast.walk(ast.parse(source.read_text(encoding='utf-8'))):
+            if isinstance(node, ast.Import):
+                modules.update(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                modules.add(node.module.split('.')[0])
+    return modules
+
+
+def prune_unused_distributions(distributions: dict[str, Distribution], imported_modules: set[str]) -> list[str]:
+    used = {name for name, distribution in distributions.items() if distribution.top_level & imported_modules}
+    pending = list(used)
+    while pending:
+        for requirement in distributions[pending.pop()].requires:
+            if requirement in distributions and requirement not in used:
+                used.add(requirement)
+                pending.append(requirement)
+    unused = sorted(distributions.keys() - used)
+    for name in unused:
+        distributions.pop(name).remove()
+    remove_empty_dirs(LAYER_PYTHON_DIR)
+    return unused
+
+
+def strip_files(root: Path) -> None:
+    for path in sorted(root.rglob('*'), reverse=True):
+        if not path.exists():
+            continue
+        if path.is_dir() and (path.name in STRIPPED_DIRS or path.name in STRIPPED_TEST_DIRS and path.parent != root):
+            shutil.rmtree(path)
+        elif path.is_file() and path.suffix in STRIPPED_SUFFIXES:
+            path.unlink()
+        elif path.is_file() and path.parent.name.endswith('.dist-info') and not path.name.startswith(KEPT_METADATA_FILES):
+            path.unlink()
+
+
+def remove_empty_dirs(root: Path) -> None:
+    for path in sorted(root.rglob('*'), reverse=True):
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+
+def precompile(directories: Iterable[Path]) -> None:
+    if sys.version_info[:2] != LAMBDA_PYTHON_VERSION:
+        print(f'Skipping precompilation, bytecode of Python {sys.version_info.major}.{sys.version_info.minor} '
+              f'would be ignored by the Python {LAMBDA_PYTHON_VERSION[0]}.{LAMBDA_PYTHON_VERSION[1]} runtime')
+        return
+    # The deployment package is read-only, unchecked pycs skip the source mtime check on every import
+    for directory in directories:
+        compileall.compile_dir(directory, quiet=1, optimize=0, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+
+def directory_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(file.stat().st_size for file in path.rglob('*') if file.is_file())
+
+
+def report_layer_size(distributions: dict[str, Distribution], unused: list[str]) -> None:
+    total = directory_size(LAYER_PYTHON_DIR) if LAYER_PYTHON_DIR.exists() else 0
+    sizes = {}
+    for name, distribution in distributions.items():
+        paths = [LAYER_PYTHON_DIR / top_level for top_level in distribution.top_level]
+        paths += [LAYER_PYTHON_DIR / f'{top_level}.py' for top_level in distribution.top_level]
+        sizes[name] = directory_size(distribution.dist_info) + sum(directory_size(path) for path in paths if path.exists())
+    print(f'{"package":<40} {"size":>10} {"share":>7}')
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        print(f'{name:<40} {size / 1024:>8.0f}KB {size / total if total else 0:>7.1%}')
+    print(f'{"total":<40} {total / 1024:>8.0f}KB')
+    if unused:
+        print(f'Pruned as not imported by {HANDLERS_DIR}: {", ".join(unused)}')
+
+
+def build_lambdas() -> None:
+    shutil.rmtree(LAMBDAS_DIR, ignore_errors=True)
+    shutil.copytree(HANDLERS_DIR, LAMBDAS_DIR / HANDLERS_DIR.name, ignore=shutil.ignore_patterns('__pycache__', '*.pyc'))
+
+
+def build_layer(requirements_path: Path) -> None:
+    shutil.rmtree(LAYER_PYTHON_DIR, ignore_errors=True)
+    LAYER_PYTHON_DIR.mkdir(parents=True)
+    install_requirements(read_requirements(requirements_path))
+    distributions = find_distributions()
+    unused = prune_unused_distributions(distributions, find_imported_modules(HANDLERS_DIR))
+    # Console scripts can't be run inside Lambda
+    shutil.rmtree(LAYER_PYTHON_DIR / 'bin', ignore_errors=True)
+    strip_files(LAYER_PYTHON_DIR)
+    precompile([LAYER_PYTHON_DIR, LAMBDAS_DIR])
+    report_layer_size(distributions, unused)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the Lambda code and its common layer into .build')
+    parser.add_argument('--requirements', type=Path, default=BUILD_DIR / 'requirements.txt',
+                        help='Output of poetry export for the non-dev dependencies')
+    args = parser.parse_args()
+    build_lambdas()
+    build_layer(args.requirements)
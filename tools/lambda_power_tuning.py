@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Runs lambda_handlers.lambda_function.handle locally at the memory sizes Lambda offers to help choosing LambdaTuning.memory_size_mib.
+# Every memory size runs in a fresh process, so the first invocation is a cold start. Memory isn't limited: the peak resident set
+# of the process is reported next to the configured size and sizes it doesn't fit into are left out of the suggestion.
+# Lambda gives a function CPU in proportion to its memory (one full vCPU at 1769 MB), the harness doesn't throttle the process
+# but scales the measured CPU time by that share, so durations are a model of Lambda's and only comparable with each other.
+# Usage: python -m tools.lambda_power_tuning [--memory 128 256 512 1024] [--invocations 200] [--event event.json]
+import argparse
+import importlib
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Final
+
+HANDLER: Final[str] = 'lambda_handlers.lambda_function.handle'
+DEFAULT_MEMORY_SIZES_MIB: Final[tuple[int, ...]] = (128, 256, 512, 1024, 1769, 3008)
+FULL_VCPU_MEMORY_MIB: Final[int] = 1769
+DEFAULT_EVENT_PATH: Final[Path] = Path('.build/power_tuning_event.json')
+
+# eu-west-1 ARM64 prices, like LambdaConstruct's function
+PRICE_PER_GB_SECOND: Final[float] = 0.0000133334
+PRICE_PER_REQUEST: Final[float] = 0.0000002
+
+SAMPLE_EVENT: Final[dict[str, Any]] = {
+    'version': '2.0',
+    'path': '/',
+    'method': 'GET',
+    'headers': {
+        'accept': ['application/json'],
+        'host': ['lambdaservice.lattice.local'],
+    },
+    'queryStringParameters': {},
+    'body': '',
+    'isBase64Encoded': False,
+    'requestContext': {
+        'serviceNetworkArn': 'arn:aws:vpc-lattice:eu-west-1:123456789012:servicenetwork/sn-0123456789abcdef0',
+        'serviceArn': 'arn:aws:vpc-lattice:eu-west-1:123456789012:service/svc-0123456789abcdef0',
+        'targetGroupArn': 'arn:aws:vpc-lattice:eu-west-1:123456789012:targetgroup/tg-0123456789abcdef0',
+        'identity': {
+            'sourceVpcArn': 'arn:aws:ec2:eu-west-1:123456789012:vpc/vpc-0123456789abcdef0'
+        },
+        'region': 'eu-west-1',
+        'timeEpoch': '1696331694653'
+    }
+}
+
+
+def write_sample_event(path: Path = DEFAULT_EVENT_PATH) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(SAMPLE_EVENT), encoding='utf-8')
+    return path
+
+
+class LambdaContext:
+
+    def __init__(self, memory_size_mib: int, timeout_seconds: int = 10) -> None:
+        self.function_name = 'lambda-power-tuning'
+        self.function_version = '$LATEST'
+        self.memory_limit_in_mb = memory_size_mib
+        self.aws_request_id = 'lambda-power-tuning'
+        self.deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def simulated_duration_ms(wall_seconds: float, cpu_seconds: float, memory_size_mib: int) -> float:
+    # More than one vCPU only helps multi-threaded handlers, the Lattice handler runs on one
+    cpu_share = min(memory_size_mib / FULL_VCPU_MEMORY_MIB, 1.0)
+    waiting_seconds = max(wall_seconds - cpu_seconds, 0.0)
+    return (cpu_seconds / cpu_share + waiting_seconds) * 1000
+
+
+def measure(function: Callable[[], Any], memory_size_mib: int) -> float:
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    function()
+    return simulated_duration_ms(time.perf_counter() - wall_start, time.process_time() - cpu_start, memory_size_mib)
+
+
+def run_worker(memory_size_mib: int, invocations: int, event: dict[str, Any]) -> dict[str, Any]:
+    # RLIMIT_AS would cap virtual address space, which the interpreter alone maps more of than the smallest sizes,
+    # so memory is compared with the peak resident set instead of limited
+    module_name, function_name = HANDLER.rsplit('.', 1)
+    modules = {}
+    init_ms = measure(lambda: modules.setdefault('handler', importlib.import_module(module_name)), memory_size_mib)
+    handle = getattr(modules['handler'], function_name)
+    durations = [measure(lambda: handle(event, LambdaContext(memory_size_mib)), memory_size_mib) for _ in range(invocations)]
+    # ru_maxrss is in KiB on Linux
+    max_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'memory_size_mib': memory_size_mib,
+        'init_ms': init_ms,
+        'cold_ms': durations[0],
+        'warm_ms': durations[1:] or durations,
+        'max_rss_mib': max_rss_mib,
+        'fits_memory': max_rss_mib <= memory_size_mib,
+    }
+
+
+def run_memory_size(memory_size_mib: int, invocations: int, event_path: Path) -> dict[str, Any]:
+    completed = subprocess.run([
+        sys.executable, '-m', 'tools.lambda_power_tuning', '--worker', '--memory',
+        str(memory_size_mib), '--invocations',
+        str(invocations), '--event',
+        str(event_path)
+    ], capture_output=True, text=True, check=False)
+    if completed.returncode:
+        return {'memory_size_mib': memory_size_mib, 'error': completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def invocation_cost(duration_ms: float, memory_size_mib: int) -> float:
+    # Billed per started millisecond
+    return -(-duration_ms // 1) / 1000 * memory_size_mib / 1024 * PRICE_PER_GB_SECOND + PRICE_PER_REQUEST
+
+
+def print_report(results: list[dict[str, Any]]) -> None:
+    print(f'{"memory":>8} {"init":>9} {"cold":>9} {"warm p50":>9} {"warm p99":>9} {"max rss":>9} {"$ per 1M":>9}')
+    viable = []
+    for result in results:
+        memory_size_mib = result['memory_size_mib']
+        if 'error' in result:
+            print(f'{memory_size_mib:>6}MB  failed: {" ".join(result["error"])}')
+            continue
+        warm = sorted(result['warm_ms'])
+        p50, p99 = statistics.median(warm), warm[min(len(warm) - 1, int(len(warm) * 0.99))]
+        cost = statistics.fmean(invocation_cost(duration, memory_size_mib) for duration in warm) * 1_000_000
+        if result['fits_memory']:
+            viable.append((memory_size_mib, p99, cost))
+        print(f'{memory_size_mib:>6}MB {result["init_ms"]:>7.1f}ms {result["cold_ms"]:>7.1f}ms {p50:>7.2f}ms {p99:>7.2f}ms '
+              f'{result["max_rss_mib"]:>7.1f}MB {cost:>9.4f}{"" if result["fits_memory"] else "  max rss above memory size"}')
+    if not viable:
+        return
+    fastest_p99 = min(p99 for _, p99, _ in viable)
+    # The cheapest size whose warm p99 is within 10% (or a billed millisecond) of the fastest one
+    tolerance_ms = max(fastest_p99 * 0.1, 1.0)
+    memory_size_mib, _, _ = min((candidate for candidate in viable if candidate[1] <= fastest_p99 + tolerance_ms),
+                                key=lambda candidate: candidate[2])
+    print(f'Suggested memory size: {memory_size_mib} MB (cheapest within 10% or 1 ms of the best warm p99)')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measures the handler at several Lambda memory sizes')
+    parser.add_argument('--memory', type=int, nargs='+', default=list(DEFAULT_MEMORY_SIZES_MIB))
+    parser.add_argument('--invocations', type=int, default=200)
+    parser.add_argument('--event', type=Path, help='JSON file with the Lattice event, a GET / event by default')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        event = json.loads(args.event.read_text(encoding='utf-8'))
+        print(json.dumps(run_worker(args.memory[0], args.invocations, event)))
+        return
+
+    event_path = args.event or write_sample_event()
+    print_report([run_memory_size(memory_size_mib, args.invocations, event_path) for memory_size_mib in args.memory])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# Analyses VPC Lattice access logs: latency percentiles and error rates per service and target group, and the slowest paths.
+# Log files (JSON lines, gzipped as delivered to S3 or plain as exported from CloudWatch Logs) are streamed line by line and
+# latencies go into fixed-size quantile sketches, so memory doesn't grow with the number of requests. Sketches of separate
+# runs merge exactly: analyse shards with --save and combine them with --merge, or let --jobs analyse files in parallel.
+# Usage: python -m tools.lattice_access_logs logs/ [--jobs 4] [--name svc-0123456789abcdef0=ecs] [--save shard.json] [--merge a.json]
+import argparse
+import gzip
+import io
+import json
+import math
+import re
+import sys
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Final
+
+RELATIVE_ACCURACY: Final[float] = 0.01
+MAX_BINS: Final[int] = 2048
+# Paths are collapsed into '(other)' per service beyond this many, which bounds memory for paths with unbounded ids in them
+MAX_PATHS_PER_SERVICE: Final[int] = 1000
+REPORTED_QUANTILES: Final[tuple[float, ...]] = (0.5, 0.9, 0.99, 0.999)
+ID_SEGMENT: Final[re.Pattern] = re.compile(r'^(\d+|[0-9a-fA-F-]{16,}|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27})$')
+
+
+class LogMapping:
+    # Every value falls into the bucket [gamma^(i-1), gamma^i), whose middle is within relative_accuracy of all values in it
+
+    def __init__(self, relative_accuracy: float) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+
+    def index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def value(self, index: int) -> float:
+        # Middle of the bucket in relative terms
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+
+class QuantileSketch:
+    # Log-bucketed sketch (DDSketch), so any quantile is returned within RELATIVE_ACCURACY of the exact one. Merging adds bucket
+    # counts, which gives the same sketch as adding all values to one.
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, max_bins: int = MAX_BINS) -> None:
+        self.mapping = LogMapping(relative_accuracy)
+        self.max_bins = max_bins
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = self.mapping.index(value)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        # Folds the lowest buckets together, only the accuracy of the fastest requests suffers
+        indexes = sorted(self.bins)
+        surplus = indexes[:len(indexes) - self.max_bins + 1]
+        self.bins[surplus[-1]] += sum(self.bins.pop(index) for index in surplus[:-1])
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        if other.mapping.relative_accuracy != self.mapping.relative_accuracy:
+            raise ValueError('Only sketches with the same relative accuracy can be merged')
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, quantile: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = quantile * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Never above the largest value seen
+                return min(self.mapping.value(index), self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'relative_accuracy': self.mapping.relative_accuracy,
+            'bins': self.bins,
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(relative_accuracy=data['relative_accuracy'])
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count, sketch.count, sketch.total, sketch.max = data['zero_count'], data['count'], data['total'], data['max']
+        return sketch
+
+
+@dataclass
+class RequestStats:
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    client_errors: int = 0
+    server_errors: int = 0
+
+    def add(self, duration_ms: float, status: int) -> None:
+        self.sketch.add(duration_ms)
+        if 400 <= status < 500:
+            self.client_errors += 1
+        elif status >= 500:
+            self.server_errors += 1
+
+    def merge(self, other: 'RequestStats') -> None:
+        self.sketch.merge(other.sketch)
+        self.client_errors += other.client_errors
+        self.server_errors += other.server_errors
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'sketch': self.sketch.to_dict(), 'client_errors': self.client_errors, 'server_errors': self.server_errors}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'RequestStats':
+        return cls(
+            sketch=QuantileSketch.from_dict(data['sketch']), client_errors=data['client_errors'], server_errors=data['server_errors'])
+
+
+def _resource_id(arn: str | None) -> str:
+    # arn:aws:vpc-lattice:<region>:<account>:service/svc-0123456789abcdef0 to svc-0123456789abcdef0
+    return arn.rsplit('/', 1)[-1] if arn and arn != '-' else '-'
+
+
+def normalize_path(path: str) -> str:
+    path = path.partition('?')[0]
+    return '/'.join('{id}' if ID_SEGMENT.match(segment) else segment for segment in path.split('/')) or '/'
+
+
+class AccessLogAnalysis:
+
+    def __init__(self) -> None:
+        # Keyed by (service, target group) and by (service, normalised path)
+        self.targets: dict[tuple[str, str], RequestStats] = {}
+        self.paths: dict[tuple[str, str], RequestStats] = {}
+        self.paths_per_service: dict[str, int] = {}
+        self.malformed_lines = 0
+
+    def add_line(self, line: str) -> None:
+        # Lines exported from CloudWatch Logs start with their timestamp
+        start = line.find('{')
+        try:
+            record = json.loads(line[start:]) if start >= 0 else None
+            service = _resource_id(record['serviceArn'])
+            duration_ms = float(record['duration'])
+            status = int(record['responseCode'])
+        except (ValueError, KeyError, TypeError):
+            if line.strip():
+                self.malformed_lines += 1
+            return
+        self.targets.setdefault((service, _resource_id(record.get('targetGroupArn'))), RequestStats()).add(duration_ms, status)
+        self._path_stats(service, normalize_path(record.get('requestPath') or '/')).add(duration_ms, status)
+
+    def _path_stats(self, service: str, path: str) -> RequestStats:
+        stats = self.paths.get((service, path))
+        if stats is None:
+            if self.paths_per_service.get(service, 0) >= MAX_PATHS_PER_SERVICE:
+                path = '(other)'
+            else:
+                self.paths_per_service[service] = self.paths_per_service.get(service, 0) + 1
+            stats = self.paths.setdefault((service, path), RequestStats())
+        return stats
+
+    def merge(self, other: 'AccessLogAnalysis') -> None:
+        for key, stats in other.targets.items():
+            self.targets.setdefault(key, RequestStats()).merge(stats)
+        for (service, path), stats in other.paths.items():
+            self._path_stats(service, path).merge(stats)
+        self.malformed_lines += other.malformed_lines
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'targets': [[service, target_group, stats.to_dict()] for (service, target_group), stats in self.targets.items()],
+            'paths': [[service, path, stats.to_dict()] for (service, path), stats in self.paths.items()],
+            'malformed_lines': self.malformed_lines,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'AccessLogAnalysis':
+        analysis = cls()
+        for service, target_group, stats in data['targets']:
+            analysis.targets[(service, target_group)] = RequestStats.from_dict(stats)
+        for service, path, stats in data['paths']:
+            analysis._path_stats(service, path).merge(RequestStats.from_dict(stats))
+        analysis.malformed_lines = data['malformed_lines']
+        return analysis
+
+
+def find_log_files(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        files += sorted(file for file in path.rglob('*') if file.is_file()) if path.is_dir() else [path]
+    return files
+
+
+def read_lines(path: Path) -> Iterator[str]:
+    with path.open('rb') as raw:
+        # S3 delivery doesn't always name gzipped files .gz, so the magic number decides
+        binary = gzip.GzipFile(fileobj=raw) if raw.peek(2)[:2] == b'\x1f\x8b' else raw
+        yield from io.TextIOWrapper(binary, encoding='utf-8', errors='replace')
+
+
+def analyse_file(path: Path) -> dict[str, Any]:
+    analysis = AccessLogAnalysis()
+    for line in read_lines(path):
+        analysis.add_line(line)
+    return analysis.to_dict()
+
+
+def analyse(files: list[Path], jobs: int) -> AccessLogAnalysis:
+    analysis = AccessLogAnalysis()
+    if jobs <= 1:
+        for file in files:
+            for line in read_lines(file):
+                analysis.add_line(line)
+        return analysis
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for partial in executor.map(analyse_file, files):
+            analysis.merge(AccessLogAnalysis.from_dict(partial))
+    return analysis
+
+
+def _format_stats(stats: RequestStats) -> str:
+    count = stats.sketch.count
+    quantiles = ' '.join(f'{stats.sketch.quantile(quantile):>8.1f}' for quantile in REPORTED_QUANTILES)
+    return (f'{count:>9} {stats.client_errors / count:>6.2%} {stats.server_errors / count:>6.2%} {quantiles} '
+            f'{stats.sketch.max:>9.1f}')
+
+
+def print_report(analysis: AccessLogAnalysis, names: dict[str, str], top_paths: int, min_requests: int) -> None:
+    quantile_headers = ' '.join(f'{f"p{quantile * 100:g}":>8}' for quantile in REPORTED_QUANTILES)
+    header = f'{"requests":>9} {"4xx":>6} {"5xx":>6} {quantile_headers} {"max":>9}'
+    print(f'Latency in ms, within {RELATIVE_ACCURACY:.0%}')
+    print(f'{"service":<24} {"target group":<24} {header}')
+    for (service, target_group), stats in sorted(analysis.targets.items(), key=lambda item: item[1].sketch.quantile(0.99), reverse=True):
+        print(f'{names.get(service, service):<24} {names.get(target_group, target_group):<24} {_format_stats(stats)}')
+
+    slow_paths = sorted(((key, stats) for key, stats in analysis.paths.items() if stats.sketch.count >= min_requests),
+                        key=lambda item: item[1].sketch.quantile(0.99), reverse=True)[:top_paths]
+    print(f'\nSlowest paths by p99 (at least {min_requests} requests)')
+    print(f'{"service":<24} {"path":<40} {header}')
+    for (service, path), stats in slow_paths:
+        print(f'{names.get(service, service):<24} {path[:40]:<40} {_format_stats(stats)}')
+    if analysis.malformed_lines:
+        print(f'\nSkipped {analysis.malformed_lines} lines that are not Lattice access log records')
+
+
+def parse_names(values: list[str]) -> dict[str, str]:
+    # Logs only carry ARNs, e.g. --name svc-0123456789abcdef0=ecs --name tg-0123456789abcdef0=ecsiptargetgroup
+    return dict(value.split('=', 1) for value in values)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Latency percentiles and error rates from VPC Lattice access logs')
+    parser.add_argument('logs', type=Path, nargs='*', help='Log files or directories of them')
+    parser.add_argument('--jobs', type=int, default=1, help='Files analysed in parallel')
+    parser.add_argument('--merge', type=Path, action='append', default=[], help='Result saved with --save to add, can be repeated')
+    parser.add_argument('--save', type=Path, help='Writes the mergeable result to this JSON file')
+    parser.add_argument('--name', action='append', default=[], help='ID=NAME of a service or target group, can be repeated')
+    parser.add_argument('--top-paths', type=int, default=10)
+    parser.add_argument('--min-requests', type=int, default=10, help='Paths with fewer requests are left out of the slowest ones')
+    args = parser.parse_args()
+    if not args.logs and not args.merge:
+        parser.error('Pass log files, directories or --merge')
+
+    analysis = analyse(find_log_files(args.logs), args.jobs)
+    for saved in args.merge:
+        analysis.merge(AccessLogAnalysis.from_dict(json.loads(saved.read_text(encoding='utf-8'))))
+    if args.save:
+        args.save.write_text(json.dumps(analysis.to_dict()), encoding='utf-8')
+    if not analysis.targets:
+        print('No access log records found', file=sys.stderr)
+        sys.exit(1)
+    print_report(analysis, parse_names(args.name), args.top_paths, args.min_requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from tools.lattice_emulator.emulator import main
+
+main()
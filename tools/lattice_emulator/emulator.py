@@ -0,0 +1,284 @@
+# Local stand-in for the service network, built from the template synthesized by cdk synth.
+# Requests pick their service by the first label of the Host header (e.g. 'Host: lambda.lattice.local'), are checked against
+# the service's auth policy, matched against its listener rules and sent to one of the forwarded target groups by weight.
+# The caller's VPC is the construct id of a VPC of the stack, sent in the x-lattice-source-vpc header ('Ec2Vpc' by default)
+# and handed to targets as x-amzn-source-vpc. Only the SourceVpc condition of auth policies is enforced, SigV4 isn't checked.
+# Target groups are served by:
+#  * INSTANCE: nginx with the config rendered for EC2_INSTANCE_TYPE (http://127.0.0.1:8081)
+#  * IP and ALB: the amazon/amazon-ecs-sample image the Fargate service runs (http://127.0.0.1:8082)
+#  * LAMBDA: lambda_handlers.lambda_function.handle, called in-process with the event structure of the target group
+# --start-containers runs both containers with Docker, --backend NAME=URL points a service or target group elsewhere.
+# Usage: python -m tools.lattice_emulator [--template cdk.out/Stack.template.json] [--port 8080] [--start-containers]
+import argparse
+import asyncio
+import base64
+import importlib
+import json
+import logging
+import random
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Final, Protocol
+from urllib.parse import parse_qsl, urlsplit
+
+from tools.lattice_emulator.http1 import ConnectionPool, HttpRequest, HttpResponse, ProtocolError, read_request, serialize_response
+from tools.lattice_emulator.topology import Service, TargetGroup, Topology, WeightedTargetGroup, find_template, load_topology
+
+SOURCE_VPC_HEADER: Final[str] = 'x-lattice-source-vpc'
+DEFAULT_SOURCE_VPC: Final[str] = 'Ec2Vpc'
+LAMBDA_HANDLER: Final[str] = 'lambda_handlers.lambda_function.handle'
+
+NGINX_IMAGE: Final[str] = 'nginx:stable'
+ECS_SAMPLE_IMAGE: Final[str] = 'amazon/amazon-ecs-sample'
+# Target group type to the local backend serving it
+DEFAULT_BACKEND_URLS: Final[dict[str, str]] = {
+    'INSTANCE': 'http://127.0.0.1:8081',
+    'IP': 'http://127.0.0.1:8082',
+    'ALB': 'http://127.0.0.1:8082',
+}
+
+logger = logging.getLogger(__name__)
+
+
+class Backend(Protocol):
+
+    async def handle(self, request: HttpRequest, source_vpc: str) -> HttpResponse:
+        ...
+
+
+class HttpBackend:
+
+    def __init__(self, url: str, pool: ConnectionPool, timeout_seconds: float) -> None:
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.pool = pool
+        self.timeout_seconds = timeout_seconds
+
+    async def handle(self, request: HttpRequest, source_vpc: str) -> HttpResponse:
+        headers = {name: value for name, value in request.headers.items() if name != SOURCE_VPC_HEADER}
+        headers['x-amzn-source-vpc'] = source_vpc
+        upstream_request = HttpRequest(method=request.method, target=request.target, headers=headers, body=request.body)
+        return await asyncio.wait_for(self.pool.request(self.host, self.port, upstream_request), self.timeout_seconds)
+
+
+class LambdaContext:
+
+    def __init__(self, timeout_seconds: float) -> None:
+        self.function_name = 'lattice-emulator'
+        self.function_version = '$LATEST'
+        self.aws_request_id = 'lattice-emulator'
+        self.deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+class LambdaBackend:
+
+    def __init__(self, target_group: TargetGroup, handler: Callable[[dict[str, Any], Any], dict[str, Any]], timeout_seconds: float) -> None:
+        self.target_group = target_group
+        self.handler = handler
+        self.timeout_seconds = timeout_seconds
+
+    async def handle(self, request: HttpRequest, source_vpc: str) -> HttpResponse:
+        # The handler is synchronous like in Lambda, it blocks the event loop while it runs
+        result = self.handler(self._build_event(request, source_vpc), LambdaContext(self.timeout_seconds))
+        body = result.get('body') or ''
+        return HttpResponse(
+            status=result['statusCode'],
+            reason=result.get('statusDescription', '').partition(' ')[2],
+            headers={
+                name.lower(): value for name, value in (result.get('headers') or {}).items()
+            },
+            body=base64.b64decode(body) if result.get('isBase64Encoded') else body.encode(),
+        )
+
+    def _build_event(self, request: HttpRequest, source_vpc: str) -> dict[str, Any]:
+        _, _, query_string = request.target.partition('?')
+        query = parse_qsl(query_string, keep_blank_values=True)
+        headers = {name: value for name, value in request.headers.items() if name != SOURCE_VPC_HEADER}
+        headers['x-amzn-source-vpc'] = source_vpc
+        body = base64.b64encode(request.body).decode() if request.body else ''
+        if self.target_group.event_structure_version == 'V2':
+            multi_value_query: dict[str, list[str]] = {}
+            for name, value in query:
+                multi_value_query.setdefault(name, []).append(value)
+            return {
+                'version': '2.0',
+                'path': request.target,
+                'method': request.method,
+                'headers': {
+                    name: [value] for name, value in headers.items()
+                },
+                'queryStringParameters': multi_value_query,
+                'body': body,
+                'isBase64Encoded': bool(body),
+                'requestContext': {
+                    'targetGroupArn': f'arn:aws:vpc-lattice:local:000000000000:targetgroup/{self.target_group.name}',
+                    'identity': {
+                        'sourceVpcArn': f'arn:aws:ec2:local:000000000000:vpc/{source_vpc}'
+                    },
+                    'region': 'local',
+                    'timeEpoch': str(int(time.time() * 1000)),
+                },
+            }
+        return {
+            'raw_path': request.target,
+            'method': request.method,
+            'headers': headers,
+            'query_string_parameters': dict(query),
+            'body': body,
+            'is_base64_encoded': bool(body),
+        }
+
+
+def _error(status: int, reason: str, message: str) -> HttpResponse:
+    return HttpResponse(status=status, reason=reason, headers={'content-type': 'application/json'}, body=json.dumps({
+        'message': message
+    }).encode())
+
+
+class LatticeEmulator:
+
+    def __init__(self, topology: Topology, backends: dict[str, Backend], seed: int | None = None) -> None:
+        self.services = topology.services
+        self.backends = backends
+        self.random = random.Random(seed)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                response = await self.handle(request)
+                writer.write(serialize_response(response, keep_alive=request.keep_alive))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ProtocolError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, request: HttpRequest) -> HttpResponse:
+        service = self.services.get(request.headers.get('host', '').split(':')[0].split('.')[0])
+        if service is None:
+            return _error(404, 'Not Found', f'No service for host {request.headers.get("host")}')
+        source_vpc = request.headers.get(SOURCE_VPC_HEADER, DEFAULT_SOURCE_VPC)
+        if not service.is_allowed(source_vpc):
+            return _error(403, 'Forbidden', f'AccessDeniedException: {source_vpc} is not allowed by the auth policy of {service.name}')
+        target_group = self._select_target_group(service, request)
+        if target_group is None:
+            return _error(503, 'Service Unavailable', f'No target group to forward to in {service.name}')
+        try:
+            return await self.backends[target_group.name].handle(request, source_vpc)
+        except asyncio.TimeoutError:
+            return _error(504, 'Gateway Timeout', f'Target group {target_group.name} timed out')
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.warning('Target group %s failed: %r', target_group.name, error)
+            return _error(502, 'Bad Gateway', f'Target group {target_group.name} failed')
+
+    def _select_target_group(self, service: Service, request: HttpRequest) -> TargetGroup | None:
+        path = request.target.partition('?')[0]
+        forward: tuple[WeightedTargetGroup, ...] = service.select_forward(request.method, path, request.headers)
+        forward = tuple(target for target in forward if target.weight > 0)
+        if not forward:
+            return None
+        return self.random.choices([target.target_group for target in forward], weights=[target.weight for target in forward])[0]
+
+
+def build_backends(topology: Topology, backend_urls: dict[str, str], timeout_seconds: float) -> dict[str, Backend]:
+    pool = ConnectionPool()
+    backends: dict[str, Backend] = {}
+    target_group_services = {
+        target.target_group.name: service.name for service in topology.services.values() for target in service.default_forward
+    }
+    for name, target_group in topology.target_groups.items():
+        # Overrides are looked up by target group name first, then by the name of the service it is the default of
+        url = backend_urls.get(name) or backend_urls.get(target_group_services.get(name, ''))
+        if url is None and target_group.type == 'LAMBDA':
+            module_name, function_name = LAMBDA_HANDLER.rsplit('.', 1)
+            handler = getattr(importlib.import_module(module_name), function_name)
+            backends[name] = LambdaBackend(target_group, handler, timeout_seconds)
+            continue
+        backends[name] = HttpBackend(url or DEFAULT_BACKEND_URLS[target_group.type], pool, timeout_seconds)
+    return backends
+
+
+def start_containers(work_dir: Path) -> list[str]:
+    # pylint: disable=import-outside-toplevel
+    from simple_networks_with_amazon_vpc_lattice_cdk.constants import EC2_INSTANCE_TYPE
+    from simple_networks_with_amazon_vpc_lattice_cdk.ec2.nginx_config import NginxTuning, render_nginx_config
+
+    (work_dir / 'html').mkdir()
+    # Same page and config as the user data of the EC2 web server
+    (work_dir / 'html' / 'index.html').write_text('<h1>EC2 service works</h1>\n', encoding='utf-8')
+    (work_dir / 'nginx.conf').write_text(render_nginx_config(NginxTuning.for_instance_type(EC2_INSTANCE_TYPE)), encoding='utf-8')
+    containers = {
+        'lattice-emulator-ec2': [
+            '-p', f'{urlsplit(DEFAULT_BACKEND_URLS["INSTANCE"]).port}:80', '-v', f'{work_dir / "html"}:/usr/share/nginx/html:ro', '-v',
+            f'{work_dir / "nginx.conf"}:/etc/nginx/nginx.conf:ro', NGINX_IMAGE
+        ],
+        'lattice-emulator-ecs': ['-p', f'{urlsplit(DEFAULT_BACKEND_URLS["IP"]).port}:80', ECS_SAMPLE_IMAGE],
+    }
+    for name, arguments in containers.items():
+        subprocess.run(['docker', 'rm', '-f', name], capture_output=True, check=False)
+        subprocess.run(['docker', 'run', '-d', '--rm', '--name', name, *arguments], check=True, stdout=subprocess.DEVNULL)
+    return list(containers)
+
+
+def stop_containers(containers: list[str]) -> None:
+    if containers:
+        subprocess.run(['docker', 'rm', '-f', *containers], capture_output=True, check=False)
+
+
+async def serve(emulator: LatticeEmulator, host: str, port: int) -> None:
+    server = await asyncio.start_server(emulator.handle_connection, host, port, backlog=1024)
+    for service in emulator.services.values():
+        policy = 'any VPC' if service.is_allowed(None) else ', '.join(sorted(service.allowed_source_vpcs or ())) or 'nobody'
+        print(f'{service.name:<10} Host: {service.name}.lattice.local  rules: {len(service.rules)}  allowed from: {policy}')
+    print(f'Lattice emulator listening on http://{host}:{port}')
+    async with server:
+        await server.serve_forever()
+
+
+def parse_backend_urls(values: list[str]) -> dict[str, str]:
+    backend_urls = {}
+    for value in values:
+        name, separator, url = value.partition('=')
+        if not separator:
+            raise argparse.ArgumentTypeError(f'Expected NAME=URL, got {value}')
+        backend_urls[name] = url
+    return backend_urls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Emulates the synthesized service network locally')
+    parser.add_argument('--template', type=Path, help='Synthesized template, the only one in cdk.out by default')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--backend', action='append', default=[], help='NAME=URL of a service or target group, can be repeated')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds a target has to answer')
+    parser.add_argument('--seed', type=int, help='Seed of the weighted target group selection')
+    parser.add_argument('--start-containers', action='store_true', help='Runs the nginx and ECS sample containers with Docker')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    topology = load_topology(args.template or find_template())
+    emulator = LatticeEmulator(topology, build_backends(topology, parse_backend_urls(args.backend), args.timeout), seed=args.seed)
+    with tempfile.TemporaryDirectory() as work_dir:
+        containers = start_containers(Path(work_dir)) if args.start_containers else []
+        try:
+            asyncio.run(serve(emulator, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_containers(containers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Just enough HTTP/1.1 on top of asyncio streams for the emulator and the load generator: keep-alive, Content-Length and
+# chunked bodies. Kept dependency free so a benchmark run needs nothing but Python.
+import asyncio
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+HOP_BY_HOP_HEADERS = frozenset({'connection', 'keep-alive', 'proxy-connection', 'te', 'trailer', 'transfer-encoding', 'upgrade'})
+
+
+class ProtocolError(Exception):
+    pass
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    target: str
+    # Names are lowercased, repeated headers are joined with a comma
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b''
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get('connection', '').lower() != 'close'
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    reason: str = ''
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b''
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get('connection', '').lower() != 'close'
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in {b'\r\n', b'\n'}:
+            return headers
+        if not line:
+            raise ProtocolError('Connection closed inside the headers')
+        name, separator, value = line.decode('latin-1').partition(':')
+        if not separator:
+            raise ProtocolError(f'Malformed header line {line!r}')
+        name, value = name.strip().lower(), value.strip()
+        headers[name] = f'{headers[name]}, {value}' if name in headers else value
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: dict[str, str], until_close: bool = False) -> bytes:
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            if size == 0:
+                # Trailers end with an empty line like the headers do
+                await _read_headers(reader)
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    if 'content-length' not in headers and until_close:
+        return await reader.read()
+    return await reader.readexactly(int(headers.get('content-length', 0)))
+
+
+async def read_request(reader: asyncio.StreamReader) -> HttpRequest | None:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ProtocolError(f'Malformed request line {request_line!r}')
+    headers = await _read_headers(reader)
+    return HttpRequest(method=parts[0].upper(), target=parts[1], headers=headers, body=await _read_body(reader, headers))
+
+
+async def read_response(reader: asyncio.StreamReader, method: str) -> HttpResponse:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ProtocolError('Connection closed before the response')
+    version, status, *reason = status_line.decode('latin-1').split(maxsplit=2)
+    headers = await _read_headers(reader)
+    if version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive':
+        headers['connection'] = 'close'
+    status_code = int(status)
+    # Responses to HEAD and 1xx/204/304 never have a body, whatever their headers say
+    has_body = method != 'HEAD' and status_code >= 200 and status_code not in {204, 304}
+    body = await _read_body(reader, headers, until_close=headers.get('connection', '').lower() == 'close') if has_body else b''
+    return HttpResponse(status=status_code, reason=reason[0].strip() if reason else '', headers=headers, body=body)
+
+
+def _serialize(start_line: str, headers: dict[str, str], body: bytes, send_content_length: bool) -> bytes:
+    lines = [start_line]
+    lines += [f'{name}: {value}' for name, value in headers.items() if name.lower() not in HOP_BY_HOP_HEADERS | {'content-length'}]
+    if send_content_length:
+        lines.append(f'content-length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+def serialize_request(request: HttpRequest) -> bytes:
+    return _serialize(f'{request.method} {request.target} HTTP/1.1', request.headers, request.body,
+                      send_content_length=bool(request.body) or request.method in {'POST', 'PUT', 'PATCH'})
+
+
+def serialize_response(response: HttpResponse, keep_alive: bool = True) -> bytes:
+    headers = {**response.headers} if keep_alive else {**response.headers, 'connection': 'close'}
+    return _serialize(f'HTTP/1.1 {response.status} {response.reason}'.rstrip(), headers, response.body,
+                      send_content_length=response.status >= 200 and response.status not in {204, 304})
+
+
+class ConnectionPool:
+    # Idle keep-alive connections per (host, port), reused last in first out
+
+    def __init__(self, max_idle_per_host: int = 100) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.idle: defaultdict[tuple[str, int], deque[tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = defaultdict(deque)
+
+    async def request(self, host: str, port: int, request: HttpRequest) -> HttpResponse:
+        address = (host, port)
+        idle = self.idle[address]
+        while idle:
+            reader, writer = idle.pop()
+            try:
+                return await self._exchange(address, reader, writer, request)
+            except (ConnectionError, asyncio.IncompleteReadError, ProtocolError):
+                # The server closed the idle connection in the meantime, try the next one
+                writer.close()
+        reader, writer = await asyncio.open_connection(host, port)
+        return await self._exchange(address, reader, writer, request)
+
+    async def _exchange(self, address: tuple[str, int], reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        request: HttpRequest) -> HttpResponse:
+        writer.write(serialize_request(request))
+        await writer.drain()
+        try:
+            response = await read_response(reader, request.method)
+        except BaseException:
+            writer.close()
+            raise
+        if response.keep_alive and len(self.idle[address]) < self.max_idle_per_host:
+            self.idle[address].append((reader, writer))
+        else:
+            writer.close()
+        return response
+
+    def close(self) -> None:
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
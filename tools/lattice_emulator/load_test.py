@@ -0,0 +1,182 @@
+# Closed-loop load generator for the Lattice emulator: every service gets its own run of --concurrency keep-alive connections
+# sending requests back to back for --duration seconds after a --warmup, and reports throughput and p50/p95/p99 latency.
+# A request that takes longer than --timeout seconds counts as an error and its connection is dropped.
+# Results can be saved with --save and compared against a saved run with --baseline, the run fails when throughput drops or
+# p99 grows by more than --max-regression percent, so a regression shows up before deploying.
+# Usage: python -m tools.lattice_emulator.load_test [--service ec2 --service lambda:/items] [--duration 10] [--baseline base.json]
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Final
+from urllib.parse import urlsplit
+
+from tools.lattice_emulator.emulator import DEFAULT_SOURCE_VPC, SOURCE_VPC_HEADER
+from tools.lattice_emulator.http1 import ConnectionPool, HttpRequest, ProtocolError
+
+DEFAULT_SERVICES: Final[tuple[str, ...]] = ('ec2', 'ecs', 'lambda')
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    concurrency: int = 32
+    warmup_seconds: float = 2.0
+    duration_seconds: float = 10.0
+    request_timeout_seconds: float = 5.0
+
+
+@dataclass(frozen=True)
+class Latencies:
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass(frozen=True)
+class ServiceResult:
+    service: str
+    path: str
+    requests: int
+    errors: int
+    requests_per_second: float
+    latencies: Latencies
+    statuses: dict[str, int]
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    # Nearest rank, so the reported value is a latency that was actually measured
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(len(sorted_values) * fraction + 0.5) - 1))]
+
+
+class _Recorder:
+
+    def __init__(self, measured_from: float, measured_until: float) -> None:
+        self.measured_from = measured_from
+        self.measured_until = measured_until
+        self.latencies_ms: list[float] = []
+        self.statuses: Counter[str] = Counter()
+
+    def record(self, started: float, status: str) -> None:
+        # Only requests completed within the measured window count, the ones still running at its end are dropped
+        completed = time.perf_counter()
+        if self.measured_from <= completed <= self.measured_until:
+            self.latencies_ms.append((completed - started) * 1000)
+            self.statuses[status] += 1
+
+
+async def _worker(host: str, port: int, request: HttpRequest, recorder: _Recorder, timeout_seconds: float) -> None:
+    pool = ConnectionPool(max_idle_per_host=1)
+    try:
+        while time.perf_counter() < recorder.measured_until:
+            started = time.perf_counter()
+            try:
+                # A timed out exchange closes its connection, the next request opens a new one
+                response = await asyncio.wait_for(pool.request(host, port, request), timeout_seconds)
+                recorder.record(started, str(response.status))
+            # OSError covers refused and reset connections as well as the TimeoutError of wait_for
+            except (asyncio.IncompleteReadError, ProtocolError, OSError) as error:
+                recorder.record(started, type(error).__name__)
+    finally:
+        pool.close()
+
+
+async def run_service(url: str, service: str, path: str, source_vpc: str, profile: LoadProfile) -> ServiceResult:
+    parts = urlsplit(url)
+    request = HttpRequest(method='GET', target=path, headers={
+        'host': f'{service}.lattice.local',
+        'accept-encoding': 'gzip',
+        SOURCE_VPC_HEADER: source_vpc,
+    })
+    measured_from = time.perf_counter() + profile.warmup_seconds
+    recorder = _Recorder(measured_from, measured_from + profile.duration_seconds)
+    await asyncio.gather(
+        *(_worker(parts.hostname, parts.port or 80, request, recorder, profile.request_timeout_seconds) for _ in range(profile.concurrency))
+    )
+    latencies = sorted(recorder.latencies_ms)
+    errors = sum(count for status, count in recorder.statuses.items() if not status.isdigit() or int(status) >= 400)
+    return ServiceResult(
+        service=service, path=path, requests=len(latencies), errors=errors, requests_per_second=len(latencies) / profile.duration_seconds,
+        latencies=Latencies(p50_ms=percentile(latencies, 0.5), p95_ms=percentile(latencies, 0.95),
+                            p99_ms=percentile(latencies, 0.99)), statuses=dict(recorder.statuses))
+
+
+def print_report(results: list[ServiceResult]) -> None:
+    print(f'{"service":<10} {"path":<16} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50":>9} {"p95":>9} {"p99":>9}  statuses')
+    for result in results:
+        statuses = ' '.join(f'{status}:{count}' for status, count in sorted(result.statuses.items()))
+        print(f'{result.service:<10} {result.path:<16} {result.requests:>9} {result.errors:>7} {result.requests_per_second:>9.0f} '
+              f'{result.latencies.p50_ms:>7.2f}ms {result.latencies.p95_ms:>7.2f}ms {result.latencies.p99_ms:>7.2f}ms  {statuses}')
+
+
+def find_regressions(results: list[ServiceResult], baseline: list[ServiceResult], max_regression_percent: float) -> list[str]:
+    baseline_results = {(result.service, result.path): result for result in baseline}
+    tolerance = max_regression_percent / 100
+    regressions = []
+    for result in results:
+        before = baseline_results.get((result.service, result.path))
+        if before is None:
+            continue
+        if result.requests_per_second < before.requests_per_second * (1 - tolerance):
+            regressions.append(f'{result.service} {result.path}: {result.requests_per_second:.0f} req/s, '
+                               f'was {before.requests_per_second:.0f} req/s')
+        if result.latencies.p99_ms > before.latencies.p99_ms * (1 + tolerance):
+            regressions.append(f'{result.service} {result.path}: p99 {result.latencies.p99_ms:.2f}ms, was {before.latencies.p99_ms:.2f}ms')
+        if result.errors > before.errors:
+            regressions.append(f'{result.service} {result.path}: {result.errors} errors, was {before.errors}')
+    return regressions
+
+
+def parse_service(value: str) -> tuple[str, str]:
+    service, _, path = value.partition(':')
+    return service, path or '/'
+
+
+async def run(args: argparse.Namespace) -> list[ServiceResult]:
+    profile = LoadProfile(concurrency=args.concurrency, warmup_seconds=args.warmup, duration_seconds=args.duration,
+                          request_timeout_seconds=args.timeout)
+    results = []
+    # One service at a time, so the services don't compete for the emulator and the local backends
+    for service, path in args.service or [parse_service(service) for service in DEFAULT_SERVICES]:
+        results.append(await run_service(args.url, service, path, args.source_vpc, profile))
+    return results
+
+
+def load_results(path: Path) -> list[ServiceResult]:
+    results = json.loads(path.read_text(encoding='utf-8'))
+    return [ServiceResult(**result | {'latencies': Latencies(**result['latencies'])}) for result in results]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load tests services behind the Lattice emulator')
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help='Address of the emulator')
+    parser.add_argument('--service', type=parse_service, action='append', help='NAME[:PATH], ec2, ecs and lambda at / by default')
+    parser.add_argument('--source-vpc', default=DEFAULT_SOURCE_VPC, help='VPC the requests come from')
+    parser.add_argument('--concurrency', type=int, default=LoadProfile.concurrency, help='Connections per service')
+    parser.add_argument('--warmup', type=float, default=LoadProfile.warmup_seconds, help='Seconds of load before measuring')
+    parser.add_argument('--duration', type=float, default=LoadProfile.duration_seconds, help='Seconds measured per service')
+    parser.add_argument('--timeout', type=float, default=LoadProfile.request_timeout_seconds, help='Seconds a request may take')
+    parser.add_argument('--save', type=Path, help='Writes the results to this JSON file')
+    parser.add_argument('--baseline', type=Path, help='Results of an earlier run to compare with')
+    parser.add_argument('--max-regression', type=float, default=10.0, help='Percent of throughput or p99 a run may lose')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.save:
+        args.save.write_text(json.dumps([asdict(result) for result in results], indent=2), encoding='utf-8')
+    if args.baseline:
+        regressions = find_regressions(results, load_results(args.baseline), args.max_regression)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
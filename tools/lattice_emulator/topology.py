@@ -0,0 +1,211 @@
+# Reads the Lattice resources LatticeConstruct synthesized into a CloudFormation template: services with their listener,
+# rules and weighted target groups, target groups and the SourceVpc condition of auth policies.
+# Services and VPCs are named after their construct id, e.g. 'ecs' for 'ecsservice' and 'Ec2Vpc'.
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(frozen=True)
+class TargetGroup:
+    name: str
+    type: str
+    port: int | None
+    # Lambda targets only, 'V1' unless the target group asks for 'V2'
+    event_structure_version: str = 'V1'
+
+
+@dataclass(frozen=True)
+class WeightedTargetGroup:
+    target_group: TargetGroup
+    weight: int
+
+
+@dataclass(frozen=True)
+class HeaderMatch:
+    name: str
+    match_type: str
+    value: str
+    case_sensitive: bool
+
+    def matches(self, value: str | None) -> bool:
+        if value is None:
+            return False
+        expected = self.value if self.case_sensitive else self.value.lower()
+        value = value if self.case_sensitive else value.lower()
+        if self.match_type == 'exact':
+            return value == expected
+        if self.match_type == 'prefix':
+            return value.startswith(expected)
+        return expected in value
+
+
+@dataclass(frozen=True)
+class Rule:
+    priority: int
+    forward: tuple[WeightedTargetGroup, ...]
+    method: str | None = None
+    path_match_type: str | None = None
+    path: str | None = None
+    path_case_sensitive: bool = True
+    headers: tuple[HeaderMatch, ...] = ()
+
+    def matches(self, method: str, path: str, headers: dict[str, str]) -> bool:
+        if self.method is not None and self.method != method:
+            return False
+        if self.path is not None:
+            expected, path = (self.path, path) if self.path_case_sensitive else (self.path.lower(), path.lower())
+            if not (path == expected if self.path_match_type == 'exact' else path.startswith(expected)):
+                return False
+        return all(header.matches(headers.get(header.name.lower())) for header in self.headers)
+
+
+@dataclass
+class Service:
+    name: str
+    auth_type: str
+    listener_port: int | None = None
+    default_forward: tuple[WeightedTargetGroup, ...] = ()
+    # Ordered by priority
+    rules: list[Rule] = field(default_factory=list)
+    # None without an auth policy, otherwise the VPCs the SourceVpc condition lets in (an empty set lets everyone in)
+    allowed_source_vpcs: frozenset[str] | None = None
+
+    def is_allowed(self, source_vpc: str | None) -> bool:
+        if self.auth_type != 'AWS_IAM':
+            return True
+        # AWS_IAM without an auth policy denies every request
+        if self.allowed_source_vpcs is None:
+            return False
+        return not self.allowed_source_vpcs or source_vpc in self.allowed_source_vpcs
+
+    def select_forward(self, method: str, path: str, headers: dict[str, str]) -> tuple[WeightedTargetGroup, ...]:
+        for rule in self.rules:
+            if rule.matches(method, path, headers):
+                return rule.forward
+        return self.default_forward
+
+
+@dataclass
+class Topology:
+    services: dict[str, Service]
+    target_groups: dict[str, TargetGroup]
+
+
+def _construct_name(logical_id: str, resource: dict[str, Any]) -> str:
+    # 'Stack/Lattice/ecsservice' for L1 resources, 'Stack/Ec2Construct/Ec2Vpc/Resource' for the ones behind L2 constructs
+    path = resource.get('Metadata', {}).get('aws:cdk:path')
+    if not path:
+        return logical_id
+    segments = path.split('/')
+    return segments[-2] if segments[-1] == 'Resource' and len(segments) > 1 else segments[-1]
+
+
+def _logical_id(value: Any) -> str | None:
+    if isinstance(value, dict):
+        if 'Ref' in value:
+            return value['Ref']
+        if 'Fn::GetAtt' in value:
+            attribute = value['Fn::GetAtt']
+            return attribute[0] if isinstance(attribute, list) else attribute.split('.')[0]
+    return None
+
+
+class _TemplateReader:
+
+    def __init__(self, template: dict[str, Any]) -> None:
+        self.resources: dict[str, dict[str, Any]] = template.get('Resources', {})
+        self.names = {logical_id: _construct_name(logical_id, resource) for logical_id, resource in self.resources.items()}
+
+    def of_type(self, resource_type: str) -> dict[str, dict[str, Any]]:
+        return {
+            logical_id: resource.get('Properties', {})
+            for logical_id, resource in self.resources.items()
+            if resource['Type'] == resource_type
+        }
+
+    def resolve_name(self, value: Any) -> str:
+        # References to resources of the template become construct names, literal values (imported VPCs) are kept
+        logical_id = _logical_id(value)
+        return self.names.get(logical_id, logical_id) if logical_id else str(value)
+
+    def read(self) -> Topology:
+        target_groups = {
+            logical_id: self._read_target_group(logical_id, properties)
+            for logical_id, properties in self.of_type('AWS::VpcLattice::TargetGroup').items()
+        }
+        services = {
+            logical_id: Service(name=self.names[logical_id].removesuffix('service'), auth_type=properties.get('AuthType', 'NONE'))
+            for logical_id, properties in self.of_type('AWS::VpcLattice::Service').items()
+        }
+        listener_services = {}
+        for logical_id, properties in self.of_type('AWS::VpcLattice::Listener').items():
+            service = services[_logical_id(properties['ServiceIdentifier'])]
+            listener_services[logical_id] = service
+            service.listener_port = properties.get('Port')
+            service.default_forward = self._read_forward(properties['DefaultAction'], target_groups)
+        for properties in self.of_type('AWS::VpcLattice::Rule').values():
+            listener_services[_logical_id(properties['ListenerIdentifier'])].rules.append(self._read_rule(properties, target_groups))
+        for service in services.values():
+            service.rules.sort(key=lambda rule: rule.priority)
+        for properties in self.of_type('AWS::VpcLattice::AuthPolicy').values():
+            service = services.get(_logical_id(properties['ResourceIdentifier']))
+            if service is not None:
+                service.allowed_source_vpcs = self._read_allowed_source_vpcs(properties['Policy'])
+        return Topology(services={service.name: service for service in services.values()},
+                        target_groups={target_group.name: target_group for target_group in target_groups.values()})
+
+    @staticmethod
+    def _read_target_group(logical_id: str, properties: dict[str, Any]) -> TargetGroup:
+        config = properties.get('Config', {})
+        return TargetGroup(
+            name=properties.get('Name', logical_id), type=properties['Type'], port=config.get('Port'),
+            event_structure_version=config.get('LambdaEventStructureVersion', 'V1'))
+
+    @staticmethod
+    def _read_forward(action: dict[str, Any], target_groups: dict[str, TargetGroup]) -> tuple[WeightedTargetGroup, ...]:
+        # Fixed responses aren't emulated, a service without forward targets answers 503
+        return tuple(
+            WeightedTargetGroup(target_group=target_groups[_logical_id(target['TargetGroupIdentifier'])], weight=target.get('Weight', 100))
+            for target in action.get('Forward', {}).get('TargetGroups', []))
+
+    def _read_rule(self, properties: dict[str, Any], target_groups: dict[str, TargetGroup]) -> Rule:
+        http_match = properties.get('Match', {}).get('HttpMatch', {})
+        path_match = http_match.get('PathMatch', {})
+        path_match_type, path = next(iter(path_match.get('Match', {}).items()), (None, None))
+        return Rule(
+            priority=properties['Priority'],
+            forward=self._read_forward(properties['Action'], target_groups),
+            method=http_match.get('Method'),
+            path_match_type=path_match_type.lower() if path_match_type else None,
+            path=path,
+            path_case_sensitive=path_match.get('CaseSensitive', True),
+            headers=tuple(
+                HeaderMatch(
+                    name=header['Name'],
+                    match_type=match_type.lower(),
+                    value=value,
+                    case_sensitive=header.get('CaseSensitive', False),
+                ) for header in http_match.get('HeaderMatches', []) for match_type, value in header['Match'].items()),
+        )
+
+    def _read_allowed_source_vpcs(self, policy: dict[str, Any]) -> frozenset[str]:
+        source_vpcs: set[str] = set()
+        for statement in policy.get('Statement', []):
+            if statement.get('Effect') != 'Allow':
+                continue
+            values = statement.get('Condition', {}).get('StringEquals', {}).get('vpc-lattice-svcs:SourceVpc', [])
+            source_vpcs.update(self.resolve_name(value) for value in (values if isinstance(values, list) else [values]))
+        return frozenset(source_vpcs)
+
+
+def load_topology(template_path: Path) -> Topology:
+    return _TemplateReader(json.loads(template_path.read_text(encoding='utf-8'))).read()
+
+
+def find_template(cloud_assembly_dir: Path = Path('cdk.out')) -> Path:
+    templates = sorted(cloud_assembly_dir.glob('*.template.json'))
+    if len(templates) != 1:
+        raise FileNotFoundError(f'Expected one template in {cloud_assembly_dir}, found {len(templates)}. Run cdk synth or pass --template')
+    return templates[0]
@@ -0,0 +1,40 @@
+#!/bin/bash
+# Compares requests/sec of the stock nginx configuration with the tuned one rendered for the EC2 web server.
+# Usage: ./tools/nginx_benchmark.sh   (override INSTANCE_TYPE, CPUS, REQUESTS or CONCURRENCY through the environment)
+set -euo pipefail
+
+INSTANCE_TYPE=${INSTANCE_TYPE:-t3.micro}
+CPUS=${CPUS:-2}
+REQUESTS=${REQUESTS:-50000}
+CONCURRENCY=${CONCURRENCY:-100}
+NGINX_IMAGE=nginx:stable
+AB_IMAGE=httpd:2.4-alpine
+
+WORK_DIR=$(mktemp -d)
+trap 'docker rm -f nginx-benchmark-stock nginx-benchmark-tuned >/dev/null 2>&1 || true; rm -rf "${WORK_DIR}"' EXIT
+
+mkdir -p "${WORK_DIR}/html"
+echo "<h1>EC2 service works</h1>" > "${WORK_DIR}/html/index.html"
+# Big enough to cross the gzip threshold
+python3 -c 'import json; print(json.dumps([{"id": i, "name": f"item-{i}", "tags": ["a", "b", "c"]} for i in range(2000)]))' \
+    > "${WORK_DIR}/html/payload.json"
+PYTHONPATH="${PWD}/cdk${PYTHONPATH:+:${PYTHONPATH}}" python3 -m simple_networks_with_amazon_vpc_lattice_cdk.ec2.nginx_config \
+    --instance-type "${INSTANCE_TYPE}" > "${WORK_DIR}/nginx.conf"
+
+run_benchmark() {
+    local name=$1
+    shift
+    docker run -d --name "nginx-benchmark-${name}" --cpus "${CPUS}" -v "${WORK_DIR}/html:/usr/share/nginx/html:ro" "$@" "${NGINX_IMAGE}" >/dev/null
+    sleep 2
+    for path in / /payload.json; do
+        rps=$(docker run --rm --network "container:nginx-benchmark-${name}" "${AB_IMAGE}" \
+            ab -k -q -n "${REQUESTS}" -c "${CONCURRENCY}" -H 'Accept-Encoding: gzip' "http://127.0.0.1${path}" |
+            awk '/Requests per second/ {print $4}')
+        printf '%-6s %-14s %12s req/s\n' "${name}" "${path}" "${rps}"
+    done
+    docker rm -f "nginx-benchmark-${name}" >/dev/null
+}
+
+echo "Benchmarking nginx with ${CPUS} CPUs, ${REQUESTS} requests, concurrency ${CONCURRENCY}"
+run_benchmark stock
+run_benchmark tuned -v "${WORK_DIR}/nginx.conf:/etc/nginx/nginx.conf:ro"
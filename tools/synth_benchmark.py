@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Times the synth of the stack the way cdk synth runs it, offline so the network doesn't add noise, and reports how the time
+# and the size of the template grow with the topology. --history appends every run to a JSON lines file and compares with
+# the previous entry, --import-profile lists the modules that take longest to import.
+# Usage: python -m tools.synth_benchmark [--runs 5] [--history .build/synth_benchmark.jsonl] [--import-profile]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Final
+
+CDK_DIR: Final[Path] = Path('cdk')
+APP: Final[Path] = CDK_DIR / 'simple_networks_with_amazon_vpc_lattice_cdk' / 'app.py'
+LAMBDAS_DIR: Final[Path] = Path('.build/lambdas')
+
+
+def synth_env(out_dir: str) -> dict[str, str]:
+    python_path = [path for path in (str(CDK_DIR.resolve()), os.environ.get('PYTHONPATH')) if path]
+    env = {**os.environ, 'CDK_OUTDIR': out_dir, 'CDK_SYNTH_OFFLINE': '1', 'PYTHONPATH': os.pathsep.join(python_path)}
+    # Any account works offline, the template only differs in the account it references
+    env.setdefault('AWS_DEFAULT_ACCOUNT', '123456789012')
+    env.setdefault('AWS_DEFAULT_REGION', 'eu-west-1')
+    return env
+
+
+def run_synth(extra_args: tuple[str, ...] = ()) -> tuple[float, dict[str, Any], str]:
+    with tempfile.TemporaryDirectory() as out_dir:
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, *extra_args, str(APP)], env=synth_env(out_dir), capture_output=True, text=True,
+                                   check=False)
+        elapsed = time.perf_counter() - started
+        if completed.returncode:
+            sys.exit(f'Synth failed:\n{completed.stderr}')
+        templates = list(Path(out_dir).glob('*.template.json'))
+        template = json.loads(templates[0].read_text(encoding='utf-8')) if templates else {}
+        template_bytes = templates[0].stat().st_size if templates else 0
+    return elapsed, {'resources': len(template.get('Resources', {})), 'template_bytes': template_bytes}, completed.stderr
+
+
+def import_profile(top: int) -> list[tuple[float, str]]:
+    # -X importtime writes 'import time: self [us] | cumulative | module' for every import to stderr
+    _, _, stderr = run_synth(('-X', 'importtime'))
+    modules = []
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, module = line.removeprefix('import time:').split('|')
+            # Only top-level packages, their cumulative time includes everything below them
+            if not module.startswith('  '):
+                modules.append((int(cumulative) / 1000, module.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def read_last_entry(history: Path) -> dict[str, Any]:
+    if not history.exists():
+        return {}
+    lines = history.read_text(encoding='utf-8').splitlines()
+    return json.loads(lines[-1]) if lines else {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measures how long synthesizing the stack takes')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--history', type=Path, help='JSON lines file every run is appended to')
+    parser.add_argument('--import-profile', action='store_true', help='Lists the slowest imports of one more synth')
+    args = parser.parse_args()
+    if not LAMBDAS_DIR.exists():
+        sys.exit(f'{LAMBDAS_DIR} is missing, run python tools/build_lambda.py first')
+
+    durations = []
+    for _ in range(args.runs):
+        elapsed, template, _ = run_synth()
+        durations.append(elapsed)
+    entry = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'runs': args.runs,
+        'min_seconds': round(min(durations), 3),
+        'median_seconds': round(statistics.median(durations), 3),
+        'max_seconds': round(max(durations), 3),
+        **template,
+    }
+    print(f'synth: min {entry["min_seconds"]:.2f}s median {entry["median_seconds"]:.2f}s max {entry["max_seconds"]:.2f}s '
+          f'over {args.runs} runs, {entry["resources"]} resources, {entry["template_bytes"] / 1024:.0f}KB template')
+
+    if args.history:
+        previous = read_last_entry(args.history)
+        if previous:
+            change = entry['median_seconds'] / previous['median_seconds'] - 1
+            print(f'previous run {previous["timestamp"]}: median {previous["median_seconds"]:.2f}s ({change:+.0%}), '
+                  f'{previous["resources"]} resources')
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with args.history.open('a', encoding='utf-8') as history:
+            history.write(json.dumps(entry) + '\n')
+
+    if args.import_profile:
+        print(f'{"cumulative":>12}  module')
+        for cumulative_ms, module in import_profile(top=15):
+            print(f'{cumulative_ms:>10.0f}ms  {module}')
+
+
+if __name__ == '__main__':
+    main()